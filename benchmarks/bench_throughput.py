@@ -0,0 +1,401 @@
+"""
+End-to-end throughput benchmark with no real API traffic.
+
+Swaps config.client for benchmarks/fake_openai.FakeOpenAI and drives the
+real engine over synthetic rosters:
+
+  • engine_<n>  – run_all_matches with n debaters (openings, turns, judge)
+  • judge_<k>   – k judge_debate calls on synthetic transcripts
+  • elo_<n>     – win matrix + fit_bt over a synthetic n-debater tournament
+  • records_<mode>_<n> – memory held by n finished synthetic matches as plain
+                  dicts, compact records, or records with transcripts spilled
+                  to disk (each mode in a fresh process; --records n)
+
+Reported per scenario: wall time, matches/sec, calls/sec, p50/p95 match
+latency and peak RSS. Results can be saved as a JSON baseline and compared
+against later versions.
+
+Usage (from the repo root):
+    PYTHONPATH=.:src python benchmarks/bench_throughput.py
+    PYTHONPATH=.:src python benchmarks/bench_throughput.py --engine-rosters 3,10 \\
+        --elo-rosters 3,50,200 --latency lognormal --latency-s 0.02 --out bench.json
+    PYTHONPATH=.:src python benchmarks/bench_throughput.py --compare bench_baseline.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import config
+from ai_debate_p5 import events
+from ai_debate_p5.debate_engine import run_all_matches
+from ai_debate_p5.judge_module import judge_debate
+from ai_debate_p5.stats_module import reset_global_stats
+from ai_debate_p5.cost_module import ledger as cost_ledger
+from ai_debate_p5.stats.elo_bt import fit_bt
+from ai_debate_p5 import records
+
+from fake_openai import FakeOpenAI, FakeSettings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# metric → True when larger is better (used by --compare)
+_HIGHER_IS_BETTER = {
+    "matches_per_s": True,
+    "calls_per_s": True,
+    "wall_s": False,
+    "p95_match_s": False,
+    "peak_rss_mb": False,
+    "held_mb": False,
+}
+
+
+def _load_compute_elo():
+    spec = importlib.util.spec_from_file_location("compute_elo", ROOT / "scripts" / "compute_elo.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _peak_rss_mb() -> float:
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024.0 if sys.platform != "darwin" else kb / (1024.0 * 1024.0)
+
+
+def _quantile(xs, q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    k = min(len(xs) - 1, max(0, int(round(q * (len(xs) - 1)))))
+    return xs[k]
+
+
+def synthetic_roster(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"D{i:03d}",
+            "boN": (1, 4, 8)[i % 3],
+            "temperature": round(rng.uniform(0.3, 1.0), 2),
+            "model": config.MODEL,
+        }
+        for i in range(n)
+    ]
+
+
+class _MatchTimer:
+    """Bus subscriber recording wall time between match_started and match_completed."""
+
+    def __init__(self):
+        self.started = {}
+        self.durations = []
+
+    def __call__(self, ev):
+        mid = ev.payload["match_id"]
+        if ev.type == events.MATCH_STARTED:
+            self.started[mid] = time.perf_counter()
+        elif mid in self.started:
+            self.durations.append(time.perf_counter() - self.started.pop(mid))
+
+
+# ---------- scenarios ----------------------------------------------------
+
+def bench_engine(n: int, fake: FakeOpenAI, p5_text: str, fcc_text: str) -> dict:
+    config.DEBATERS = synthetic_roster(n)
+    reset_global_stats()
+    cost_ledger.reset()
+    bus = events.EventBus()
+    timer = bus.subscribe(_MatchTimer(), types=[events.MATCH_STARTED, events.MATCH_COMPLETED])
+    calls0 = fake.stats.calls
+
+    t0 = time.perf_counter()
+    matches = run_all_matches(
+        p5_text + "\n\n" + fcc_text, config.INITIAL_TOPIC,
+        quiet=True, ctx_p5_text=p5_text, ctx_fcc_text=fcc_text, bus=bus,
+    )
+    wall = time.perf_counter() - t0
+    calls = fake.stats.calls - calls0
+    return {
+        "debaters": n,
+        "matches": len(matches),
+        "api_calls": calls,
+        "wall_s": wall,
+        "matches_per_s": len(matches) / wall if wall else 0.0,
+        "calls_per_s": calls / wall if wall else 0.0,
+        "p50_match_s": _quantile(timer.durations, 0.50),
+        "p95_match_s": _quantile(timer.durations, 0.95),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_judge(k: int, fake: FakeOpenAI, turns: int) -> dict:
+    rng = random.Random(k)
+    bus = events.EventBus()
+    lat = []
+    calls0 = fake.stats.calls
+    t0 = time.perf_counter()
+    for i in range(k):
+        labels = [config.SIDE_A_LABEL, config.SIDE_B_LABEL]
+        rng.shuffle(labels)
+        match = {"match_id": i + 1, "turns": [
+            {"turn_number": t + 1, "speaker": labels[t % 2],
+             "content": " ".join(rng.choice(("cost", "risk", "reach", "timeline")) for _ in range(300))}
+            for t in range(turns)
+        ]}
+        t1 = time.perf_counter()
+        judge_debate(match, bus=bus)
+        lat.append(time.perf_counter() - t1)
+    wall = time.perf_counter() - t0
+    calls = fake.stats.calls - calls0
+    return {
+        "matches": k,
+        "api_calls": calls,
+        "wall_s": wall,
+        "matches_per_s": k / wall if wall else 0.0,
+        "calls_per_s": calls / wall if wall else 0.0,
+        "p50_match_s": _quantile(lat, 0.50),
+        "p95_match_s": _quantile(lat, 0.95),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_elo(n: int, repeats: int, compute_elo) -> dict:
+    rng = random.Random(n)
+    roster = synthetic_roster(n)
+    ids = [d["id"] for d in roster]
+    strength = {d: rng.gauss(0.0, 1.0) for d in ids}
+    matches = []
+    for a in ids:
+        for b in ids:
+            if a == b:
+                continue
+            for _ in range(2 * repeats):
+                p = 1.0 / (1.0 + pow(10.0, strength[b] - strength[a]))
+                matches.append({
+                    "winner": "Strategy 1" if rng.random() < p else "Strategy 2",
+                    "side_to_debater_id": {"Strategy 1": a, "Strategy 2": b},
+                })
+    t0 = time.perf_counter()
+    W = compute_elo._win_matrix_from_matches(matches, ids)
+    t1 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fit_bt(W)
+    t2 = time.perf_counter()
+    return {
+        "debaters": n,
+        "matches": len(matches),
+        "win_matrix_s": t1 - t0,
+        "fit_s": t2 - t1,
+        "wall_s": t2 - t0,
+        "matches_per_s": len(matches) / (t2 - t0) if t2 > t0 else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+_WORDS = ("cost", "risk", "reach", "timeline", "luminosity", "Higgs", "tunnel", "neutrino",
+          "collider", "budget", "schedule", "precision", "international", "detector")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+
+def synthetic_match(i: int, turns: int, words: int, rng: random.Random) -> dict:
+    """A finished match dict shaped like debate_engine's (single judge)."""
+    a, b = config.SIDE_A_LABEL, config.SIDE_B_LABEL
+    speakers = [a, b] if i % 2 else [b, a]
+    winner = speakers[rng.random() < 0.5]
+    verdict = " ".join(rng.choices(_WORDS, k=words // 2)) + f"\nWINNER: {winner}"
+    ts = []
+    for t in range(1, turns + 1):
+        turn = {"turn_number": t, "speaker": speakers[(t - 1) % 2],
+                "tokens_used_prompt": rng.randint(8000, 30000),
+                "tokens_used_completion": rng.randint(words // 2, words)}
+        if t == 1:
+            turn["tokens_used_completion_all"] = turn["tokens_used_completion"] * 4
+        turn["tokens_cached_prompt"] = 0
+        if t > 1:
+            turn["request_bytes"] = rng.randint(40000, 120000)
+        turn["content"] = " ".join(rng.choices(_WORDS, k=words))
+        ts.append(turn)
+    return {
+        "match_id": i,
+        "timestamp": f"2025-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}",
+        "turns": ts,
+        "stance_assignment": {a: "P5" if i % 4 < 2 else "FCC", b: "FCC" if i % 4 < 2 else "P5"},
+        "judge_evaluation": {"verdict": verdict, "winner": winner,
+                             "token_usage": {"prompt_tokens": 2000, "completion_tokens": 200,
+                                             "total_tokens": 2200},
+                             "format": "json_schema", "confidence": rng.random()},
+        "winner": winner,
+        "side_labels": [a, b],
+        "side_to_debater_id": {a: f"D{i % 7:03d}", b: f"D{(i + 3) % 7:03d}"},
+        "start_label": speakers[0],
+        "verdict": verdict,
+        "context_order": "P5+FCC" if i % 2 else "FCC+P5",
+    }
+
+
+def _records_child(mode: str, n: int, turns: int, words: int, spill: str, out) -> None:
+    rng = random.Random(n)
+    config.TRANSCRIPT_SPILL = spill if mode == "spill" else None
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    held = [] if mode == "dicts" else records.MatchLog(records.spill_store(), compact=True)
+    for i in range(1, n + 1):
+        m = synthetic_match(i, turns, words, rng)
+        held.append(m) if mode == "dicts" else held.add(m)
+    build = time.perf_counter() - t0
+    resident = _rss_mb() - base
+    t1 = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as f:
+        json.dump({"matches": held}, f, ensure_ascii=False, indent=2, default=records.json_default)
+    out.put({"mode": mode, "matches": n, "turns": turns, "build_s": build,
+             "dump_s": time.perf_counter() - t1, "held_mb": resident,
+             "peak_rss_mb": _peak_rss_mb()})
+
+
+def bench_records(n: int, turns: int, words: int) -> dict:
+    """Memory held by n finished matches, per representation (fresh process each)."""
+    ctx = multiprocessing.get_context("spawn")
+    out = {}
+    spill = Path(tempfile.gettempdir()) / f"bench_records_{os.getpid()}.blob"
+    try:
+        for mode in ("dicts", "records", "spill"):
+            q = ctx.Queue()
+            p = ctx.Process(target=_records_child, args=(mode, n, turns, words, str(spill), q))
+            p.start()
+            out[mode] = q.get()
+            p.join()
+    finally:
+        spill.unlink(missing_ok=True)
+    return out
+
+
+# ---------- baseline comparison -----------------------------------------
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Print a ratio table; return the list of regressed (scenario, metric)."""
+    regressions = []
+    print(f"\n{'scenario':<14}{'metric':<16}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, cur in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, higher in _HIGHER_IS_BETTER.items():
+            if metric not in cur or not base.get(metric):
+                continue
+            ratio = cur[metric] / base[metric]
+            worse = (ratio < 1 - tolerance) if higher else (ratio > 1 + tolerance)
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<14}{metric:<16}{base[metric]:>12.4g}{cur[metric]:>12.4g}{ratio:>8.2f}{flag}")
+            if worse:
+                regressions.append((name, metric))
+    return regressions
+
+
+def _ints(s: str):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Throughput benchmark with a fake OpenAI client")
+    ap.add_argument("--engine-rosters", default="3,10", help="Debater counts for run_all_matches")
+    ap.add_argument("--judge-calls", type=int, default=200, help="judge_debate calls (0 to skip)")
+    ap.add_argument("--elo-rosters", default="3,10,50,200", help="Debater counts for the Elo fit")
+    ap.add_argument("--records", type=int, default=0,
+                    help="Synthetic finished matches for the records memory scenario (0 to skip)")
+    ap.add_argument("--repeats", type=int, default=1, help="REPEATS_PER_PAIR for synthetic runs")
+    ap.add_argument("--turns", type=int, default=4, help="TURNS_PER_MATCH for synthetic runs")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--latency", choices=["const", "uniform", "lognormal", "exp"], default="const")
+    ap.add_argument("--latency-s", type=float, default=0.0)
+    ap.add_argument("--latency-hi-s", type=float, default=0.0)
+    ap.add_argument("--latency-sigma", type=float, default=0.5)
+    ap.add_argument("--per-token-s", type=float, default=0.0)
+    ap.add_argument("--completion-tokens", type=int, default=120)
+    ap.add_argument("--cached-fraction", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rpm", type=int, default=None)
+    ap.add_argument("--rate-limit-mode", choices=["sleep", "raise"], default="sleep")
+    ap.add_argument("--out", help="Write the JSON report here")
+    ap.add_argument("--compare", help="Baseline JSON report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10,
+                    help="Relative change tolerated before flagging a regression")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    settings = FakeSettings(
+        seed=args.seed, latency=args.latency, latency_s=args.latency_s,
+        latency_hi_s=args.latency_hi_s, latency_sigma=args.latency_sigma,
+        per_token_s=args.per_token_s, completion_tokens=args.completion_tokens,
+        cached_fraction=args.cached_fraction, error_rate=args.error_rate,
+        rpm=args.rpm, rate_limit_mode=args.rate_limit_mode,
+    )
+    fake = FakeOpenAI(settings)
+    config.client = fake
+    config.TURN_PACING_SECONDS = 0
+    config.TURNS_PER_MATCH = args.turns
+    config.REPEATS_PER_PAIR = args.repeats
+
+    p5_text = Path(config.P5_CONTEXT_FILE).read_text(encoding="utf-8")
+    fcc_text = Path(config.FCC_CONTEXT_FILE).read_text(encoding="utf-8")
+
+    scenarios = {}
+    for n in _ints(args.engine_rosters):
+        scenarios[f"engine_{n}"] = bench_engine(n, fake, p5_text, fcc_text)
+        print(f"[engine_{n}] {json.dumps(scenarios[f'engine_{n}'])}")
+    if args.judge_calls:
+        scenarios[f"judge_{args.judge_calls}"] = bench_judge(args.judge_calls, fake, args.turns)
+        print(f"[judge_{args.judge_calls}] {json.dumps(scenarios[f'judge_{args.judge_calls}'])}")
+    compute_elo = _load_compute_elo()
+    for n in _ints(args.elo_rosters):
+        scenarios[f"elo_{n}"] = bench_elo(n, args.repeats, compute_elo)
+        print(f"[elo_{n}] {json.dumps(scenarios[f'elo_{n}'])}")
+
+    if args.records:
+        for mode, r in bench_records(args.records, args.turns, args.completion_tokens).items():
+            key = f"records_{mode}_{args.records}"
+            scenarios[key] = r
+            print(f"[{key}] {json.dumps(r)}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_settings": settings.__dict__,
+            "turns": args.turns,
+            "repeats": args.repeats,
+            "fake_client": fake.stats.to_dict(),
+        },
+        "scenarios": scenarios,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[ok] report saved to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
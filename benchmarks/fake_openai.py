@@ -0,0 +1,418 @@
+"""
+Deterministic in-process stand-in for openai.OpenAI used by the benchmarks.
+
+Install it with ``config.client = FakeOpenAI(...)``; the engine and judge
+look the client up at call time, so no real request is ever made.
+
+Knobs (all on FakeSettings):
+  • latency distribution per call (const / uniform / lognormal / exp) plus a
+    per-completion-token component, and optional stragglers (straggler_rate
+    of calls take straggler_s longer)
+  • completion token counts, logprobs, cached-prompt fraction — or, with
+    prefix_cache=True, provider-style prefix caching: cached tokens are the
+    longest previously seen leading run of messages (≥1024, 128-token blocks)
+  • judge verdicts: a WINNER line, or JSON when response_format carries a
+    json_schema; the label-distinguishing token gets logprob log(p) with the
+    rival label in top_logprobs (p drawn per call around judge_first_label_p)
+  • streaming (stream=True): one delta per token, base latency before the
+    first token and per_token_s between tokens; close() stops generation
+  • Responses API (client.responses.create) with server-side conversation
+    state: previous_response_id chains are replayed as full history for
+    token counting, like the real API bills them (responses_api=False
+    removes the endpoint to exercise the full-history fallback)
+  • error injection rate and an RPM rate limit that either sleeps (server-side
+    queueing) or raises FakeRateLimitError (HTTP 429)
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+
+_JUDGE_LABELS = re.compile(r"WINNER:\s*(.+?)\s+or\s+WINNER:\s*(.+?)(?:\.|$)", re.M)
+_WORDS = (
+    "the collider program offers a credible path to precision measurements while "
+    "international partners share cost and risk across the decade and the roadmap "
+    "balances neutrino cosmic frontier and higgs factory priorities with clear timelines"
+).split()
+
+
+class FakeAPIError(Exception):
+    """Injected failure (stands in for openai.APIStatusError); HTTP 500 unless given."""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeRateLimitError(FakeAPIError):
+    """Injected 429; ``retry_after`` seconds until the bucket refills."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry after {retry_after:.3f}s", status_code=429)
+        self.retry_after = retry_after
+
+
+@dataclass
+class FakeSettings:
+    seed: int = 0
+    latency: str = "const"            # const | uniform | lognormal | exp
+    latency_s: float = 0.0            # const value / uniform low / lognormal median / exp mean
+    latency_hi_s: float = 0.0         # uniform high
+    latency_sigma: float = 0.5        # lognormal shape
+    straggler_rate: float = 0.0       # share of calls that straggle …
+    straggler_s: float = 0.0          # … by this many extra seconds
+    per_token_s: float = 0.0          # added per completion token
+    completion_tokens: int = 120      # mean completion length (capped by max_tokens)
+    completion_jitter: int = 40       # ± uniform jitter on completion length
+    cached_fraction: float = 0.0      # share of prompt tokens reported as cached
+    prefix_cache: bool = False        # simulate exact-prefix caching instead
+    responses_api: bool = True        # expose client.responses (stateful turns)
+    error_rate: float = 0.0           # probability a call raises FakeAPIError
+    rpm: Optional[int] = None         # requests per minute; None = unlimited
+    rate_limit_mode: str = "sleep"    # sleep | raise
+    judge_first_label_p: float = 0.5  # P(judge picks the first allowed label)
+    judge_p_jitter: float = 0.25      # per-call spread of that probability
+
+
+class _Stats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.completions = 0
+        self.streams_closed_early = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.sleep_s = 0.0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._o = owner
+
+    def create(self, *, model, messages, n=1, logprobs=False, top_logprobs=None,
+               max_tokens=None, max_completion_tokens=None, temperature=None,
+               stream=False, stream_options=None, response_format=None, **_):
+        if stream:
+            return self._o._stream(model, messages, max_tokens or max_completion_tokens,
+                                   bool((stream_options or {}).get("include_usage")))
+        return self._o._complete(model, messages, n, bool(logprobs), top_logprobs,
+                                 max_tokens or max_completion_tokens, response_format)
+
+
+class _Responses:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._o = owner
+
+    def create(self, *, model, input, previous_response_id=None, max_output_tokens=None,
+               temperature=None, store=True, **_):
+        o = self._o
+        if isinstance(input, str):
+            input = [{"role": "user", "content": input}]
+        with o._lock:
+            if previous_response_id is not None and previous_response_id not in o._conversations:
+                raise FakeAPIError(f"unknown previous_response_id {previous_response_id!r}",
+                                   status_code=400)
+            history = list(o._conversations.get(previous_response_id, [])) + list(input)
+        r = o._complete(model, history, 1, False, None, max_output_tokens)
+        text = r.choices[0].message.content
+        if store:
+            with o._lock:
+                o._conversations[r.id] = history + [{"role": "assistant", "content": text}]
+        u = r.usage
+        return SimpleNamespace(
+            id=r.id, model=model, output_text=text,
+            usage=SimpleNamespace(
+                input_tokens=u.prompt_tokens, output_tokens=u.completion_tokens,
+                total_tokens=u.total_tokens,
+                input_tokens_details=SimpleNamespace(
+                    cached_tokens=u.prompt_tokens_details.cached_tokens)),
+        )
+
+
+class _FakeStream:
+    """Iterable of chat.completion.chunk-shaped objects with close()."""
+
+    def __init__(self, owner, words, prompt_tokens, first_delay, per_token, include_usage,
+                 cached_tokens=0):
+        self._o = owner
+        self._cached = cached_tokens
+        self._words = words
+        self._prompt = prompt_tokens
+        self._first = first_delay
+        self._per = per_token
+        self._usage = include_usage
+        self.closed = False
+        self.sent = 0
+
+    def __iter__(self):
+        if self._first > 0:
+            time.sleep(self._first)
+        for i, w in enumerate(self._words):
+            if self.closed:
+                return
+            if i and self._per > 0:
+                time.sleep(self._per)
+            self.sent += 1
+            delta = (" " if i else "") + w
+            yield SimpleNamespace(choices=[SimpleNamespace(
+                index=0, delta=SimpleNamespace(content=delta), finish_reason=None)], usage=None)
+        with self._o._lock:
+            self._o.stats.completion_tokens += self.sent
+        if self._usage:
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(
+                prompt_tokens=self._prompt, completion_tokens=self.sent,
+                total_tokens=self._prompt + self.sent,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=self._cached)))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            with self._o._lock:
+                self._o.stats.completion_tokens += self.sent
+                self._o.stats.streams_closed_early += 1
+
+
+class FakeOpenAI:
+    """Duck-typed subset of openai.OpenAI: ``client.chat.completions.create``."""
+
+    def __init__(self, settings: Optional[FakeSettings] = None, **overrides):
+        self.settings = settings or FakeSettings(**overrides)
+        self.stats = _Stats()
+        self._lock = threading.Lock()
+        self._call_index = 0
+        self._bucket_t = time.monotonic()
+        self._bucket_tokens = float(self.settings.rpm or 0)
+        self._seen_prefixes = set()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._conversations = {}
+        if self.settings.responses_api:
+            self.responses = _Responses(self)
+
+    # ---------- helpers -------------------------------------------------
+    def _next_rng(self) -> random.Random:
+        with self._lock:
+            self._call_index += 1
+            idx = self._call_index
+        return random.Random(f"{self.settings.seed}:{idx}")
+
+    def _take_rate_token(self) -> None:
+        rpm = self.settings.rpm
+        if not rpm:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                refill = (now - self._bucket_t) * rpm / 60.0
+                self._bucket_tokens = min(float(rpm), self._bucket_tokens + refill)
+                self._bucket_t = now
+                if self._bucket_tokens >= 1.0:
+                    self._bucket_tokens -= 1.0
+                    return
+                wait = (1.0 - self._bucket_tokens) * 60.0 / rpm
+                self.stats.rate_limited += 1
+            if self.settings.rate_limit_mode == "raise":
+                raise FakeRateLimitError(wait)
+            time.sleep(wait)
+
+    def _latency(self, rng: random.Random, completion_tokens: int) -> float:
+        s = self.settings
+        if s.latency == "uniform":
+            base = rng.uniform(s.latency_s, max(s.latency_s, s.latency_hi_s))
+        elif s.latency == "lognormal":
+            base = s.latency_s * math.exp(rng.gauss(0.0, s.latency_sigma)) if s.latency_s else 0.0
+        elif s.latency == "exp":
+            base = rng.expovariate(1.0 / s.latency_s) if s.latency_s else 0.0
+        else:
+            base = s.latency_s
+        if s.straggler_rate and rng.random() < s.straggler_rate:
+            base += s.straggler_s
+        return base + s.per_token_s * completion_tokens
+
+    @staticmethod
+    def _prompt_tokens(messages) -> int:
+        return max(1, sum(len(m.get("content") or "") for m in messages) // 4)
+
+    def _cached_tokens(self, messages, prompt_tokens: int) -> int:
+        s = self.settings
+        if not s.prefix_cache:
+            return int(prompt_tokens * s.cached_fraction)
+        h = hashlib.sha256()
+        keys, cum = [], 0
+        for m in messages:
+            content = m.get("content") or ""
+            h.update(f"{m.get('role')}\0{content}\0".encode("utf-8"))
+            cum += len(content) // 4
+            keys.append((h.hexdigest(), cum))
+        best = 0
+        with self._lock:
+            for k, n in keys:
+                if k in self._seen_prefixes:
+                    best = n
+            self._seen_prefixes.update(k for k, _ in keys)
+        best = min(best, prompt_tokens)
+        return (best // 128) * 128 if best >= 1024 else 0
+
+    def _text(self, rng: random.Random, n_tokens: int) -> list:
+        words = []
+        while len(words) < n_tokens:
+            sent = [rng.choice(_WORDS) for _ in range(rng.randint(8, 16))]
+            sent[0] = sent[0].capitalize()
+            sent[-1] += "."
+            words.extend(sent)
+        return words[:n_tokens]
+
+    # ---------- main entry ---------------------------------------------
+    def _stream(self, model, messages, max_tokens, include_usage):
+        s = self.settings
+        rng = self._next_rng()
+        self._take_rate_token()
+        with self._lock:
+            self.stats.calls += 1
+            self.stats.completions += 1
+        if s.error_rate and rng.random() < s.error_rate:
+            with self._lock:
+                self.stats.errors += 1
+            raise FakeAPIError("injected failure")
+        k = max(1, min(max_tokens or 10**9,
+                       s.completion_tokens + rng.randint(-s.completion_jitter, s.completion_jitter)))
+        prompt_tokens = self._prompt_tokens(messages)
+        with self._lock:
+            self.stats.prompt_tokens += prompt_tokens
+        first = self._latency(rng, 0)
+        return _FakeStream(self, self._text(rng, k), prompt_tokens, first,
+                           s.per_token_s, include_usage,
+                           self._cached_tokens(messages, prompt_tokens))
+
+    def _from_schema(self, rng, schema, pick):
+        if "enum" in schema:
+            return pick(schema["enum"])
+        t = schema.get("type")
+        if t == "object":
+            return {k: self._from_schema(rng, v, pick) for k, v in schema.get("properties", {}).items()}
+        if t == "array":
+            return [self._from_schema(rng, schema.get("items", {}), pick) for _ in range(2)]
+        if t in ("number", "integer"):
+            return rng.randint(1, 10)
+        return " ".join(self._text(rng, rng.randint(6, 14)))
+
+    @staticmethod
+    def _tokenize(content: str) -> list:
+        return re.findall(r"\w+|\s+|[^\w\s]", content)
+
+    def _logprobs(self, rng, toks, content, verdict):
+        """Per-token logprobs; the token where the labels differ carries log(p)."""
+        entries = [SimpleNamespace(token=t, logprob=-abs(rng.gauss(0.4, 0.3)), bytes=None,
+                                   top_logprobs=[]) for t in toks]
+        if verdict is None:
+            return entries
+        start, winner, other, p = verdict
+        d = 0
+        while d < min(len(winner), len(other)) and winner[d] == other[d]:
+            d += 1
+        pos, off = start + d, 0
+        for e in entries:
+            if off + len(e.token) > pos:
+                alt = content[off:pos] + other[d:d + len(e.token) - (pos - off)]
+                e.logprob = math.log(max(p, 1e-9))
+                e.top_logprobs = [SimpleNamespace(token=e.token, logprob=e.logprob, bytes=None),
+                                  SimpleNamespace(token=alt, logprob=math.log(max(1 - p, 1e-9)), bytes=None)]
+                break
+            off += len(e.token)
+        return entries
+
+    def _complete(self, model, messages, n, want_logprobs, top_logprobs, max_tokens,
+                  response_format=None):
+        s = self.settings
+        rng = self._next_rng()
+        self._take_rate_token()
+        with self._lock:
+            self.stats.calls += 1
+        if s.error_rate and rng.random() < s.error_rate:
+            with self._lock:
+                self.stats.errors += 1
+            raise FakeAPIError("injected failure")
+
+        joined = "\n".join(m.get("content") or "" for m in messages)
+        labels = _JUDGE_LABELS.search(joined)
+        schema = ((response_format or {}).get("json_schema") or {}).get("schema")
+        cap = max_tokens or 10**9
+
+        choices = []
+        completion_total = 0
+        for i in range(n):
+            k = max(1, min(cap, s.completion_tokens + rng.randint(-s.completion_jitter, s.completion_jitter)))
+            verdict = None
+            if schema is not None:
+                p_first = min(0.99, max(0.01, rng.gauss(s.judge_first_label_p, s.judge_p_jitter)))
+                chosen = {}
+
+                def pick(enum):
+                    if "winner" not in chosen and len(enum) == 2:
+                        first = rng.random() < p_first
+                        chosen["winner"] = (enum[0] if first else enum[1],
+                                            enum[1] if first else enum[0],
+                                            p_first if first else 1 - p_first)
+                    return rng.choice(enum)
+
+                obj = self._from_schema(rng, schema, pick)
+                if "winner" in obj and "winner" in chosen:
+                    obj["winner"] = chosen["winner"][0]
+                content = json.dumps(obj)
+                if "winner" in chosen:
+                    w, o, p = chosen["winner"]
+                    verdict = (content.rindex(json.dumps(w)) + 1, w, o, p)
+                toks = self._tokenize(content)
+            elif labels:
+                p_first = min(0.99, max(0.01, rng.gauss(s.judge_first_label_p, s.judge_p_jitter)))
+                first = rng.random() < p_first
+                winner, other = (labels.group(1), labels.group(2)) if first else (labels.group(2), labels.group(1))
+                tail = ["WINNER:"] + winner.split()
+                words = (self._text(rng, max(0, k - len(tail))) if k > 12 else [])
+                content = (" ".join(words) + "\n" if words else "") + " ".join(tail)
+                verdict = (len(content) - len(winner), winner, other, p_first if first else 1 - p_first)
+                toks = self._tokenize(content)
+            else:
+                toks = self._text(rng, k)
+                content = " ".join(toks)
+            completion_total += sum(1 for t in toks if not t.isspace())
+            lp = None
+            if want_logprobs:
+                if verdict is None:
+                    toks = [t if i == 0 else " " + t for i, t in enumerate(toks)]
+                lp = SimpleNamespace(content=self._logprobs(rng, toks, content, verdict))
+            choices.append(SimpleNamespace(
+                index=i,
+                message=SimpleNamespace(role="assistant", content=content),
+                logprobs=lp,
+                finish_reason="length" if len(toks) >= cap and schema is None else "stop",
+            ))
+
+        prompt_tokens = self._prompt_tokens(messages)
+        delay = self._latency(rng, completion_total // max(1, n))
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.stats.completions += n
+            self.stats.prompt_tokens += prompt_tokens
+            self.stats.completion_tokens += completion_total
+            self.stats.sleep_s += delay
+
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_total,
+            total_tokens=prompt_tokens + completion_total,
+            prompt_tokens_details=SimpleNamespace(
+                cached_tokens=self._cached_tokens(messages, prompt_tokens)),
+        )
+        return SimpleNamespace(id=f"fake-{rng.getrandbits(32):08x}", model=model,
+                               choices=choices, usage=usage)
@@ -1,22 +1,117 @@
 import os
-import openai
-from dotenv import load_dotenv
+import threading
 from pathlib import Path
 
-# Load environment variables  from .env file
-load_dotenv()
+# ------------------------------------------------------------------
+# OpenAI client — built lazily on first use of ``config.client``.
+# Importing this module does NOT import openai/httpx or read .env, so
+# offline analysis (compute_elo.py) needs neither the SDK nor an API key.
+# Tests/benchmarks can inject any object with ``chat.completions.create``
+# via set_client() or plain assignment (``config.client = fake``).
+# ------------------------------------------------------------------
+_client_lock = threading.Lock()
+_env_loaded = False
+
+
+def _load_env() -> None:
+    """Load .env once (OPENAI_API_KEY); silently skipped without python-dotenv."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    _env_loaded = True
+
+
+def get_client():
+    """Return the process-wide client, building openai.OpenAI on first call."""
+    c = globals().get("client")
+    if c is not None:
+        return c
+    with _client_lock:
+        c = globals().get("client")
+        if c is None:
+            _load_env()
+            if ENDPOINTS:
+                from ai_debate_p5.client_pool import ClientPool
+                c = ClientPool.from_config(ENDPOINTS, policy=ROUTING_POLICY)
+            else:
+                import openai
+                c = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            globals()["client"] = c
+    return c
+
+
+def set_client(c) -> None:
+    """Inject a client (fake, pooled, pre-configured…); None resets to lazy."""
+    if c is None:
+        globals().pop("client", None)
+    else:
+        globals()["client"] = c
 
-# OpenAI API key (make sure this is set in your .env file)
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Initialize the OpenAI client
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+def __getattr__(name):
+    # PEP 562: only called for attributes not yet set on the module
+    if name == "client":
+        return get_client()
+    if name == "OPENAI_API_KEY":
+        _load_env()
+        return os.getenv("OPENAI_API_KEY")
+    raise AttributeError(f"module 'config' has no attribute {name!r}")
+
+# ------------------------------------------------------------------
+# Optional endpoint pool (client_pool.ClientPool). Empty → single default
+# OpenAI client. Each entry: name, base_url, api_key_env (or api_key), group,
+# models (served model prefixes), max_connections, max_keepalive_connections,
+# keepalive_expiry, timeout. Example:
+#   ENDPOINTS = [
+#       {"name": "openai-1", "api_key_env": "OPENAI_API_KEY"},
+#       {"name": "openai-2", "api_key_env": "OPENAI_API_KEY_2"},
+#       {"name": "vllm", "base_url": "http://localhost:8000/v1",
+#        "group": "local", "models": ["llama"]},
+#   ]
+# ------------------------------------------------------------------
+ENDPOINTS = []
+ROUTING_POLICY = "least_outstanding"   # least_outstanding | quota | round_robin
+JUDGE_ENDPOINT_GROUP = None            # pin judge calls to one endpoint group
+# Judge calls start with the debaters' system + context prefix (prompt_layout)
+# so they hit the same prompt-cache entry; the judge then also sees the context.
+JUDGE_SHARE_CONTEXT_PREFIX = False
+
+# Inference backends (ai_debate_p5/backends). Model-name prefix → backend;
+# unmatched models use "openai" (config.client above). "local" runs in-process
+# on CPU: a transformers causal LM at LOCAL_MODEL_PATH when set, otherwise a
+# deterministic stub, e.g. EARLY_STOP = {"model": "local/stub", ...}.
+BACKEND_ROUTES = {"local/": "local"}
+LOCAL_MODEL_PATH = None
+# Capability overrides for models the family table does not know (e.g. served
+# from a vLLM endpoint): prefix → {"logprobs", "top_logprobs",
+# "structured_output", "max_n", "streaming", "seed", "stateful"}.
+MODEL_CAPABILITIES = {}
 
 # Debate Configuration
 MODEL = "gpt-4o-mini"
 TEMPERATURE = 0.7
 MAX_TOKENS_PER_RESPONSE = 400
 TURNS_PER_MATCH = 6           # Total turns per match, including the opening turn.
+TURN_PACING_SECONDS = 1       # Sleep after each debate turn (0 disables; benchmarks set 0).
+
+# Streaming turns (streaming.py): consume token deltas and close the stream at
+# the first sentence boundary once STREAM_SOFT_TOKEN_BUDGET tokens have
+# arrived; MAX_TOKENS_PER_RESPONSE stays the hard cap. Per-debater override:
+# "stream": True/False in DEBATERS.
+STREAM_TURNS = False
+STREAM_SOFT_TOKEN_BUDGET = int(0.8 * MAX_TOKENS_PER_RESPONSE)
+
+# Stateful turns (conversation.py): chain debate turns server-side with the
+# Responses API's previous_response_id so each turn sends only the new
+# instruction; backends without it fall back to full history. Per-debater
+# override: "stateful": True/False. Not combined with streamed turns.
+STATEFUL_TURNS = False
 
 # Prompts and Topic
 SYSTEM_PROMPT = (
@@ -42,6 +137,18 @@ DOCS_DIR = BASE_DIR /"docs"
 P5_CONTEXT_FILE = DOCS_DIR /"p5_summary.txt"
 FCC_CONTEXT_FILE = DOCS_DIR /"fcc_summary.txt"
 
+# Context corpora (contexts.py), in reading order. The names are the stances
+# debaters argue; "stance" is the instruction for the side arguing that
+# corpus. Add entries (or pass run_debate.py --ctx NAME=PATH) for 3- and
+# 4-document tournaments; stances rotate over every pair of corpora, two
+# repeats per pair (REPEATS_PER_PAIR = 2 × pairs covers each side once).
+CORPORA = {
+    "P5":  {"path": P5_CONTEXT_FILE,  "stance": "Emphasise the US P5-aligned roadmap."},
+    "FCC": {"path": FCC_CONTEXT_FILE, "stance": "Emphasise the FCC-first roadmap."},
+}
+# "all" → every match reads every corpus; "stances" → only the two it argues
+CONTEXT_SUBSET = "all"
+
 # Deprecated: old single concatenated context file (no longer used)
 STATIC_CONTEXT_FILE = None
 
@@ -58,6 +165,12 @@ SIDE_STANCE = {
 
 # ------------------------------------------------------------------
 # Debater roster for Elo experiment (budget-trimmed)
+# Optional per-debater keys:
+#   "endpoint_group" – pin calls to config.ENDPOINTS entries with that group
+#   "boN_mode", "boN_scorer", "boN_wave", "boN_min_gain", "boN_split"
+#                    – best-of-N opening sampling (see opening_sampler.py)
+#   "stream"         – stream this debater's turns (STREAM_TURNS)
+#   "stateful"       – server-side conversation state (STATEFUL_TURNS)
 # ------------------------------------------------------------------
 
 DEBATERS = [
@@ -84,6 +197,101 @@ DEBATERS = [
 
 REPEATS_PER_PAIR = 5  # how many independent repeats per ordered direction
 
+# ------------------------------------------------------------------
+# Judge panel (judge_module). None → one judge (MODEL at TEMPERATURE).
+# A list of judge specs {"model", "temperature", "seed"} (missing keys default
+# to MODEL / TEMPERATURE / no seed) is queried concurrently and stops as soon
+# as one side holds a strict majority; an int K is shorthand for K seeds of MODEL.
+# JUDGE_PANEL_EARLY_STOP = False queries all K judges on every match, so the
+# logged vote fractions measure agreement (compute_elo.py --soft); with early
+# stopping they depend on which judges answered first, and --soft counts
+# early-stopped panels as full wins.
+# ------------------------------------------------------------------
+JUDGE_PANEL = None
+JUDGE_PANEL_MAX_WORKERS = 8
+JUDGE_PANEL_EARLY_STOP = True
+
+# Cheap-first judge cascade. None → every match goes straight to the judge
+# (or panel) above. Otherwise a short-output tier-1 judge decides first and
+# only verdicts with P(winner) below "threshold" (or without logprobs) escalate;
+# "audit_rate" also escalates that share of confident matches to measure
+# tier-1 agreement (global_stats["judge_cascade"]).
+JUDGE_CASCADE = None
+# JUDGE_CASCADE = {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 40,
+#                  "threshold": 0.85, "audit_rate": 0.05}
+
+# Round-by-round probe judging. None → every match plays TURNS_PER_MATCH turns.
+# Otherwise, from round "min_rounds" on, a cheap probe (the cascade's tier-1
+# prompt) judges the transcript after each full round; the match ends once the
+# same side scores P(winner) ≥ "threshold" for "patience" consecutive rounds,
+# then the final verdict is issued. A "calibration_rate" share of matches
+# always runs to completion to measure early vs full agreement.
+EARLY_STOP = None
+# EARLY_STOP = {"model": "gpt-4o-mini", "threshold": 0.9, "patience": 2,
+#               "min_rounds": 1, "calibration_rate": 0.1}
+
+# Debate tree (debate_tree.py). None → every match generates all its turns.
+# ":memory:" or a JSONL path → turns are stored as nodes keyed by (context,
+# parent turn, speaker config, repeat); a match whose prefix is already stored
+# replays it, so shared openings are generated once and reruns with more
+# TURNS_PER_MATCH only generate the new turns. A path persists across runs.
+DEBATE_TREE = None
+
+# Hedged requests (hedging.py). None → every debate turn / judge call is one
+# request. Otherwise a call still pending after the observed "percentile"
+# latency of its model and stage (the model's, then "initial_delay_s", until
+# "min_samples" calls are in) gets
+# one duplicate (on "endpoint_group" if set) and the first answer wins; at most
+# "max_hedge_rate" of calls are hedged and none once losing duplicates have
+# cost "max_extra_cost_usd". Streamed and stateful turns are never hedged.
+HEDGE = None
+# HEDGE = {"percentile": 0.95, "min_samples": 20, "initial_delay_s": 8.0,
+#          "max_hedge_rate": 0.1, "max_extra_cost_usd": 1.0,
+#          "endpoint_group": None, "stages": ["turn", "judge"]}
+
+# Digest judging (digests.py). None → the judge reads the full transcript.
+# Otherwise each finished round is summarized in the background by "model"
+# (default MODEL) within "max_tokens", digests are cached by content, and the
+# judge reads the digests plus the final round verbatim; "calibration_rate" of
+# matches is also judged on the full transcript to measure verdict agreement
+# (global_stats["judge_digest"]).
+JUDGE_DIGEST = None
+# JUDGE_DIGEST = {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 150,
+#                 "calibration_rate": 0.1, "max_workers": 8}
+
+# Transcript spill (records.py). None → finished matches stay plain dicts with
+# their text in memory. A path → they are compacted into read-only records whose
+# turn and verdict text is appended to this file (records keep only offsets),
+# bounding memory on long sweeps; logs are unchanged.
+TRANSCRIPT_SPILL = None
+
+# Match scheduling (scheduler.py). None → matches run one at a time in schedule
+# order. Otherwise matches run concurrently on "workers" threads (or "pools":
+# model → workers, queued by the costlier side's model), longest predicted
+# match first, idle pools stealing from the busiest; predictions come from the
+# roster and are corrected as matches finish ("telemetry": a prior run's
+# _stats.json seeds them). Match IDs and log order are unchanged;
+# global_stats["schedule"] reports makespan against the naive order.
+MATCH_SCHEDULER = None
+# MATCH_SCHEDULER = {"workers": 4, "steal": True, "telemetry": None}
+# MATCH_SCHEDULER = {"pools": {"gpt-4o-mini": 4, "*": 2}}
+
+# Cheap model used by the "judge" best-of-N opening scorer
+OPENING_SCORER_MODEL = "gpt-4o-mini"
+
+# ------------------------------------------------------------------
+# Pricing (USD per 1M tokens) used by cost_module for ledgers and budget caps.
+# "cached_prompt" applies to usage.prompt_tokens_details.cached_tokens.
+# Unknown models are priced at 0 and flagged in the ledger.
+# ------------------------------------------------------------------
+MODEL_PRICING = {
+    "gpt-4o-mini": {"prompt": 0.15, "cached_prompt": 0.075, "completion": 0.60},
+    "gpt-4o":      {"prompt": 2.50, "cached_prompt": 1.25,  "completion": 10.00},
+    "gpt-5-mini":  {"prompt": 0.25, "cached_prompt": 0.025, "completion": 2.00},
+    "o4-mini":     {"prompt": 1.10, "cached_prompt": 0.275, "completion": 4.40},
+    "local/":      {"prompt": 0.0,  "cached_prompt": 0.0,   "completion": 0.0},
+}
+
 """
 Ordered pairs  :  n x (n - 1)          # product() excluding self-play
 Opener flips   :  x 2                  # Pro-opens, then Con-opens
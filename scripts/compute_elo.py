@@ -1,41 +1,93 @@
-import argparse, csv, json, numpy as np, config
+import argparse, csv, json, numpy as np
 from pathlib import Path
 
-from ai_debate_p5.stats.elo_bt import fit_bt  
+from ai_debate_p5.stats.elo_bt import fit_bt
+from ai_debate_p5.roster import roster_ids
+from ai_debate_p5.profiling import profiler, stage as profile_stage
+from ai_debate_p5.log_merge import LogMerger, LogMismatch, MISMATCH_POLICIES
 
-def _win_matrix_from_matches(matches, ids):
-    """Build W[i,j] = wins of debater ids[i] over ids[j] from match records."""
+def _outcomes(m, soft=False):
+    """
+    (winner id, loser id, credit) entries of one match: one full win, or with
+    soft=True and a judge panel that heard all its judges, each side's vote
+    fraction. An early-stopped panel (config.JUDGE_PANEL_EARLY_STOP) counts
+    as a full win: its fractions reflect which judges answered first.
+    """
+    winner_label = m.get("winner")
+    sid = m.get("side_to_debater_id", {})
+    if not winner_label or winner_label not in sid:
+        return []
+    w_id = sid[winner_label]
+    # opponent is the other strategy label
+    other_label = "Strategy 2" if winner_label == "Strategy 1" else "Strategy 1"
+    l_id = sid.get(other_label)
+    panel = (m.get("judge_evaluation", {}).get("panel") or {}) if soft else {}
+    frac = None if panel.get("early_stopped") else panel.get("vote_fraction")
+    if frac and (frac.get(winner_label, 0) + frac.get(other_label, 0)) > 0:
+        total = frac.get(winner_label, 0) + frac.get(other_label, 0)
+        return [(w_id, l_id, frac.get(winner_label, 0) / total),
+                (l_id, w_id, frac.get(other_label, 0) / total)]
+    return [(w_id, l_id, 1.0)]
+
+def _win_matrix_from_matches(matches, ids, soft=False):
+    """
+    Build W[i,j] = wins of debater ids[i] over ids[j] from match records.
+    With soft=True, matches judged by a panel contribute their vote fractions
+    (e.g. 0.8 / 0.2) instead of a single 1/0 outcome.
+    """
     n = len(ids)
     idx = {d_id: i for i, d_id in enumerate(ids)}
     W = np.zeros((n, n), dtype=float)
     for m in matches:
-        winner_label = m.get("winner")
-        sid = m.get("side_to_debater_id", {})
-        if not winner_label or winner_label not in sid:
-            continue
-        w_id = sid[winner_label]
-        # opponent is the other strategy label
-        other_label = "Strategy 2" if winner_label == "Strategy 1" else "Strategy 1"
-        l_id = sid.get(other_label)
-        if w_id in idx and l_id in idx:
-            W[idx[w_id], idx[l_id]] += 1.0
+        for w_id, l_id, credit in _outcomes(m, soft):
+            if w_id in idx and l_id in idx:
+                W[idx[w_id], idx[l_id]] += credit
+    return W
+
+def _streamed_win_matrices(paths, soft=False, on_mismatch="error"):
+    """
+    Several logs, streamed through log_merge (deduplicated, compatibility
+    checked): ({context_order: {(winner, loser): credit}}, ids). Memory holds
+    the counts and the dedup keys, never the matches.
+    """
+    merger = LogMerger(paths, on_mismatch=on_mismatch)
+    ids = merger.debater_ids()
+    by_order = {}
+    for m in merger:
+        counts = by_order.setdefault(m.get("context_order", "CONCAT_UNSPECIFIED"), {})
+        for w_id, l_id, credit in _outcomes(m, soft):
+            counts[(w_id, l_id)] = counts.get((w_id, l_id), 0.0) + credit
+    s = merger.summary()
+    print(f"[info] {s['matches']} matches from {len(paths)} logs "
+          f"({s['duplicates_dropped']} duplicates dropped)")
+    return by_order, ids
+
+def _matrix(counts_list, ids):
+    idx = {d_id: i for i, d_id in enumerate(ids)}
+    W = np.zeros((len(ids), len(ids)), dtype=float)
+    for counts in counts_list:
+        for (w_id, l_id), credit in counts.items():
+            if w_id in idx and l_id in idx:
+                W[idx[w_id], idx[l_id]] += credit
     return W
 
 def _fit_and_write(ids, W, out_csv_path: Path):
-    E, COV = fit_bt(W)
-    ci = 1.96 * np.sqrt(np.diag(COV))
+    with profile_stage("fit"):
+        E, COV = fit_bt(W)
+        ci = 1.96 * np.sqrt(np.diag(COV))
 
     out_csv_path = Path(out_csv_path)
     out_csv_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with out_csv_path.open("w", newline="") as f:
+    with profile_stage("write"), out_csv_path.open("w", newline="") as f:
         w = csv.writer(f)
         w.writerow(["id", "elo_mean", "elo_ci95"])
         for i, d in enumerate(ids):
             w.writerow([d, f"{E[i]:.3f}", f"{ci[i]:.3f}"])
     print(f"[ok] Elo ratings saved to {out_csv_path}")
 
-    with out_csv_path.with_name(out_csv_path.stem + "_pairwise.csv").open("w", newline="") as f2:
+    with profile_stage("write"), \
+            out_csv_path.with_name(out_csv_path.stem + "_pairwise.csv").open("w", newline="") as f2:
         w2 = csv.writer(f2)
         w2.writerow(["i","j","diff_mean","diff_ci95"])
         for i in range(len(ids)):
@@ -50,32 +102,61 @@ def _sanitize(tag: str) -> str:
 
 def main():
     parser = argparse.ArgumentParser(description="Compute Bradley–Terry Elo ratings")
-    parser.add_argument("log_json", help="debate log produced by run_debate.py")
+    parser.add_argument("log_json", nargs="+",
+                        help="debate log(s) produced by run_debate.py; several logs are streamed, "
+                             "deduplicated and pooled (see merge_logs.py)")
+    parser.add_argument("--on-mismatch", choices=MISMATCH_POLICIES, default="error",
+                        help="With several logs: what to do with a log whose context hashes or "
+                             "debater definitions disagree with earlier ones.")
     parser.add_argument("--out", default="elo.csv", help="CSV file to write (or prefix if --split-by-order)")
-    parser.add_argument("--filter-order",
-                        choices=["P5+FCC","FCC+P5","CONCAT_UNSPECIFIED"],
-                        help="If set, compute Elo using only matches with this context_order.")
+    parser.add_argument("--filter-order", metavar="VARIANT",
+                        help="If set, compute Elo using only matches with this context_order "
+                             "(a context variant id such as P5+FCC or FCC+P5+CEPC).")
     parser.add_argument("--split-by-order", action="store_true",
                         help="If set, compute Elo separately for each context_order present in the log.")
+    parser.add_argument("--soft", action="store_true",
+                        help="Use judge-panel vote fractions as fractional outcomes (config.JUDGE_PANEL runs). "
+                             "Early-stopped panels count as full wins; set "
+                             "config.JUDGE_PANEL_EARLY_STOP = False to hear every judge.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time the load / win-matrix / fit / write stages; table → <out>_profile.csv.")
+    parser.add_argument("--profile-sample-ms", type=float, default=None,
+                        help="With --profile, also sample stacks every N ms into <out>_profile.collapsed.")
     args = parser.parse_args()
 
-    ids = [d["id"] for d in config.DEBATERS]
+    if args.profile:
+        profiler.enable(sample_interval_s=(args.profile_sample_ms / 1000
+                                           if args.profile_sample_ms else None))
+    try:
+        _run(args)
+    finally:
+        if args.profile:
+            profiler.disable()
+            print(profiler.format_table())
+            for p in profiler.write(Path(args.out)):
+                print(f"[ok] Profile saved to {p}")
+
+
+def _run(args):
+    if len(args.log_json) > 1:
+        return _run_streamed(args)
+    # Load once; roster recorded in the log wins over config.DEBATERS
+    with profile_stage("log_load"):
+        data = json.loads(Path(args.log_json[0]).read_text(encoding="utf-8"))
+    ids = roster_ids(data)
+    matches = data.get("matches", [])
 
     # Default: pooled (back-compat)
     if not args.filter_order and not args.split_by_order:
-        # Old path: read once and pool all matches
-        data = json.loads(Path(args.log_json).read_text(encoding="utf-8"))
-        W = _win_matrix_from_matches(data.get("matches", []), ids)
+        with profile_stage("win_matrix"):
+            W = _win_matrix_from_matches(matches, ids, soft=args.soft)
         _fit_and_write(ids, W, Path(args.out))
         return
 
-    # Load once for filtering/splitting
-    data = json.loads(Path(args.log_json).read_text(encoding="utf-8"))
-    matches = data.get("matches", [])
-
     if args.filter_order:
         sub = [m for m in matches if m.get("context_order") == args.filter_order]
-        W = _win_matrix_from_matches(sub, ids)
+        with profile_stage("win_matrix"):
+            W = _win_matrix_from_matches(sub, ids, soft=args.soft)
         suffix = _sanitize(args.filter_order)
         out = Path(args.out)
         if out.suffix:
@@ -90,7 +171,8 @@ def main():
         orders = sorted({m.get("context_order", "CONCAT_UNSPECIFIED") for m in matches})
         for o in orders:
             sub = [m for m in matches if m.get("context_order","CONCAT_UNSPECIFIED")==o]
-            W = _win_matrix_from_matches(sub, ids)
+            with profile_stage("win_matrix"):
+                W = _win_matrix_from_matches(sub, ids, soft=args.soft)
             suffix = _sanitize(o)
             out = Path(args.out)
             if out.suffix:
@@ -99,5 +181,32 @@ def main():
                 out = out.with_name(out.name + f"_{suffix}.csv")
             _fit_and_write(ids, W, out)
 
+def _run_streamed(args):
+    """Several logs: win counts accumulated per context order while streaming."""
+    try:
+        with profile_stage("log_load"):
+            by_order, ids = _streamed_win_matrices(args.log_json, soft=args.soft,
+                                                   on_mismatch=args.on_mismatch)
+    except LogMismatch as exc:
+        raise SystemExit(f"Error: {exc}\n(use --on-mismatch skip|warn to pool anyway)")
+
+    if not args.filter_order and not args.split_by_order:
+        with profile_stage("win_matrix"):
+            W = _matrix(by_order.values(), ids)
+        _fit_and_write(ids, W, Path(args.out))
+        return
+
+    orders = [args.filter_order] if args.filter_order else sorted(by_order)
+    for o in orders:
+        with profile_stage("win_matrix"):
+            W = _matrix([by_order.get(o, {})], ids)
+        suffix = _sanitize(o)
+        out = Path(args.out)
+        if out.suffix:
+            out = out.with_name(out.stem + f"_{suffix}" + out.suffix)
+        else:
+            out = out.with_name(out.name + f"_{suffix}.csv")
+        _fit_and_write(ids, W, out)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,45 @@
+import argparse, sys
+from pathlib import Path
+
+# package-relative imports
+from ai_debate_p5.log_merge import LogMerger, LogMismatch, MISMATCH_POLICIES, write_merged
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+def _parse_args():
+    ap = argparse.ArgumentParser(
+        description="Merge debate logs into one: streamed, deduplicated, match IDs renumbered."
+    )
+    ap.add_argument("logs", nargs="+",
+                    help="Debate logs (run_debate.py / sweep JSON, legacy match lists, .jsonl)")
+    ap.add_argument("--out", required=True, help="Merged log to write")
+    ap.add_argument("--on-mismatch", choices=MISMATCH_POLICIES, default="error",
+                    help="Logs whose context hashes or debater definitions disagree with "
+                         "earlier ones: abort (default), skip them, or keep them with a warning.")
+    return ap.parse_args()
+
+
+def main():
+    args = _parse_args()
+    paths = []
+    for p in map(Path, args.logs):
+        if p.resolve() == Path(args.out).resolve():
+            sys.exit(f"Error: --out {args.out} is also an input")
+        paths.append(p)
+    try:
+        merger = LogMerger(paths, on_mismatch=args.on_mismatch)
+    except LogMismatch as exc:
+        sys.exit(f"Error: {exc}\n(use --on-mismatch skip|warn to merge anyway)")
+
+    summary = write_merged(merger, args.out)
+    for s in summary["sources"]:
+        state = (f"{s['matches']} matches, {s['duplicates']} duplicates"
+                 if s["included"] else "skipped (incompatible)")
+        print(f"  {s['log']}: {state}")
+    print(f"[ok] {summary['matches']} matches ({summary['duplicates_dropped']} duplicates dropped) "
+          f"→ {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,20 @@
-import argparse, builtins, json
+import argparse, json
 from datetime import datetime
 import config
 import sys
 from math import prod
 from pathlib import Path
-import hashlib
 
 
 # package-relative imports
 from ai_debate_p5 import run_all_matches
+from ai_debate_p5 import events
+from ai_debate_p5.debate_engine import SIDE_EMOJI
+from ai_debate_p5.cost_module import Budget
+from ai_debate_p5.contexts import ContextRegistry, ORDER_MODES
+from ai_debate_p5.hedging import latency_tail
+from ai_debate_p5.profiling import profiler, stage as profile_stage
+from ai_debate_p5.records import json_default
 from ai_debate_p5.stats_module import (global_stats, 
                                        compute_average_tokens_per_turn,)
 
@@ -27,25 +33,48 @@ def _parse_args():
     ap.add_argument("--quiet", action="store_true",
                     help="Suppress per-turn console output")
     ap.add_argument("--context-order",
-                        choices=["random", "p5_first", "fcc_first", "alternate"],
+                        choices=list(ORDER_MODES),
                         default="p5_first",  # default keeps current behaviour
-                        help="How to concatenate P5 and FCC context per match."
+                        help="How to concatenate the context corpora per match "
+                             "(canonical = p5_first, reversed = fcc_first)."
     )
     ap.add_argument("--seed", type=int, default=0,
                     help="RNG seed used when --context-order=random."
     )
+    ap.add_argument("--ctx", action="append", default=[], metavar="NAME=PATH",
+                    help="Context corpus (repeatable, in reading order); NAME is the stance "
+                         "argued from it (stance text from config.CORPORA)."
+    )
     ap.add_argument("--ctx-p5", type=str, default=None,
-                    help="Optional path to P5 context (overrides --ctx if given)."
+                    help="Path to the P5 context (same as --ctx P5=PATH)."
     )
     ap.add_argument("--ctx-fcc", type=str, default=None,
-                    help="Optional path to FCC context (overrides --ctx if given)."
-    )                
+                    help="Path to the FCC context (same as --ctx FCC=PATH)."
+    )
+    ap.add_argument("--events-log", type=str, default=None,
+                    help="Append every engine event as JSON lines to this file."
+    )
+    ap.add_argument("--max-cost", type=float, default=None,
+                    help="Stop scheduling new matches once run spend reaches this many USD."
+    )
+    ap.add_argument("--max-tokens", type=int, default=None,
+                    help="Stop scheduling new matches once run-wide prompt+completion tokens reach this."
+    )
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Play matches concurrently on N workers, longest predicted first "
+                         "(config.MATCH_SCHEDULER; 0 forces the sequential run)."
+    )
+    ap.add_argument("--telemetry", type=str, default=None,
+                    help="A previous run's _stats.json to seed the scheduler's match cost model."
+    )
+    ap.add_argument("--profile", action="store_true",
+                    help="Time named stages (wall / CPU / wait) and write <out>_profile.csv."
+    )
+    ap.add_argument("--profile-sample-ms", type=float, default=None,
+                    help="With --profile, also sample stacks every N ms into <out>_profile.collapsed."
+    )
     return ap.parse_args()
 
-class _SilentPrint:
-    def __call__(self, *args, **kwargs):
-        pass
-
 args = _parse_args()
 
 # runtime overrides ---------------------------------------------------
@@ -53,53 +82,77 @@ if args.repeats is not None:
     config.REPEATS_PER_PAIR = args.repeats
 if args.turns is not None:
     config.TURNS_PER_MATCH = args.turns
-if args.quiet:
-    builtins.print = _SilentPrint()
+if args.workers == 0:
+    config.MATCH_SCHEDULER = None
+elif args.workers is not None or args.telemetry:
+    sched = config.MATCH_SCHEDULER or {}
+    sched = {"workers": sched} if isinstance(sched, int) else dict(sched)
+    if args.workers is not None:
+        sched["workers"] = args.workers
+    if args.telemetry:
+        sched["telemetry"] = args.telemetry
+    config.MATCH_SCHEDULER = sched
+
+# Quiet mode: no console rendering at all (only progress dots + final line)
+_say = (lambda *a, **k: None) if args.quiet else print
 
 
 def load_static_context(filename):
     with open(filename, "r", encoding="utf-8") as f:
         return f.read()
 
+def _context_paths() -> dict:
+    """NAME → path from --ctx NAME=PATH, then --ctx-p5 / --ctx-fcc."""
+    paths = {}
+    for item in args.ctx:
+        name, sep, path = item.partition("=")
+        if not sep or not name or not path:
+            raise SystemExit(f"Error: --ctx expects NAME=PATH, got {item!r}")
+        paths[name] = path
+    if args.ctx_p5:
+        paths["P5"] = args.ctx_p5
+    if args.ctx_fcc:
+        paths["FCC"] = args.ctx_fcc
+    return paths
+
 def main():
+    if args.profile:
+        profiler.enable(sample_interval_s=(args.profile_sample_ms / 1000
+                                           if args.profile_sample_ms else None))
     # --- context selection (backward compatible) ---
-    if args.ctx_p5 and args.ctx_fcc:
-        # Two-file mode: load both and concatenate once (load-time only).
-        p5_text  = load_static_context(args.ctx_p5)
-        fcc_text = load_static_context(args.ctx_fcc)
-
-        if args.context_order == "fcc_first":
-            static_context = fcc_text + "\n\n" + p5_text
-        else:
-        # For p5_first, random, or alternate we build canonical P5+FCC once;
-        # per-match ordering is handled inside debate_engine.
-            static_context = p5_text + "\n\n" + fcc_text
+    ctx_paths = _context_paths()
+    if len(ctx_paths) >= 2:
+        # Load every corpus once; the registry precomputes each ordering /
+        # subset the run needs, per-match choice is handled inside debate_engine.
+        with profile_stage("context_load"):
+            contexts = ContextRegistry.from_paths(ctx_paths)
+            static_context = contexts.orderings(args.context_order)[0]
 
         _order_mode = args.context_order
 
-        _ctx_source = {"p5": str(args.ctx_p5), "fcc": str(args.ctx_fcc)}
-        # Fingerprint the exact combined bytes we pass into run_all_matches
-        _combined_bytes = static_context.encode("utf-8")
+        _ctx_source = {name.lower(): str(path) for name, path in ctx_paths.items()}
 
         # Back-compat + richer metadata
         label_suffix = _order_mode
         if _order_mode == "random":
             label_suffix = f"random (seed={args.seed})"
 
-        global_stats["context_path"]       = f"{args.ctx_p5} + {args.ctx_fcc} ({label_suffix})"
+        global_stats["context_path"]       = " + ".join(map(str, ctx_paths.values())) + f" ({label_suffix})"
         global_stats["context_paths"]      = _ctx_source
         global_stats["context_order_mode"] = _order_mode
         global_stats["context_order_seed"] = args.seed
-        global_stats["context_bytes"]      = len(_combined_bytes)
-        global_stats["context_sha256"]     = hashlib.sha256(_combined_bytes).hexdigest()
+        # Fingerprint of the mode's default ordering (every variant: context_variants)
+        global_stats["context_bytes"]      = static_context.bytes
+        global_stats["context_sha256"]     = static_context.sha256
 
     else:
         # Static single-file mode has been removed to avoid ambiguity about which
-        # evidence summary is used. We now require explicit P5/FCC context files.
+        # evidence summary is used. We now require explicit context files.
         raise SystemExit(
          "Error: static context mode (config.STATIC_CONTEXT_FILE) has been removed.\n"
-         "Please provide both --ctx-p5 and --ctx-fcc, for example:\n"
-         "  --ctx-p5 docs/p5_summary.txt --ctx-fcc docs/fcc_summary.txt"
+         "Please provide at least two context corpora, for example:\n"
+         "  --ctx-p5 docs/p5_summary.txt --ctx-fcc docs/fcc_summary.txt\n"
+         "  --ctx P5=docs/p5_summary.txt --ctx FCC=docs/fcc_summary.txt --ctx CEPC=docs/cepc.txt"
         )
     total_expected = (
         len(config.DEBATERS) * (len(config.DEBATERS) - 1) * 2
@@ -108,76 +161,133 @@ def main():
     completed = 0          # progress counter
     dot_wrap_turn  = 60         # wrap line after N dots
 
+    # --- event subscribers (rendering happens off the engine thread) ---
+    bus = events.bus
     if args.quiet:
-        def _bump_match():
-            nonlocal completed
-            completed += 1
-
-        def _dot_turn():
-            _dot_turn.count = getattr(_dot_turn, "count", 0) + 1
-            sys.stdout.write("." if (_dot_turn.count % dot_wrap_turn) else ".\n")
-            sys.stdout.flush()
+        bus.subscribe(events.QueuedSubscriber(events.ProgressDots(wrap=dot_wrap_turn)),
+                      types=[events.TURN_COMPLETED])
     else:
-        _bump_match = None
-        _dot_turn   = None
-   
+        bus.subscribe(events.QueuedSubscriber(events.ConsoleRenderer(side_emoji=SIDE_EMOJI)))
+    if args.events_log:
+        bus.subscribe(events.QueuedSubscriber(events.JsonlEventLog(args.events_log)))
 
-    print(f"\n [info] This configuration will run {total_expected} matches.\n")
+    def _bump_match():
+        nonlocal completed
+        completed += 1
+
+    _say(f"\n [info] This configuration will run {total_expected} matches.\n")
 
     matches_data = run_all_matches(
-        static_context,
+        static_context.text,
         config.INITIAL_TOPIC,
         progress_cb=_bump_match,            # counts matches (no printing)
-        progress_turn_cb=_dot_turn,         # prints one dot per turn
         quiet=args.quiet,
+        bus=bus,
+        budget=(Budget(args.max_cost, args.max_tokens)
+                if (args.max_cost is not None or args.max_tokens is not None) else None),
         context_order=args.context_order,
         seed=args.seed,
-        ctx_p5_text=(p5_text if (args.ctx_p5 and args.ctx_fcc) else None),
-        ctx_fcc_text=(fcc_text if (args.ctx_p5 and args.ctx_fcc) else None),
-    )    
+        contexts=contexts,
+    )
+    bus.close()   # drain queued renderers before the summary lines
+    global_stats["context_subset"]   = config.CONTEXT_SUBSET
+    global_stats["context_variants"] = contexts.metadata()
     # Compute average tokens per turn and update global stats
-    avg_tokens = compute_average_tokens_per_turn()
-    global_stats["average_tokens_per_turn"] = avg_tokens
+    with profile_stage("stats"):
+        avg_tokens = compute_average_tokens_per_turn()
+        global_stats["average_tokens_per_turn"] = avg_tokens
     wins_by_label = global_stats.get("wins_by_label", {})
 
     # Print global 
     
     
-    print("\n📊 Global Statistics:")
-    print(f"Total Matches: {global_stats['total_matches']}")
+    _say("\n📊 Global Statistics:")
+    _say(f"Total Matches: {global_stats['total_matches']}")
     for label, count in wins_by_label.items():
-        print(f"  {label}: {count}")
-    print(f"Total Token Usage: {global_stats['total_token_usage']}")
-    print(f"Total Turns: {global_stats['total_turns']}")
-    print(f"Average Tokens per Turn: {avg_tokens:.2f}")
+        _say(f"  {label}: {count}")
+    _say(f"Total Token Usage: {global_stats['total_token_usage']}")
+    _say(f"Total Turns: {global_stats['total_turns']}")
+    _say(f"Average Tokens per Turn: {avg_tokens:.2f}")
+    if global_stats["total_turns"]:
+        _say(f"Tokens per Turn p50/p95: {global_stats.quantile('tokens_per_turn', 0.5):.0f}"
+             f" / {global_stats.quantile('tokens_per_turn', 0.95):.0f}")
+    _say(f"Estimated Cost (USD): {global_stats['cost']['total']['cost_usd']:.4f}")
+    _say(f"Prompt Cache Hit Rate: {global_stats['prompt_cache']['cache_hit_rate']:.1%}")
+    if global_stats["judge_cascade"]["matches"]:
+        jc = global_stats["judge_cascade"]
+        _say(f"Judge Cascade: {jc['resolved_tier1']}/{jc['matches']} resolved at tier 1 "
+             f"(escalation rate {jc['escalation_rate']:.1%})")
+    if global_stats["early_stop"]["matches"]:
+        es = global_stats["early_stop"]
+        _say(f"Early Stop: {es['stopped_early']}/{es['matches']} matches ended early, "
+             f"{es['turns_saved']} turns saved")
+    if global_stats["debate_tree"]["turns_reused"]:
+        dt = global_stats["debate_tree"]
+        _say(f"Debate Tree: {dt['turns_reused']} turns replayed, {dt['turns_generated']} generated "
+             f"(${dt['cost_reused_usd']:.4f} not re-spent)")
+    if global_stats["judge_digest"]["matches"]:
+        jd = global_stats["judge_digest"]
+        ag = jd["agreement"]
+        _say(f"Judge Digests: {jd['rounds_digested']} rounds ({jd['digests_cached']} cached), "
+             f"judge prompt ~{jd['judge_prompt_tokens_est']} vs ~{jd['full_prompt_tokens_est']} tokens"
+             + (f"; agreement with full transcript {ag['agreed']}/{ag['compared']}"
+                if ag["compared"] else ""))
+    if global_stats["hedging"]["hedged"]:
+        hg = global_stats["hedging"]
+        tail = latency_tail(0.99)
+        _say(f"Hedging: {hg['hedged']}/{hg['calls']} calls hedged, duplicate won {hg['hedge_won']}, "
+             f"extra cost ${hg['extra_cost_usd']:.4f}"
+             + (f"; p99 latency {tail[0]:.2f}s → {tail[1]:.2f}s" if tail else ""))
+    if "schedule" in global_stats:
+        sc = global_stats["schedule"]
+        _say(f"Schedule: makespan {sc['makespan_s']:.1f}s on {sum(sc['workers'].values())} workers "
+             f"vs {sc['naive_makespan_s']:.1f}s in naive order (lower bound {sc['lower_bound_s']:.1f}s), "
+             f"{sc['steals']} steals")
+    if "budget_stop" in global_stats:
+        sys.stderr.write(
+            f"\n[budget] {global_stats['budget_stop']['reason']} — stopped after "
+            f"{global_stats['budget_stop']['matches_completed']}/{total_expected} matches\n"
+        )
 
   
     output_filename = (args.out
         or f"debate_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-    output_data    = {
-        "matches": matches_data,
-        "global_stats": global_stats
-    }
+    with profile_stage("stats"):
+        output_data    = {
+            "matches": matches_data,
+            "global_stats": global_stats.to_dict(),
+            "roster": config.DEBATERS,
+        }
 
 # ------------- write main log -------------------------------------
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    with profile_stage("log_write"), open(output_filename, "w", encoding="utf-8") as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2, default=json_default)
 
 # ------------- write stats-only file ------------------------------
     out_path   = Path(output_filename)
     stats_path = out_path.with_name(out_path.stem + "_stats.json")
 
-    with open(stats_path, "w", encoding="utf-8") as f_stats:
-        json.dump(global_stats, f_stats, ensure_ascii=False, indent=2)
+    with profile_stage("log_write"), open(stats_path, "w", encoding="utf-8") as f_stats:
+        json.dump(output_data["global_stats"], f_stats, ensure_ascii=False, indent=2)
+
+# ------------- profile table --------------------------------------
+    if args.profile:
+        profiler.disable()
+        profile_paths = profiler.write(out_path)
+        _say("\n⏱️  Stage profile:")
+        _say(profiler.format_table())
 
 # ------------- final console lines --------------------------------
     if args.quiet:
         sys.stdout.write(f"\n{completed}/{total_expected} matches done\n")
         sys.stdout.flush()
 
-    print(f"\n🎉 All debates completed! Logs and statistics saved to {output_filename}")
-    print(f"Log   → {out_path}")
-    print(f"Stats → {stats_path}")
+    _say(f"\n🎉 All debates completed! Logs and statistics saved to {output_filename}")
+    _say(f"Log   → {out_path}")
+    _say(f"Stats → {stats_path}")
+    if args.profile:
+        for p in profile_paths:
+            _say(f"Profile → {p}")
 
 
 
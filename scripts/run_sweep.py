@@ -0,0 +1,85 @@
+import argparse, json
+from datetime import datetime
+import config
+import sys
+from pathlib import Path
+
+# package-relative imports
+from ai_debate_p5 import events
+from ai_debate_p5.contexts import ContextRegistry, ORDER_MODES
+from ai_debate_p5.sweep import expand, run_sweep, format_table
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+def _parse_args():
+    ap = argparse.ArgumentParser(
+        description="Run the tournament once per configuration of a grid / random-search spec."
+    )
+    ap.add_argument("spec", help="Sweep spec (JSON file), see ai_debate_p5/sweep.py")
+    ap.add_argument("--out-dir",
+                    help="Directory for per-configuration logs and the summary table")
+    ap.add_argument("--repeats", type=int,
+                    help="Override config.REPEATS_PER_PAIR (a 'repeats' sweep parameter wins)")
+    ap.add_argument("--context-order",
+                    choices=list(ORDER_MODES),
+                    default="p5_first",
+                    help="Context order for configurations that do not sweep context_order.")
+    ap.add_argument("--seed", type=int, default=0,
+                    help="RNG seed used when a configuration's context order is random.")
+    ap.add_argument("--ctx", action="append", default=[], metavar="NAME=PATH",
+                    help="Context corpus (repeatable, in reading order); default config.CORPORA.")
+    ap.add_argument("--events-log", type=str, default=None,
+                    help="Append every engine event as JSON lines to this file.")
+    ap.add_argument("--dry-run", action="store_true",
+                    help="Print the expanded configurations and exit.")
+    return ap.parse_args()
+
+
+def main():
+    args = _parse_args()
+    spec = json.loads(Path(args.spec).read_text(encoding="utf-8"))
+    configs = expand(spec)
+    if args.repeats is not None:
+        config.REPEATS_PER_PAIR = args.repeats
+
+    print(f"[info] {len(configs)} configurations ({spec.get('mode', 'grid')})")
+    for c in configs:
+        print(f"  {c['name']}")
+    if args.dry_run:
+        return
+
+    if args.ctx:
+        pairs = [item.partition("=") for item in args.ctx]
+        if any(not sep or not name or not path for name, sep, path in pairs):
+            raise SystemExit(f"Error: --ctx expects NAME=PATH, got {args.ctx}")
+        contexts = ContextRegistry.from_paths({name: path for name, _, path in pairs})
+    else:
+        contexts = ContextRegistry.from_config()
+
+    bus = events.bus
+    bus.subscribe(events.QueuedSubscriber(events.ProgressDots(wrap=60)),
+                  types=[events.TURN_COMPLETED])
+    if args.events_log:
+        bus.subscribe(events.QueuedSubscriber(events.JsonlEventLog(args.events_log)))
+
+    out_dir = Path(args.out_dir or f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+    def _done(row):
+        sys.stdout.write(f"\n[ok] {row['config']}: {row['matches']} matches, "
+                         f"${row['cost_usd']:.4f}, {row['wall_s']:.1f}s\n")
+        sys.stdout.flush()
+
+    rows = run_sweep(configs, out_dir, contexts,
+                     context_order=args.context_order, seed=args.seed,
+                     bus=bus, on_config_done=_done)
+    bus.close()
+
+    print("\n📊 Sweep summary:")
+    print(format_table(rows))
+    print(f"\nSummary → {out_dir / 'sweep_summary.csv'}")
+    print(f"Stats   → {out_dir / 'sweep_stats.json'}")
+
+
+if __name__ == "__main__":
+    main()
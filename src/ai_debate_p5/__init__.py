@@ -4,7 +4,32 @@ ai_debate_p5 -  package root.
 Re‑export high - level helpers so notebooks can do
 
 >>> from ai_debate_p5 import run_all_matches
+
+Exports are resolved lazily (PEP 562): importing the package, or an
+offline submodule such as ai_debate_p5.stats.elo_bt, does not pull in
+debate_engine and the OpenAI stack.
 """
-from .debate_engine import run_all_matches          # noqa: F401
 
-__all__ = ["run_all_matches"]
+_LAZY_EXPORTS = {
+    "run_all_matches": (".debate_engine", "run_all_matches"),
+    "ContextRegistry": (".contexts", "ContextRegistry"),
+    "Debater": (".roster", "Debater"),
+    "load_roster": (".roster", "load_roster"),
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY_EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), attr)
+    globals()[name] = value   # cache for subsequent lookups
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
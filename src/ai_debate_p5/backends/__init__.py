@@ -0,0 +1,61 @@
+"""
+Inference backends.
+
+    from ai_debate_p5.backends import get_backend
+    b = get_backend(model, endpoint_group)
+    caps = b.capabilities(model)
+    gen = b.generate(model, messages, n=4, logprobs=caps.logprobs, max_tokens=400)
+
+Models are routed by name prefix through config.BACKEND_ROUTES (longest
+prefix wins; anything unmatched → "openai"). Built-in backends:
+  "openai" – config.client (openai.OpenAI / ClientPool / fake), see openai_backend
+  "local"  – in-process CPU: transformers model at config.LOCAL_MODEL_PATH,
+             else a deterministic stub, see local_backend
+register_backend() adds more (factory(endpoint_group) -> Backend).
+"""
+from typing import Callable, Dict, Optional
+
+import config
+from .base import Backend, Capabilities, Choice, Generation, TextStream, TokenLogprob, Usage
+
+_FACTORIES: Dict[str, Callable[[Optional[str]], Backend]] = {}
+
+
+def register_backend(name: str, factory: Callable[[Optional[str]], Backend]) -> None:
+    _FACTORIES[name] = factory
+
+
+def backend_name_for(model: str) -> str:
+    routes = getattr(config, "BACKEND_ROUTES", None) or {}
+    best = max((k for k in routes if model.startswith(k)), key=len, default=None)
+    return routes[best] if best else "openai"
+
+
+def get_backend(model: str, endpoint_group: Optional[str] = None) -> Backend:
+    """Backend serving *model* (OpenAI calls narrowed to *endpoint_group*)."""
+    name = backend_name_for(model)
+    try:
+        factory = _FACTORIES[name]
+    except KeyError:
+        raise ValueError(f"unknown backend {name!r} for model {model!r}; "
+                         f"registered: {sorted(_FACTORIES)}") from None
+    return factory(endpoint_group)
+
+
+def _openai_factory(endpoint_group):
+    from .openai_backend import OpenAIBackend
+    return OpenAIBackend(endpoint_group=endpoint_group)
+
+
+def _local_factory(endpoint_group):
+    from .local_backend import local_backend
+    return local_backend(getattr(config, "LOCAL_MODEL_PATH", None))
+
+
+register_backend("openai", _openai_factory)
+register_backend("local", _local_factory)
+
+__all__ = [
+    "Backend", "Capabilities", "Choice", "Generation", "TextStream", "TokenLogprob", "Usage",
+    "get_backend", "register_backend", "backend_name_for",
+]
@@ -0,0 +1,111 @@
+"""
+Backend-neutral request/response types and the Backend protocol.
+
+Call sites build one request (model, messages, n, temperature, max_tokens,
+logprobs, response_format, …) and get back a Generation; model-family quirks
+(o-series parameter names, SDK response shapes) stay inside each backend.
+What a model can do is declared by its backend through Capabilities rather
+than guessed from name prefixes at the call site.
+"""
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Iterator, List, Optional
+
+
+@dataclass(frozen=True)
+class Capabilities:
+    logprobs: bool = False           # per-token logprobs on completions
+    top_logprobs: int = 0            # max alternatives per token (0 → none)
+    structured_output: bool = False  # response_format json_schema honoured
+    max_n: int = 1                   # completions per request (n)
+    streaming: bool = False
+    stateful: bool = False           # server-side conversation state (respond)
+    seed: bool = False
+
+    def replace(self, **kw) -> "Capabilities":
+        return Capabilities(**{**self.__dict__, **kw})
+
+
+@dataclass
+class TokenLogprob:
+    token: str
+    logprob: float
+    top_logprobs: List["TokenLogprob"] = field(default_factory=list)
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def prompt_tokens_details(self):
+        # same attribute path as the SDK, so cost_module.cached_tokens_of works
+        return SimpleNamespace(cached_tokens=self.cached_tokens)
+
+
+@dataclass
+class Choice:
+    text: str
+    logprobs: Optional[List[TokenLogprob]] = None
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class Generation:
+    choices: List[Choice]
+    usage: Usage
+    id: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return self.choices[0].text if self.choices else ""
+
+
+class TextStream:
+    """
+    Iterator of text deltas (roughly one token each). ``usage`` is set once
+    the backend reports it (None if it never does); close() stops generation.
+    """
+
+    usage: Optional[Usage] = None
+
+    def __iter__(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class Backend:
+    """
+    Protocol every backend implements. generate() must honour n up to
+    capabilities(model).max_n; callers split larger requests themselves.
+    """
+
+    name = "base"
+
+    def capabilities(self, model: str) -> Capabilities:
+        raise NotImplementedError
+
+    def generate(self, model: str, messages, *, n: int = 1,
+                 temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                 logprobs: bool = False, top_logprobs: Optional[int] = None,
+                 response_format: Optional[dict] = None,
+                 seed: Optional[int] = None) -> Generation:
+        raise NotImplementedError
+
+    def stream(self, model: str, messages, *, temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> TextStream:
+        raise NotImplementedError
+
+    def respond(self, model: str, input, *, previous_response_id: Optional[str] = None,
+                temperature: Optional[float] = None,
+                max_tokens: Optional[int] = None) -> Generation:
+        """Stateful turn (capabilities().stateful); Generation.id chains the next call."""
+        raise NotImplementedError(f"{self.name} backend has no server-side conversation state")
@@ -0,0 +1,292 @@
+"""
+In-process CPU backends for high-volume, low-stakes calls (judge probes,
+cascade tier 1, opening scoring) at zero marginal API cost.
+
+• StubBackend – deterministic: output is a pure function of (model, messages,
+  seed, choice index). Unseeded calls with temperature > 0 also mix in the
+  temperature and a per-call counter, so repeated sampling (best-of-N waves,
+  split n>max_n requests) draws fresh completions like a real API. Judge prompts get a parseable verdict (WINNER line or
+  schema-shaped JSON) whose label token carries a logprob, so probes and the
+  cascade run end-to-end offline. Meant for plumbing, dry runs and tests.
+• TransformersBackend – a small Hugging Face causal LM (config.LOCAL_MODEL_PATH)
+  run with transformers/torch when installed: real logprobs, n>1 through
+  num_return_sequences, no structured output (the judge uses its WINNER-line
+  prompt instead).
+
+Models are routed here by name prefix (config.BACKEND_ROUTES, default
+"local/"), e.g. EARLY_STOP = {"model": "local/stub", ...}.
+"""
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+from typing import List, Optional
+
+from ..utils_openai import count_tokens
+from .base import Backend, Capabilities, Choice, Generation, TextStream, TokenLogprob, Usage
+
+_JUDGE_LABELS = re.compile(r"WINNER:\s*(.+?)\s+or\s+WINNER:\s*(.+?)(?:\.|$)", re.M)
+_TOKEN_RE = re.compile(r"\w+|\s+|[^\w\s]")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-]{2,}")
+
+
+def _prompt_text(messages) -> str:
+    return "\n".join(m.get("content") or "" for m in messages)
+
+
+class _ListStream(TextStream):
+    """Replays an already generated completion as per-token deltas."""
+
+    def __init__(self, tokens: List[str], usage: Usage):
+        self._tokens = tokens
+        self._final_usage = usage
+        self.usage = None
+        self._closed = False
+
+    def __iter__(self):
+        for t in self._tokens:
+            if self._closed:
+                return
+            yield t
+        self.usage = self._final_usage
+
+    def close(self) -> None:
+        self._closed = True
+
+
+# ---------- deterministic stub -------------------------------------------
+
+class StubBackend(Backend):
+    name = "stub"
+
+    _CAPS = Capabilities(logprobs=True, top_logprobs=5, structured_output=True,
+                         max_n=16, streaming=True, seed=True)
+
+    def __init__(self):
+        self._calls = itertools.count()
+
+    def capabilities(self, model: str) -> Capabilities:
+        return self._CAPS
+
+    @staticmethod
+    def _rng(model, messages, seed, i, salt=None) -> random.Random:
+        key = [model, messages, seed, i] if salt is None else [model, messages, seed, i, salt]
+        h = hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8"))
+        return random.Random(h.hexdigest())
+
+    @staticmethod
+    def _vocab(prompt: str) -> List[str]:
+        words = _WORD_RE.findall(prompt[-4000:]) or ["argument", "context", "evidence"]
+        return sorted(set(w.lower() for w in words))
+
+    def _prose(self, rng, vocab, n_tokens: int) -> str:
+        words = []
+        while len(words) < n_tokens:
+            sent = [rng.choice(vocab) for _ in range(rng.randint(8, 16))]
+            sent[0] = sent[0].capitalize()
+            sent[-1] += "."
+            words.extend(sent)
+        out = words[:n_tokens]
+        if out and not out[-1].endswith("."):
+            out[-1] += "."
+        return " ".join(out)
+
+    def _from_schema(self, rng, vocab, schema, pick):
+        if "enum" in schema:
+            return pick(schema["enum"])
+        t = schema.get("type")
+        if t == "object":
+            return {k: self._from_schema(rng, vocab, v, pick)
+                    for k, v in schema.get("properties", {}).items()}
+        if t == "array":
+            return [self._from_schema(rng, vocab, schema.get("items", {}), pick) for _ in range(2)]
+        if t in ("number", "integer"):
+            return rng.randint(1, 10)
+        return self._prose(rng, vocab, rng.randint(6, 12)).rstrip(".")
+
+    @staticmethod
+    def _mark_label(toks: List[TokenLogprob], text: str, start: int,
+                    winner: str, other: str, p: float) -> None:
+        """Give the token where the labels differ logprob log(p), rival log(1-p)."""
+        d = 0
+        while d < min(len(winner), len(other)) and winner[d] == other[d]:
+            d += 1
+        pos, off = start + d, 0
+        for t in toks:
+            if off + len(t.token) > pos:
+                alt = text[off:pos] + other[d:d + len(t.token) - (pos - off)]
+                t.logprob = math.log(p)
+                t.top_logprobs = [TokenLogprob(t.token, t.logprob),
+                                  TokenLogprob(alt, math.log(1.0 - p))]
+                return
+            off += len(t.token)
+
+    def _one(self, model, messages, seed, i, max_tokens, response_format, salt=None):
+        rng = self._rng(model, messages, seed, i, salt)
+        prompt = _prompt_text(messages)
+        vocab = self._vocab(prompt)
+        cap = max_tokens or 256
+        labels = _JUDGE_LABELS.search(prompt)
+        schema = ((response_format or {}).get("json_schema") or {}).get("schema")
+        verdict = None                      # (label start offset, winner, other, p)
+        p = 0.5 + 0.49 * rng.random()
+        if schema is not None:
+            chosen = {}
+
+            def pick(enum):
+                if "winner" not in chosen and len(enum) == 2:
+                    first = rng.random() < 0.5
+                    chosen["winner"] = (enum[0], enum[1]) if first else (enum[1], enum[0])
+                    return chosen["winner"][0]
+                return rng.choice(enum)
+
+            obj = self._from_schema(rng, vocab, schema, pick)
+            text = json.dumps(obj)
+            if "winner" in chosen and isinstance(obj, dict) and obj.get("winner") == chosen["winner"][0]:
+                w, o = chosen["winner"]
+                verdict = (text.rindex(json.dumps(w)) + 1, w, o, p)
+        elif (response_format or {}).get("type") == "json_object":
+            text = "{}"
+        elif labels:
+            first = rng.random() < 0.5
+            w, o = (labels.group(1), labels.group(2)) if first else (labels.group(2), labels.group(1))
+            body = self._prose(rng, vocab, min(cap, 40)) + "\n" if cap > 12 else ""
+            text = body + f"WINNER: {w}"
+            verdict = (len(text) - len(w), w, o, p)
+        else:
+            text = self._prose(rng, vocab, min(cap, rng.randint(60, 120)))
+        pieces = _TOKEN_RE.findall(text)
+        toks = [TokenLogprob(t, -0.8 * rng.random()) for t in pieces]
+        if verdict is not None:
+            self._mark_label(toks, text, verdict[0], verdict[1], verdict[2], verdict[3])
+        n_tokens = sum(1 for t in pieces if not t.isspace())
+        return text, toks, n_tokens
+
+    def generate(self, model, messages, *, n=1, temperature=None, max_tokens=None,
+                 logprobs=False, top_logprobs=None, response_format=None, seed=None) -> Generation:
+        # unseeded sampling must not repeat across calls; seeded or greedy calls stay pure
+        salt = [temperature, next(self._calls)] if seed is None and temperature else None
+        choices, completion = [], 0
+        for i in range(n):
+            text, toks, k = self._one(model, messages, seed, i, max_tokens, response_format, salt)
+            completion += k
+            if top_logprobs is not None:
+                for t in toks:
+                    t.top_logprobs = t.top_logprobs[:top_logprobs]
+            choices.append(Choice(text, toks if logprobs else None, "stop"))
+        prompt = count_tokens(_prompt_text(messages), model)
+        return Generation(choices, Usage(prompt, completion))
+
+    def stream(self, model, messages, *, temperature=None, max_tokens=None) -> TextStream:
+        gen = self.generate(model, messages, max_tokens=max_tokens, logprobs=True)
+        deltas, pending = [], ""
+        for t in gen.choices[0].logprobs:
+            if t.token.isspace():
+                pending += t.token          # whitespace rides on the next token
+            else:
+                deltas.append(pending + t.token)
+                pending = ""
+        return _ListStream(deltas, gen.usage)
+
+
+# ---------- transformers ------------------------------------------------
+
+class TransformersBackend(Backend):
+    name = "transformers"
+
+    _CAPS = Capabilities(logprobs=True, top_logprobs=5, structured_output=False,
+                         max_n=8, streaming=True, seed=True)
+
+    def __init__(self, model_path: str, device: str = "cpu"):
+        self.model_path = model_path
+        self.device = device
+        self._lock = threading.Lock()
+        self._tok = None
+        self._model = None
+
+    def capabilities(self, model: str) -> Capabilities:
+        return self._CAPS
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+                except ImportError as exc:
+                    raise RuntimeError(
+                        "LOCAL_MODEL_PATH is set but transformers/torch are not installed"
+                    ) from exc
+                self._tok = AutoTokenizer.from_pretrained(self.model_path)
+                self._model = AutoModelForCausalLM.from_pretrained(self.model_path).to(self.device)
+                self._model.eval()
+        return self._tok, self._model
+
+    def generate(self, model, messages, *, n=1, temperature=None, max_tokens=None,
+                 logprobs=False, top_logprobs=None, response_format=None, seed=None) -> Generation:
+        import torch
+
+        tok, lm = self._load()
+        prompt_ids = tok.apply_chat_template(messages, add_generation_prompt=True,
+                                             return_tensors="pt").to(self.device)
+        if seed is not None:
+            torch.manual_seed(seed)
+        sample = bool(temperature)
+        with self._lock, torch.no_grad():
+            out = lm.generate(
+                prompt_ids,
+                max_new_tokens=max_tokens or 256,
+                do_sample=sample,
+                temperature=temperature if sample else None,
+                num_return_sequences=n,
+                output_scores=logprobs,
+                return_dict_in_generate=True,
+                pad_token_id=tok.pad_token_id if tok.pad_token_id is not None else tok.eos_token_id,
+            )
+        gen_ids = out.sequences[:, prompt_ids.shape[1]:]
+        step_lp = None
+        if logprobs:
+            step_lp = [torch.log_softmax(s.float(), dim=-1) for s in out.scores]
+
+        choices, completion = [], 0
+        for i in range(gen_ids.shape[0]):
+            ids = gen_ids[i].tolist()
+            finish = "length"
+            if tok.eos_token_id in ids:
+                ids = ids[:ids.index(tok.eos_token_id)]
+                finish = "stop"
+            completion += len(ids)
+            toks = None
+            if step_lp is not None:
+                toks = []
+                k = top_logprobs or 0
+                for s, tid in enumerate(ids):
+                    row = step_lp[s][i]
+                    alts = []
+                    if k:
+                        vals, idx = row.topk(k)
+                        alts = [TokenLogprob(tok.decode([j]), float(v)) for v, j in zip(vals.tolist(), idx.tolist())]
+                    toks.append(TokenLogprob(tok.decode([tid]), float(row[tid]), alts))
+            choices.append(Choice(tok.decode(ids, skip_special_tokens=True), toks, finish))
+        return Generation(choices, Usage(int(prompt_ids.shape[1]) * n, completion))
+
+    def stream(self, model, messages, *, temperature=None, max_tokens=None) -> TextStream:
+        # generated in one go on CPU, then replayed token by token
+        gen = self.generate(model, messages, temperature=temperature, max_tokens=max_tokens,
+                            logprobs=True)
+        return _ListStream([t.token for t in gen.choices[0].logprobs], gen.usage)
+
+
+_local_lock = threading.Lock()
+_local_cache = {}
+
+
+def local_backend(model_path: Optional[str] = None) -> Backend:
+    """Shared local backend: transformers for *model_path*, else the stub."""
+    with _local_lock:
+        key = model_path or ""
+        if key not in _local_cache:
+            _local_cache[key] = TransformersBackend(model_path) if model_path else StubBackend()
+        return _local_cache[key]
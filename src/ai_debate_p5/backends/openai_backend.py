@@ -0,0 +1,174 @@
+"""
+OpenAI (and OpenAI-compatible) backend over ``config.client``.
+
+Wraps whatever client is installed — openai.OpenAI, a ClientPool (narrowed
+to an endpoint group) or the benchmarks' FakeOpenAI — and translates the
+neutral request into chat.completions / responses parameters, including the
+o-series quirks (max_completion_tokens, fixed temperature).
+
+Capabilities come from the family table below (longest prefix wins); models
+served elsewhere, e.g. a vLLM endpoint in config.ENDPOINTS, declare theirs in
+config.MODEL_CAPABILITIES. Hosted OpenAI families declare ``stateful``
+(Responses API); other models do not unless declared. respond() raises
+NotImplementedError when the installed client has no Responses endpoint, so
+the conversation falls back to full-history chat on first use.
+"""
+from typing import Optional
+
+import config
+from ..cost_module import cached_tokens_of
+from .base import Backend, Capabilities, Choice, Generation, TextStream, TokenLogprob, Usage
+
+_CHAT = Capabilities(max_n=128, streaming=True, seed=True)
+_HOSTED = _CHAT.replace(stateful=True)
+_FAMILIES = {
+    "gpt-4o-mini": _HOSTED.replace(logprobs=True, top_logprobs=20, structured_output=True),
+    "gpt-4o":      _HOSTED.replace(logprobs=True, top_logprobs=20, structured_output=True),
+    "gpt-4.1":     _HOSTED.replace(logprobs=True, top_logprobs=20, structured_output=True),
+    "gpt-5":       _HOSTED.replace(structured_output=True),
+    "o3":          _HOSTED.replace(structured_output=True),
+    "o4":          _HOSTED.replace(structured_output=True),
+}
+
+
+def _is_o_series(model: str) -> bool:
+    return model.startswith("o")          # e.g. "o4-mini"
+
+
+def request_limits(model: str, temperature: Optional[float], max_tokens: Optional[int]) -> dict:
+    """
+    Token cap / temperature keywords for a chat request:
+    • o-series models:     max_completion_tokens, temperature=1
+    • GPT-series models:   max_tokens,           temperature as given
+    """
+    out = {}
+    if _is_o_series(model):
+        if max_tokens is not None:
+            out["max_completion_tokens"] = max_tokens
+        if temperature is not None:
+            out["temperature"] = 1            # o-series ignores other values
+    else:
+        if max_tokens is not None:
+            out["max_tokens"] = max_tokens
+        if temperature is not None:
+            out["temperature"] = temperature
+    return out
+
+
+def _usage(u) -> Usage:
+    return Usage(int(u.prompt_tokens or 0), int(u.completion_tokens or 0), cached_tokens_of(u))
+
+
+def _logprobs(choice):
+    """SDK logprobs (current ``content`` list or legacy ``token_logprobs``) → TokenLogprobs."""
+    lp = getattr(choice, "logprobs", None)
+    if lp is None:
+        return None
+    if hasattr(lp, "token_logprobs"):
+        tokens = getattr(lp, "tokens", None) or [""] * len(lp.token_logprobs)
+        return [TokenLogprob(t, v) for t, v in zip(tokens, lp.token_logprobs)]
+    content = getattr(lp, "content", None)
+    if not content:
+        return None
+    return [
+        TokenLogprob(t.token, t.logprob,
+                     [TokenLogprob(a.token, a.logprob) for a in (getattr(t, "top_logprobs", None) or [])])
+        for t in content
+    ]
+
+
+class _ChatStream(TextStream):
+    def __init__(self, raw):
+        self._raw = raw
+        self.usage = None
+
+    def __iter__(self):
+        for chunk in self._raw:
+            if getattr(chunk, "usage", None) is not None:
+                self.usage = _usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    def close(self) -> None:
+        if hasattr(self._raw, "close"):
+            self._raw.close()         # stop generation server-side; no more tokens billed
+
+
+class OpenAIBackend(Backend):
+    name = "openai"
+
+    def __init__(self, client=None, endpoint_group: Optional[str] = None):
+        self._client = client
+        self.endpoint_group = endpoint_group
+
+    @property
+    def client(self):
+        # resolved on first use, so routing/capability lookups never build the SDK client
+        if self._client is None:
+            from ..utils_openai import client_for
+            self._client = client_for(self.endpoint_group)
+        return self._client
+
+    def capabilities(self, model: str) -> Capabilities:
+        best = max((k for k in _FAMILIES if model.startswith(k)), key=len, default=None)
+        caps = _FAMILIES[best] if best else _CHAT
+        declared = (getattr(config, "MODEL_CAPABILITIES", None) or {})
+        key = max((k for k in declared if model.startswith(k)), key=len, default=None)
+        if key:
+            caps = caps.replace(**declared[key])
+        return caps
+
+    def generate(self, model, messages, *, n=1, temperature=None, max_tokens=None,
+                 logprobs=False, top_logprobs=None, response_format=None, seed=None) -> Generation:
+        kwargs = {"model": model, "messages": messages, "n": n,
+                  **request_limits(model, temperature, max_tokens)}
+        if logprobs:
+            kwargs["logprobs"] = True
+            if top_logprobs:
+                kwargs["top_logprobs"] = top_logprobs
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        if seed is not None:
+            kwargs["seed"] = seed
+        resp = self.client.chat.completions.create(**kwargs)
+        return Generation(
+            choices=[Choice((c.message.content or ""), _logprobs(c), getattr(c, "finish_reason", None))
+                     for c in resp.choices],
+            usage=_usage(resp.usage),
+            id=getattr(resp, "id", None),
+        )
+
+    def stream(self, model, messages, *, temperature=None, max_tokens=None) -> TextStream:
+        raw = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request_limits(model, temperature, max_tokens),
+        )
+        return _ChatStream(raw)
+
+    def respond(self, model, input, *, previous_response_id=None, temperature=None,
+                max_tokens=None) -> Generation:
+        kwargs = {"model": model, "input": input, "store": True}
+        if previous_response_id is not None:
+            kwargs["previous_response_id"] = previous_response_id
+        if temperature is not None and not _is_o_series(model):
+            kwargs["temperature"] = temperature
+        if max_tokens is not None:
+            kwargs["max_output_tokens"] = max_tokens
+        responses = getattr(self.client, "responses", None)
+        if responses is None:
+            raise NotImplementedError(f"{type(self.client).__name__} has no Responses endpoint")
+        resp = responses.create(**kwargs)
+        u = resp.usage
+        details = getattr(u, "input_tokens_details", None)
+        return Generation(
+            choices=[Choice(resp.output_text or "")],
+            usage=Usage(int(u.input_tokens), int(u.output_tokens),
+                        int(getattr(details, "cached_tokens", 0) or 0)),
+            id=resp.id,
+        )
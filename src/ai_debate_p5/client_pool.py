@@ -0,0 +1,298 @@
+"""
+Pooled multi-endpoint client.
+
+Spreads chat-completion traffic over several (base_url, api_key) endpoints —
+extra OpenAI keys or self-hosted OpenAI-compatible servers (vLLM, llama.cpp,
+TGI, …) — behind the same ``client.chat.completions.create`` interface the
+engine already uses, so it can be installed as ``config.client``.
+
+• Each endpoint gets its own openai.OpenAI over an httpx connection pool
+  with keep-alive (limits from the Endpoint definition).
+• Routing: endpoints are filtered by group and served model, then picked by
+  policy — "least_outstanding" (default), "quota" (most remaining requests
+  from x-ratelimit-* headers) or "round_robin".
+• Health: after ``eject_after`` consecutive retryable failures an endpoint is
+  ejected for a cooldown that doubles on every re-ejection; once the cooldown
+  expires it is probed again and fully re-admitted on the first success.
+• Retryable failures (429, 5xx, connection / timeout errors) fail over to
+  another eligible endpoint; other 4xx errors and anything else (e.g. a bad
+  request argument) are raised immediately and never count toward ejection.
+
+Configure with config.ENDPOINTS (see config.py); a DEBATERS entry can pin
+a group with ``"endpoint_group": "<name>"``.
+"""
+import functools
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+
+POLICIES = ("least_outstanding", "quota", "round_robin")
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    base_url: Optional[str] = None              # None → api.openai.com
+    api_key: Optional[str] = None               # literal key (prefer api_key_env)
+    api_key_env: str = "OPENAI_API_KEY"         # env var read when api_key is None
+    group: str = "default"
+    models: Optional[Sequence[str]] = None      # served models; None → any (prefix match)
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 30.0
+    timeout: float = 120.0
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Endpoint":
+        d = dict(d)
+        if d.get("models") is not None:
+            d["models"] = tuple(d["models"])
+        return cls(**d)
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or any(model.startswith(m) for m in self.models)
+
+
+def _default_factory(ep: Endpoint):
+    """openai.OpenAI with a tuned, keep-alive httpx pool for *ep*."""
+    import httpx
+    import openai
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=ep.max_connections,
+            max_keepalive_connections=ep.max_keepalive_connections,
+            keepalive_expiry=ep.keepalive_expiry,
+        ),
+        timeout=ep.timeout,
+    )
+    return openai.OpenAI(
+        api_key=ep.api_key or os.getenv(ep.api_key_env) or "EMPTY",   # local servers ignore it
+        base_url=ep.base_url,
+        http_client=http_client,
+        max_retries=0,          # the pool does the fail-over
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _connection_errors() -> tuple:
+    """Transport-level exception types of whichever client stack is installed."""
+    errors = []
+    try:
+        import openai
+        errors += [openai.APIConnectionError, openai.APITimeoutError]
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(exc, _connection_errors())
+
+
+def _header_int(headers, key: str) -> Optional[int]:
+    try:
+        v = headers.get(key)
+        return int(v) if v is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _EndpointState:
+    def __init__(self, ep: Endpoint, client):
+        self.ep = ep
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0               # consecutive retryable failures
+        self.ejections = 0              # consecutive ejections (backoff exponent)
+        self.ejected_until = 0.0
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.calls = 0
+        self.errors = 0
+        self.latency_s = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def to_dict(self) -> dict:
+        return {
+            "group": self.ep.group,
+            "base_url": self.ep.base_url,
+            "calls": self.calls,
+            "errors": self.errors,
+            "outstanding": self.outstanding,
+            "ejections": self.ejections,
+            "ejected": time.monotonic() < self.ejected_until,
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "mean_latency_s": (self.latency_s / self.calls) if self.calls else 0.0,
+        }
+
+
+class NoEndpointAvailable(RuntimeError):
+    pass
+
+
+class ClientPool:
+    """Load-balancing, health-checking pool of OpenAI-compatible clients."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        policy: str = "least_outstanding",
+        eject_after: int = 3,
+        cooldown_s: float = 5.0,
+        max_cooldown_s: float = 120.0,
+        max_attempts: Optional[int] = None,
+        client_factory: Callable[[Endpoint], object] = _default_factory,
+    ):
+        if not endpoints:
+            raise ValueError("ClientPool needs at least one endpoint")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown routing policy {policy!r}; choose from {POLICIES}")
+        self.policy = policy
+        self.eject_after = eject_after
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.max_attempts = max_attempts or min(3, len(endpoints))
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+        self._states: List[_EndpointState] = [
+            _EndpointState(ep, client_factory(ep)) for ep in endpoints
+        ]
+        self.chat = SimpleNamespace(completions=_PoolCompletions(self, None))
+
+    @classmethod
+    def from_config(cls, endpoint_dicts, **kw) -> "ClientPool":
+        return cls([Endpoint.from_dict(d) for d in endpoint_dicts], **kw)
+
+    # ---------- public ----------------------------------------------------
+    def group(self, name: Optional[str]) -> "_PoolView":
+        """Client-like view restricted to endpoints of group *name*."""
+        return _PoolView(self, name)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {s.ep.name: s.to_dict() for s in self._states}
+
+    # ---------- routing -----------------------------------------------------
+    def _pick(self, model: str, group: Optional[str], exclude: set) -> _EndpointState:
+        now = time.monotonic()
+        with self._lock:
+            cands = [
+                s for s in self._states
+                if (group is None or s.ep.group == group)
+                and s.ep.serves(model) and id(s) not in exclude
+            ]
+            if not cands:
+                raise NoEndpointAvailable(f"no endpoint serves model={model!r} group={group!r}")
+            healthy = [s for s in cands if s.healthy(now)]
+            if not healthy:
+                # everything ejected: probe the one whose cooldown ends first
+                chosen = min(cands, key=lambda s: s.ejected_until)
+            elif self.policy == "round_robin":
+                chosen = healthy[next(self._rr) % len(healthy)]
+            elif self.policy == "quota":
+                # unknown quota counts as plentiful; ties → fewest in flight
+                chosen = max(
+                    healthy,
+                    key=lambda s: (s.remaining_requests if s.remaining_requests is not None
+                                   else float("inf"), -s.outstanding),
+                )
+            else:
+                chosen = min(healthy, key=lambda s: (s.outstanding, s.calls))
+            chosen.outstanding += 1
+            return chosen
+
+    def _done(self, s: _EndpointState, ok: bool, latency: float, headers=None,
+              retryable: bool = True) -> None:
+        with self._lock:
+            s.outstanding -= 1
+            s.calls += 1
+            s.latency_s += latency
+            if headers is not None:
+                rr = _header_int(headers, "x-ratelimit-remaining-requests")
+                rt = _header_int(headers, "x-ratelimit-remaining-tokens")
+                if rr is not None:
+                    s.remaining_requests = rr
+                if rt is not None:
+                    s.remaining_tokens = rt
+            if ok:
+                s.failures = 0
+                s.ejections = 0
+                s.ejected_until = 0.0
+                return
+            s.errors += 1
+            if not retryable:
+                return
+            s.failures += 1
+            if s.failures >= self.eject_after or s.ejections:
+                # first ejection after eject_after failures; a failed probe re-ejects at once
+                s.ejections += 1
+                s.failures = 0
+                backoff = min(self.max_cooldown_s, self.cooldown_s * 2 ** (s.ejections - 1))
+                s.ejected_until = time.monotonic() + backoff
+
+    def _create(self, group: Optional[str], **kwargs):
+        model = kwargs.get("model", "")
+        tried: set = set()
+        last_exc: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            try:
+                s = self._pick(model, group, tried)
+            except NoEndpointAvailable:
+                if last_exc is not None:
+                    raise last_exc
+                raise
+            tried.add(id(s))
+            t0 = time.monotonic()
+            try:
+                completions = s.client.chat.completions
+                raw_api = getattr(completions, "with_raw_response", None)
+                if raw_api is not None:
+                    raw = raw_api.create(**kwargs)
+                    result, headers = raw.parse(), raw.headers
+                else:
+                    result, headers = completions.create(**kwargs), None
+            except Exception as exc:
+                retryable = _is_retryable(exc)
+                headers = getattr(getattr(exc, "response", None), "headers", None)
+                self._done(s, False, time.monotonic() - t0, headers, retryable)
+                if not retryable:
+                    raise
+                last_exc = exc
+                continue
+            self._done(s, True, time.monotonic() - t0, headers)
+            return result
+        raise last_exc
+
+
+class _PoolCompletions:
+    def __init__(self, pool: ClientPool, group: Optional[str]):
+        self._pool = pool
+        self._group = group
+
+    def create(self, **kwargs):
+        return self._pool._create(self._group, **kwargs)
+
+
+class _PoolView:
+    def __init__(self, pool: ClientPool, group: Optional[str]):
+        self.pool = pool
+        self.chat = SimpleNamespace(completions=_PoolCompletions(pool, group))
+
+    def group(self, name: Optional[str]) -> "_PoolView":
+        return self.pool.group(name)
@@ -0,0 +1,166 @@
+"""
+Context corpora and the precomputed context variants matches are played on.
+
+A ContextRegistry loads N named corpora once (config.CORPORA, or
+run_debate.py --ctx NAME=PATH) and builds every concatenation a run needs up
+front as an immutable ContextVariant: its text, UTF-8 byte length, SHA-256
+and offline token count. The schedule hands each match a variant id; the
+engine looks the variant up instead of concatenating the documents again.
+
+• Variant ids are the corpus names joined by "+" in reading order ("P5+FCC",
+  "FCC+P5", "P5+FCC+CEPC"), which is what match["context_order"] has always
+  recorded.
+• Orderings (--context-order): "canonical" / "p5_first" – registration order;
+  "reversed" / "fcc_first" – reverse; "alternate" – canonical on odd match
+  ids, reversed on even; "random" – a seeded uniform draw over every
+  permutation (N! variants, so keep N small).
+• Subsets (config.CONTEXT_SUBSET): "all" – every match reads every corpus;
+  "stances" – a match reads only the corpora of its two stances, ordered as
+  above.
+• Stances are the corpus names. Each corpus carries the stance instruction
+  given to the side arguing it (config.CORPORA[name]["stance"], default
+  "Emphasise the <name> roadmap."). With two corpora the schedule, the
+  variants and the logs are those of the former --ctx-p5 / --ctx-fcc runs.
+"""
+import hashlib
+import itertools
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+from .utils_openai import count_tokens
+
+ORDER_MODES = ("canonical", "reversed", "alternate", "random", "p5_first", "fcc_first")
+_ALIASES = {"p5_first": "canonical", "fcc_first": "reversed"}
+SEPARATOR = "\n\n"
+
+
+def stance_text(name: str) -> str:
+    """Instruction for the side arguing corpus *name*."""
+    spec = getattr(config, "CORPORA", {}).get(name) or {}
+    return spec.get("stance") or f"Emphasise the {name} roadmap."
+
+
+@dataclass(frozen=True)
+class Corpus:
+    name: str
+    text: str
+    path: Optional[str] = None
+    stance: str = ""
+
+
+@dataclass(frozen=True)
+class ContextVariant:
+    id: str
+    corpora: Tuple[str, ...]
+    text: str
+    bytes: int
+    sha256: str
+    tokens: int
+
+    def to_dict(self) -> dict:
+        return {"corpora": list(self.corpora), "bytes": self.bytes,
+                "sha256": self.sha256, "tokens": self.tokens}
+
+
+class ContextRegistry:
+    """Named corpora (in registration order) and the variants built from them."""
+
+    def __init__(self):
+        self._corpora: Dict[str, Corpus] = {}
+        self._variants: Dict[str, ContextVariant] = {}
+
+    # ---- loading ------------------------------------------------------
+    def add(self, name: str, text: str, path=None, stance: Optional[str] = None) -> Corpus:
+        if "+" in name or not name:
+            raise ValueError(f"corpus name {name!r} must be non-empty and contain no '+'")
+        if name in self._corpora:
+            raise ValueError(f"corpus {name!r} registered twice")
+        c = Corpus(name, text, str(path) if path is not None else None, stance or stance_text(name))
+        self._corpora[name] = c
+        return c
+
+    @classmethod
+    def from_texts(cls, texts: Dict[str, str]) -> "ContextRegistry":
+        reg = cls()
+        for name, text in texts.items():
+            reg.add(name, text)
+        return reg
+
+    @classmethod
+    def from_paths(cls, paths: Dict[str, str]) -> "ContextRegistry":
+        """Load each file once, in the given order."""
+        reg = cls()
+        for name, path in paths.items():
+            reg.add(name, Path(path).read_text(encoding="utf-8"), path=path)
+        return reg
+
+    @classmethod
+    def from_config(cls) -> "ContextRegistry":
+        return cls.from_paths({name: spec["path"] for name, spec in config.CORPORA.items()})
+
+    # ---- corpora ------------------------------------------------------
+    @property
+    def names(self) -> List[str]:
+        return list(self._corpora)
+
+    def corpus(self, name: str) -> Corpus:
+        return self._corpora[name]
+
+    def stance_pairs(self) -> List[Tuple[str, str]]:
+        """Every unordered pair of stances, in registration order."""
+        return list(itertools.combinations(self._corpora, 2))
+
+    # ---- variants -----------------------------------------------------
+    def variant(self, key) -> ContextVariant:
+        """The variant for an id ("P5+FCC") or a sequence of corpus names; built once."""
+        names = tuple(key.split("+")) if isinstance(key, str) else tuple(key)
+        vid = "+".join(names)
+        v = self._variants.get(vid)
+        if v is None:
+            missing = [n for n in names if n not in self._corpora]
+            if missing or len(set(names)) != len(names):
+                raise KeyError(f"context variant {vid!r}: unknown or repeated corpora {missing}")
+            text = SEPARATOR.join(self._corpora[n].text for n in names)
+            data = text.encode("utf-8")
+            v = self._variants[vid] = ContextVariant(
+                vid, names, text, len(data), hashlib.sha256(data).hexdigest(),
+                count_tokens(text, config.MODEL))
+        return v
+
+    def orderings(self, mode: str, subset: Optional[Sequence[str]] = None) -> List[ContextVariant]:
+        """
+        The variants *mode* draws from for *subset* (default: all corpora),
+        built now; the first is the mode's default ordering.
+        """
+        mode = _ALIASES.get(mode, mode)
+        base = [n for n in self._corpora if subset is None or n in subset]
+        if mode == "canonical":
+            orders = [base]
+        elif mode == "reversed":
+            orders = [base[::-1]]
+        elif mode == "alternate":
+            orders = [base, base[::-1]] if len(base) > 1 else [base]
+        elif mode == "random":
+            orders = list(itertools.permutations(base))
+        else:
+            raise ValueError(f"unknown context order {mode!r}; expected one of {ORDER_MODES}")
+        return [self.variant(o) for o in orders]
+
+    def pick(self, mode: str, options: List[ContextVariant], match_id: int, rng) -> ContextVariant:
+        """The variant for one match (orderings() output for the same *mode*)."""
+        mode = _ALIASES.get(mode, mode)
+        if mode == "alternate":
+            return options[(match_id - 1) % len(options)]
+        if mode == "random":
+            return options[int(rng.random() * len(options))]
+        return options[0]
+
+    def variants(self) -> Dict[str, ContextVariant]:
+        """Every variant built so far, by id."""
+        return dict(self._variants)
+
+    def metadata(self) -> dict:
+        """JSON-friendly summary of the built variants (for _stats.json)."""
+        return {vid: v.to_dict() for vid, v in self._variants.items()}
@@ -0,0 +1,93 @@
+"""
+Stateful debate turns via server-side conversation state.
+
+Full-history mode re-uploads the whole ``messages`` array (context plus every
+earlier turn) on each turn, so payload bytes grow quadratically over a match.
+In stateful mode each turn is a Responses-API call chained with
+``previous_response_id``: the server already holds the history, so only the
+messages added since the last response (normally the next speaker's
+instruction) are sent.
+
+• The chain starts with one full-history Responses call; the opening comes
+  from chat.completions (n=boN) and is sent as part of that first input.
+• A chain is tied to one endpoint group; a turn routed to another group, or
+  a streamed (chat.completions) turn, restarts it with full history.
+• Backends that do not declare ``Capabilities.stateful`` (the local
+  backends), whose client has no Responses endpoint (respond() raises
+  NotImplementedError), or that answer 404/405/501 on the first call, fall
+  back to full-history chat for the rest of the match.
+• Server-side history keeps each turn's raw output. When cleanup changed it
+  (source tags removed, tail trimmed to a sentence boundary) the engine
+  breaks the chain, so the next turn resends the cleaned history and every
+  turn is conditioned on exactly what full-history mode would send.
+
+Enable with config.STATEFUL_TURNS or a debater's ``"stateful": True``.
+"""
+import json
+from typing import Optional
+
+_UNSUPPORTED_STATUS = (404, 405, 501)
+
+
+def payload_bytes(payload: dict) -> int:
+    """Size of a request body as the SDK would serialise it (JSON, UTF-8)."""
+    return len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def _unsupported(exc: Exception) -> bool:
+    # backends raise NotImplementedError for a missing Responses endpoint; any
+    # other error (AttributeError included) is a real failure and propagates
+    if isinstance(exc, NotImplementedError):
+        return True
+    return getattr(exc, "status_code", None) in _UNSUPPORTED_STATUS
+
+
+class StatefulConversation:
+    """previous_response_id chain for one match."""
+
+    def __init__(self):
+        self.last_id: Optional[str] = None
+        self.group: Optional[str] = None
+        self.synced = 0                 # len(messages) the server already holds
+        self.disabled_reason: Optional[str] = None
+
+    def available(self, backend, model: str) -> bool:
+        if self.disabled_reason is None and not backend.capabilities(model).stateful:
+            self.disabled_reason = f"{backend.name} backend has no server-side conversation state"
+        return self.disabled_reason is None
+
+    def break_chain(self) -> None:
+        self.last_id = None
+
+    def create(self, backend, group: Optional[str], model: str, messages,
+               temperature: Optional[float], max_tokens: Optional[int]):
+        """
+        One turn. Returns {"content", "usage", "request_bytes", "chained"}, or
+        None when the backend turned out not to support server-side state
+        (the caller then sends the turn with full history).
+        """
+        chained = self.last_id is not None and group == self.group
+        kwargs = {
+            "model": model,
+            "input": messages[self.synced:] if chained else list(messages),
+            "previous_response_id": self.last_id if chained else None,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        try:
+            resp = backend.respond(**kwargs)
+        except Exception as exc:
+            if not _unsupported(exc):
+                raise
+            self.disabled_reason = f"{type(exc).__name__}: {exc}"[:200]
+            self.last_id = None
+            return None
+        self.last_id = resp.id
+        self.group = group
+        self.synced = len(messages) + 1     # + the assistant reply the caller appends
+        return {
+            "content": resp.text,
+            "usage": resp.usage,
+            "request_bytes": payload_bytes({k: v for k, v in kwargs.items() if v is not None}),
+            "chained": chained,
+        }
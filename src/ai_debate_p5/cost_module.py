@@ -0,0 +1,156 @@
+"""
+Cost accounting and budget caps.
+
+Every API call is recorded in a CostLedger under (stage, model, debater);
+prices come from config.MODEL_PRICING (USD per 1M tokens, with a separate
+rate for cached prompt tokens). A Budget is checked by run_all_matches
+before scheduling each new match, so a run that hits its cap stops cleanly
+with every finished match fully accounted for.
+"""
+import threading
+from typing import Optional
+
+import config
+
+JUDGE_ID = "judge"   # ledger key for judge calls (not a debater)
+
+
+def _price_for(model: str) -> Optional[dict]:
+    """Exact match first, then the longest pricing key that prefixes *model*."""
+    table = getattr(config, "MODEL_PRICING", {}) or {}
+    if model in table:
+        return table[model]
+    best = max((k for k in table if model.startswith(k)), key=len, default=None)
+    return table[best] if best else None
+
+
+def cached_tokens_of(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens, or 0 when not reported."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None and isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details")
+    if details is None:
+        return 0
+    if isinstance(details, dict):
+        return int(details.get("cached_tokens") or 0)
+    return int(getattr(details, "cached_tokens", 0) or 0)
+
+
+def price_tokens(model: str, prompt_tokens: int, completion_tokens: int,
+                 cached_tokens: int = 0) -> float:
+    """USD cost of one call; 0.0 for models missing from MODEL_PRICING."""
+    rates = _price_for(model)
+    if rates is None:
+        return 0.0
+    cached = min(cached_tokens, prompt_tokens)
+    uncached = prompt_tokens - cached
+    return (
+        uncached * rates["prompt"]
+        + cached * rates.get("cached_prompt", rates["prompt"])
+        + completion_tokens * rates["completion"]
+    ) / 1_000_000
+
+
+def _empty_bucket() -> dict:
+    return {
+        "calls": 0,
+        "prompt_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": 0.0,
+    }
+
+
+def _add(bucket: dict, p: int, c: int, cached: int, cost: float) -> None:
+    bucket["calls"] += 1
+    bucket["prompt_tokens"] += p
+    bucket["cached_prompt_tokens"] += cached
+    bucket["completion_tokens"] += c
+    bucket["cost_usd"] += cost
+
+
+class CostLedger:
+    """Thread-safe per-debater / per-model / per-stage token and cost ledger."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.total = _empty_bucket()
+        self.by_debater = {}
+        self.by_model = {}
+        self.by_stage = {}
+        self.by_debater_stage = {}
+        self.unpriced_models = set()
+
+    def record(self, stage: str, model: str, usage, debater_id: Optional[str] = None) -> float:
+        """Record one call's *usage* object; returns its cost in USD."""
+        p = int(getattr(usage, "prompt_tokens", 0) or 0)
+        c = int(getattr(usage, "completion_tokens", 0) or 0)
+        return self.record_tokens(stage, model, p, c, cached_tokens_of(usage), debater_id)
+
+    def record_tokens(self, stage: str, model: str, prompt_tokens: int,
+                      completion_tokens: int, cached_tokens: int = 0,
+                      debater_id: Optional[str] = None) -> float:
+        cost = price_tokens(model, prompt_tokens, completion_tokens, cached_tokens)
+        who = debater_id or JUDGE_ID
+        with self._lock:
+            if _price_for(model) is None:
+                self.unpriced_models.add(model)
+            for bucket in (
+                self.total,
+                self.by_debater.setdefault(who, _empty_bucket()),
+                self.by_model.setdefault(model, _empty_bucket()),
+                self.by_stage.setdefault(stage, _empty_bucket()),
+                self.by_debater_stage.setdefault(who, {}).setdefault(stage, _empty_bucket()),
+            ):
+                _add(bucket, prompt_tokens, completion_tokens, cached_tokens, cost)
+        return cost
+
+    @property
+    def total_cost(self) -> float:
+        return self.total["cost_usd"]
+
+    @property
+    def total_tokens(self) -> int:
+        return self.total["prompt_tokens"] + self.total["completion_tokens"]
+
+    def to_dict(self) -> dict:
+        """JSON-friendly snapshot for the stats output."""
+        with self._lock:
+            return {
+                "total": dict(self.total),
+                "by_debater": {k: dict(v) for k, v in self.by_debater.items()},
+                "by_model": {k: dict(v) for k, v in self.by_model.items()},
+                "by_stage": {k: dict(v) for k, v in self.by_stage.items()},
+                "by_debater_stage": {
+                    d: {s: dict(b) for s, b in st.items()}
+                    for d, st in self.by_debater_stage.items()
+                },
+                "unpriced_models": sorted(self.unpriced_models),
+            }
+
+
+# Process-wide ledger, mirrors stats_module.global_stats
+ledger = CostLedger()
+
+
+class Budget:
+    """Hard caps on run-level spend; None disables a cap."""
+
+    def __init__(self, max_cost: Optional[float] = None, max_tokens: Optional[int] = None):
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+
+    def exceeded(self, led: Optional[CostLedger] = None) -> Optional[str]:
+        """Reason string if a cap has been reached, else None."""
+        led = led or ledger
+        if self.max_cost is not None and led.total_cost >= self.max_cost:
+            return f"max_cost reached (${led.total_cost:.4f} >= ${self.max_cost:.4f})"
+        if self.max_tokens is not None and led.total_tokens >= self.max_tokens:
+            return f"max_tokens reached ({led.total_tokens} >= {self.max_tokens})"
+        return None
+
+    def to_dict(self) -> dict:
+        return {"max_cost_usd": self.max_cost, "max_tokens": self.max_tokens}
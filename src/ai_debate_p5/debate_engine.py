@@ -1,20 +1,35 @@
 import time
-import re
 import json
-import openai
 from datetime import datetime
 import config
-from config import client, SIDE_A_LABEL, SIDE_B_LABEL 
-from .utils_openai import chat_extra_kwargs, supports_logprobs
+from config import SIDE_A_LABEL, SIDE_B_LABEL
+from .utils_openai import chat_extra_kwargs, count_tokens
+from .backends import get_backend
+from .opening_sampler import best_of_n
+from .streaming import stream_completion, SOURCE_TAG_RE, _END_PUNCT
 from itertools import product
 import random
-from collections import Counter, defaultdict
 
-from .judge_module import judge_debate
-from .stats_module import global_stats, update_turn_stats, update_match_stats
+from .judge_module import judge_debate, probe_debate, sampled
+from .stats_module import (global_stats, update_turn_stats, update_match_stats,
+                           update_opening_stats, update_turn_timing, update_early_stop_stats,
+                           update_conversation_stats, update_call_stats,
+                           update_context_order_stats, update_tree_stats,
+                           prompt_cache_stats)
+from . import events
+from .cost_module import ledger as cost_ledger, Budget, cached_tokens_of, price_tokens
+from .prompt_layout import context_prefix, opening_instruction, turn_instruction
+from .conversation import StatefulConversation, payload_bytes
+from .hedging import hedger
+from .debate_tree import active_tree, NO_SLOT
+from .profiling import stage as profile_stage
+from . import digests
+from . import scheduler
+from .records import MatchLog, spill_store
+from .contexts import ContextRegistry, stance_text
 from typing import Optional, Dict
 
-_END_PUNCT = re.compile(r'[.!?]["”\']?\s*$')
+SIDE_EMOJI = {SIDE_A_LABEL: "🔵", SIDE_B_LABEL: "🔴"}
 
 
 def _trim_to_sentence_boundary(text: str, tail: int = 300) -> str:
@@ -36,63 +51,208 @@ def generate_openings(
         temperature: float,
         model_name: str,
         static_context,
-        initial_topic):
+        initial_topic,
+        endpoint_group=None,
+        sampling: Optional[dict] = None,
+        stance_text: Optional[str] = None):
     """
-    Generate *boN* candidate opening arguments for the given side, then
-    return the single draft with the highest summed log-probability.
-
-    This version batches the request: we make ONE ChatCompletion call
-    with n=boN completions, so the large static_context is transmitted
-    only once.  The return value is a dict with keys:
-        • 'text'  - the chosen opening argument (str)
-        • 'usage' - the OpenAI usage object for cost tracking
+    Generate up to *boN* candidate opening arguments for the given side and
+    return the best-scoring draft (see opening_sampler for modes/scorers).
+
+    Default ("batch") mode makes ONE ChatCompletion call with n=boN, so the
+    large static_context is transmitted only once, and keeps the draft with
+    the highest summed log-probability. *sampling* carries the debater's
+    optional boN_* keys (adaptive waves, scorer, sub-request split).
+    Messages follow prompt_layout: the shared system + context prefix, then
+    the side/stance instruction (*stance_text*, default config.SIDE_STANCE).
+    The return value is a dict with keys:
+        • 'text'        - the chosen opening argument (str)
+        • 'usage'       - combined usage object for cost tracking
+        • 'usages'      - one usage per request (waves / sub-requests)
+        • 'n_generated' - candidates actually generated (≤ boN)
+    plus sampler diagnostics ('waves', 'score', 'scorer', 'scorer_usages',
+    'scorer_failures', 'scorer_fallback').
     """
-    stance_text = config.SIDE_STANCE.get(side, "")
-    prompt = (
-    f"You are a debater advocating for {side}. {stance_text}\n\n"
-    f"Debate topic: {initial_topic}\n\n"
-    f"Context:\n{static_context}\n\n"
-    "Please write your opening argument. Use only the provided context."
-)
-
-    want_logprobs = supports_logprobs(model_name)
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {
-                "role": "system",
-                "content": config.SYSTEM_PROMPT,
-            },
-            {"role": "user", "content": prompt},
-        ],
-        n=boN,                                     # generate boN completions
-        **chat_extra_kwargs(model_name, temperature),
-        logprobs=want_logprobs,
-    )
+    if stance_text is None:
+        stance_text = config.SIDE_STANCE.get(side, "")
+    with profile_stage("prompt_build"):
+        messages = context_prefix(static_context, initial_topic) + [
+            opening_instruction(side, stance_text),
+        ]
+    with profile_stage("api"):
+        return best_of_n(messages, boN, model_name, temperature,
+                         endpoint_group=endpoint_group, sampling=sampling, side=side)
+
+
+def _generate_opening(match_id, d: dict, speaker: str, stance_text: str,
+                      static_context, initial_topic, messages, match_data, bus) -> None:
+    """Best-of-N opening (turn 1): sampled, recorded and appended to the transcript."""
+    result = generate_openings(
+            side=speaker,   
+            boN=d["boN"],
+            temperature=d["temperature"],
+            model_name=d["model"],
+            static_context=static_context,
+            initial_topic=initial_topic,
+            endpoint_group=d.get("endpoint_group"),
+            sampling=d,
+            stance_text=stance_text,
+        )
+    selected_opening = result["text"]
+    with profile_stage("cleanup"):
+        selected_opening = _trim_to_sentence_boundary(selected_opening)
 
-    best_draft = None
-    best_score = -float("inf")
+    usage_info       = result["usage"]
+    for u in result["usages"]:
+        cost_ledger.record("opening", d["model"], u, debater_id=d["id"])
+        update_call_stats("opening", u.prompt_tokens, u.completion_tokens, debater_id=d["id"])
+    for u in result["scorer_usages"]:
+        cost_ledger.record("opening_score", config.OPENING_SCORER_MODEL, u, debater_id=d["id"])
+        update_call_stats("opening_score", u.prompt_tokens, u.completion_tokens, debater_id=d["id"])
+    n_generated = max(1, result["n_generated"])
+    best_completion_tokens = min(config.MAX_TOKENS_PER_RESPONSE,
+                             usage_info.completion_tokens // n_generated)
+    update_opening_stats(d["id"], requested=d["boN"], generated=n_generated,
+                         completion_tokens=usage_info.completion_tokens,
+                         waves=result["waves"], scorer_failures=result["scorer_failures"])
+
+    # Round header then the opening (Turn 1)
+    bus.emit(events.ROUND_STARTED, match_id=match_id, round_number=1)
+    bus.emit(events.TURN_COMPLETED, match_id=match_id, turn_number=1,
+             speaker=speaker, content=selected_opening,
+             prompt_tokens=usage_info.prompt_tokens,
+             completion_tokens=usage_info.completion_tokens,
+             total_tokens=usage_info.total_tokens)
+
+    messages.append({"role": "assistant", "content": selected_opening})
+    match_data["turns"].append({
+        "turn_number": 1,
+        "speaker": speaker,
+        "tokens_used_prompt": usage_info.prompt_tokens,
+        "tokens_used_completion": best_completion_tokens,
+        "tokens_used_completion_all": usage_info.completion_tokens,
+        "tokens_cached_prompt": cached_tokens_of(usage_info),
+        "content": selected_opening
+    })
+    update_turn_stats(usage_info.prompt_tokens, best_completion_tokens)
 
-    for choice in response.choices:
-        draft = choice.message.content.strip()
 
-        if want_logprobs:
-            lp_obj = choice.logprobs
-            token_logps = (
-                lp_obj.token_logprobs
-                if hasattr(lp_obj, "token_logprobs")
-                else [tok.logprob for tok in lp_obj.content]
+def _generate_turn(match_id, turn: int, speaker: str, d: dict, messages, match_data,
+                   conv: StatefulConversation, bus) -> None:
+    """One debate turn after the opening: generated, recorded and appended."""
+    model_name  = d["model"]
+    temperature = d["temperature"]
+    backend = get_backend(model_name, d.get("endpoint_group"))
+    timing = None
+    usage_estimated = False
+    with profile_stage("prompt_build"):
+        full_bytes = payload_bytes({"model": model_name, "messages": messages,
+                                    **chat_extra_kwargs(model_name, temperature)})
+    request_bytes = full_bytes
+    stateful_result = None
+    if d.get("stream", config.STREAM_TURNS) and backend.capabilities(model_name).streaming:
+        conv.break_chain()      # chat.completions turn: the server chain misses it
+        # streamed: tags cleaned incrementally, closed at a sentence boundary
+        with profile_stage("api"):
+            sr = stream_completion(
+                backend,
+                model=model_name,
+                messages=messages,
+                soft_budget=config.STREAM_SOFT_TOKEN_BUDGET,
+                temperature=temperature,
+                max_tokens=config.MAX_TOKENS_PER_RESPONSE,
             )
-            score = sum(token_logps)
+        usage = sr.usage
+        usage_estimated = sr.usage_estimated
+        raw_clean = sr.content
+        timing = sr.timing()
+    else:
+        t_call = time.perf_counter()
+        if d.get("stateful", config.STATEFUL_TURNS) and conv.available(backend, model_name):
+            # only the messages added since the last response are sent
+            with profile_stage("api"):
+                stateful_result = conv.create(backend, d.get("endpoint_group"), model_name,
+                                              messages, temperature, config.MAX_TOKENS_PER_RESPONSE)
+        if stateful_result is not None:
+            usage = stateful_result["usage"]
+            request_bytes = stateful_result["request_bytes"]
+            raw_text = stateful_result["content"]
         else:
-            score = 0.0
+            conv.break_chain()
+            sent = list(messages)       # a losing duplicate may outlive this turn
+            with profile_stage("api"):
+                response = hedger.call(
+                    backend, model_name, "turn",
+                    lambda b: b.generate(model_name, sent, temperature=temperature,
+                                         max_tokens=config.MAX_TOKENS_PER_RESPONSE),
+                    debater_id=d["id"], endpoint_group=d.get("endpoint_group"),
+                )
+            usage = response.usage
+            raw_text = response.text
+        call_s = time.perf_counter() - t_call
+        with profile_stage("cleanup"):
+            raw_clean = SOURCE_TAG_RE.sub('', raw_text).strip()
+    cost_ledger.record("turn", model_name, usage, debater_id=d["id"])
+    update_call_stats("turn", usage.prompt_tokens, usage.completion_tokens, debater_id=d["id"])
+    with profile_stage("cleanup"):
+        cleaned_content = _trim_to_sentence_boundary(raw_clean)
+        # completion tokens paid for but thrown away by the trim
+        wasted = count_tokens(raw_clean[len(cleaned_content):], model_name) \
+            if len(cleaned_content) < len(raw_clean) else 0
+    if stateful_result is not None and cleaned_content != raw_text.strip():
+        # the server holds the raw reply (tags / cut tail); resend the cleaned history
+        conv.break_chain()
+    update_turn_timing(
+        completion_tokens=usage.completion_tokens,
+        wasted_tail_tokens=wasted,
+        total_s=(timing["total_s"] if timing else call_s),
+        ttft_s=(timing["ttft_s"] if timing else None),
+        tokens_per_s=(timing["tokens_per_s"] if timing else None),
+        stopped_early=bool(timing and timing["stopped_early"]),
+    )
 
-        if score > best_score:
-            best_score = score
-            best_draft = draft
+    bus.emit(events.TURN_COMPLETED, match_id=match_id, turn_number=turn,
+             speaker=speaker, content=cleaned_content,
+             prompt_tokens=usage.prompt_tokens,
+             completion_tokens=usage.completion_tokens,
+             total_tokens=usage.total_tokens)
 
-    best_usage = response.usage   # aggregated stats for all n completions
-    return {"text": best_draft, "usage": best_usage}
+    messages.append({"role": "assistant", "content": cleaned_content})
+    match_data["turns"].append({
+        "turn_number": turn,
+        "speaker": speaker,
+        "tokens_used_prompt": usage.prompt_tokens,
+        "tokens_used_completion": usage.completion_tokens,
+        "tokens_cached_prompt": cached_tokens_of(usage),
+        "request_bytes": request_bytes,
+        "content": cleaned_content
+    })
+    update_conversation_stats(request_bytes, full_bytes,
+                              stateful=stateful_result is not None,
+                              chained=bool(stateful_result and stateful_result["chained"]))
+    if timing is not None:
+        match_data["turns"][-1]["timing"] = timing
+    if usage_estimated:
+        match_data["turns"][-1]["usage_estimated"] = True
+    update_turn_stats(usage.prompt_tokens,usage.completion_tokens)
+
+
+def _replay_turn(node: dict, messages, match_data, bus, match_id) -> None:
+    """Append a turn stored in the debate tree; no model call, nothing billed."""
+    turn = {**node["turn"], "reused_node": node["id"]}
+    bus.emit(events.TURN_COMPLETED, match_id=match_id, turn_number=turn["turn_number"],
+             speaker=turn["speaker"], content=turn["content"],
+             prompt_tokens=0, completion_tokens=0, total_tokens=0, reused=True)
+    messages.append({"role": "assistant", "content": turn["content"]})
+    match_data["turns"].append(turn)
+    _count_tree_turn(node["model"], turn, reused=True)
+
+
+def _count_tree_turn(model: str, turn: dict, reused: bool) -> None:
+    p = turn["tokens_used_prompt"]
+    c = turn.get("tokens_used_completion_all", turn["tokens_used_completion"])
+    cached = turn.get("tokens_cached_prompt", 0)
+    update_tree_stats(p, c, price_tokens(model, p, c, cached), reused=reused)
 
 
 def run_debate_match(match_id,
@@ -103,11 +263,34 @@ def run_debate_match(match_id,
                      side_a_starts: bool,
                      progress_turn_cb=None,
                      quiet=False,
-                     label_to_stance: Optional[Dict[str, str]] = None):
+                     label_to_stance: Optional[Dict[str, str]] = None,
+                     bus: Optional[events.EventBus] = None,
+                     turns_per_match: Optional[int] = None,
+                     branch: int = 0,
+                     stance_texts: Optional[Dict[str, str]] = None):
     """
     Runs one complete debate match.
+    Progress is reported as events on *bus* (default: events.bus).
+    *turns_per_match* defaults to config.TURNS_PER_MATCH; with config.EARLY_STOP
+    the match may end sooner (see match_data["early_stop"]).
+    With config.DEBATE_TREE, turns already in the tree (same prefix, speaker
+    and *branch*, normally the repeat index) are replayed instead of
+    generated; replayed turns carry "reused_node".
+    With config.JUDGE_DIGEST, each round is summarized in the background once
+    the next one starts and the judge reads match_data["round_digests"] plus
+    the final round verbatim.
+    *stance_texts* maps each label to its stance instruction (default: the
+    corpus stance of label_to_stance, contexts.stance_text).
     Returns the match data dictionary.
     """
+    bus = bus or events.bus
+    turns_per_match = turns_per_match or config.TURNS_PER_MATCH
+    early_cfg = config.EARLY_STOP
+    calibration = bool(early_cfg) and sampled("calibration", match_id,
+                                              early_cfg.get("calibration_rate", 0.0))
+    probes = []
+    streak_winner, streak = None, 0
+    early_winner = None         # probe winner at the round the match (would have) stopped
     match_data = {
         "match_id": match_id,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -115,13 +298,10 @@ def run_debate_match(match_id,
     }
     
 
-    speakers = [(SIDE_A_LABEL, "🔵"), (SIDE_B_LABEL, "🔴")] if side_a_starts \
-     else [(SIDE_B_LABEL, "🔴"), (SIDE_A_LABEL, "🔵")]
+    speakers = [SIDE_A_LABEL, SIDE_B_LABEL] if side_a_starts \
+     else [SIDE_B_LABEL, SIDE_A_LABEL]
     
     # --- Per-match label→stance assignment (now optionally provided) ---
-    P5_TEXT  = "Emphasise the US P5-aligned roadmap."
-    FCC_TEXT = "Emphasise the FCC-first roadmap."
-
     if label_to_stance is None:
         # Legacy fallback: keep old parity behaviour for back-compat
         flip = (match_id % 2 == 1)
@@ -134,75 +314,42 @@ def run_debate_match(match_id,
     match_data["stance_assignment"] = dict(label_to_stance)
 
     # Map stance strings to the per-label instruction text used in prompts
-    _label_to_text = {
-        SIDE_A_LABEL: (P5_TEXT if label_to_stance[SIDE_A_LABEL] == "P5" else FCC_TEXT),
-        SIDE_B_LABEL: (P5_TEXT if label_to_stance[SIDE_B_LABEL] == "P5" else FCC_TEXT),
+    _label_to_text = stance_texts or {
+        label: stance_text(stance) for label, stance in label_to_stance.items()
     }
 
-    # Temporarily override the global so existing prompt code uses the per-match mapping
-    _SIDE_STANCE_ORIG = config.SIDE_STANCE
-    config.SIDE_STANCE = _label_to_text
-
     debater_map = {
     SIDE_A_LABEL: debater_side_a,  # Strategy 1
     SIDE_B_LABEL: debater_side_b,  # Strategy 2
 }
-    starting_speaker, starting_emoji = speakers[0]
-    side_label = starting_speaker
+    starting_speaker = speakers[0]
 
 
-    messages = [
-        {"role": "system", "content": config.SYSTEM_PROMPT},
-        {"role": "user", "content": f"Debate topic: {initial_topic}\n\nContext:\n{static_context}"}
-    ]
+    # byte-identical for every call on this context (prompt caching)
+    with profile_stage("prompt_build"):
+        messages = context_prefix(static_context, initial_topic)
+    judge_prefix = messages if config.JUDGE_SHARE_CONTEXT_PREFIX else None
 
-    print(f"\nGenerating opening variants for {side_label} side...")
+    bus.emit(events.OPENING_STARTED, match_id=match_id, speaker=starting_speaker)
 
     d = debater_map[starting_speaker]
-    result = generate_openings(
-            side=starting_speaker,   
-            boN=d["boN"],
-            temperature=d["temperature"],
-            model_name=d["model"],
-            static_context=static_context,
-            initial_topic=initial_topic,
-        )
-    selected_opening = result["text"]
-    selected_opening = _trim_to_sentence_boundary(selected_opening)
-
-    usage_info       = result["usage"]
-    best_completion_tokens = min(config.MAX_TOKENS_PER_RESPONSE,
-                             usage_info.completion_tokens // d["boN"])
-
-
-    # Print round header then the opening (Turn 1)
-    print("\n🔁 Starting Round 1")
-    starting_speaker, starting_emoji = speakers[0]
-    print(f"\n{starting_emoji} [Opening Token usage: Prompt tokens: {usage_info.prompt_tokens}, Completion tokens: {usage_info.completion_tokens}, Total tokens: {usage_info.total_tokens}]")
-    print(f"\n{starting_emoji} {starting_speaker}'s Opening Argument (Turn 1):")
-    print(selected_opening)
-
-    messages.append({"role": "assistant", "content": selected_opening})
-    match_data["turns"].append({
-        "turn_number": 1,
-        "speaker": starting_speaker,
-        "tokens_used_prompt": usage_info.prompt_tokens,
-        "tokens_used_completion": best_completion_tokens,
-        "tokens_used_completion_all": usage_info.completion_tokens,
-        "content": selected_opening
-    })
-    update_turn_stats(usage_info.prompt_tokens, best_completion_tokens)
+    tree = active_tree()
+    root = tree.root(static_context, initial_topic) if tree else None
+    node_id = (tree.child(root, starting_speaker, _label_to_text[starting_speaker], d, branch)
+               if tree else None)
+    with profile_stage("opening"), tree.slot(node_id) if tree else NO_SLOT as slot:
+        if slot.node is None:
+            _generate_opening(match_id, d, starting_speaker, _label_to_text[starting_speaker],
+                              static_context, initial_topic, messages, match_data, bus)
+            slot.fill(root, d["model"], match_data["turns"][-1])
+            if tree:
+                _count_tree_turn(d["model"], match_data["turns"][-1], reused=False)
+        else:
+            bus.emit(events.ROUND_STARTED, match_id=match_id, round_number=1)
+            _replay_turn(slot.node, messages, match_data, bus, match_id)
 
-    next_speaker, _ = speakers[1]      # the side that didn't open
-    next_stance = config.SIDE_STANCE.get(next_speaker, "")
-    messages.append({
-    "role": "user",
-    "content": (
-        f"You are advocating for {next_speaker}. {next_stance}\n"
-        "Base your response only on the provided context. Do not include salutations. End on a complete sentence; do not stop mid-sentence.\n\n"
-        f"{next_speaker}, please respond to your opponent."
-    ),
-    })
+    next_speaker = speakers[1]         # the side that didn't open
+    messages.append(turn_instruction(next_speaker, _label_to_text[next_speaker], first_reply=True))
 
 
     if progress_turn_cb and quiet:
@@ -210,80 +357,110 @@ def run_debate_match(match_id,
 
     # Continue debate for subsequent turns
 
-    for turn in range(2, config.TURNS_PER_MATCH + 1):
-        # Print new round header only when entering a new round
+    conv = StatefulConversation()
+    digest_cfg = digests.settings()
+    digester = digests.RoundDigester(digest_cfg) if digest_cfg else None
+    turns_played = 1
+    for turn in range(2, turns_per_match + 1):
+        # New round header only when entering a new round
         if turn > 2 and (turn % 2 == 1):
-            round_number = (turn + 1) // 2
-            print(f"\n🔁 Starting Round {round_number}")
-        
-        current_speaker, emoji = speakers[(turn - 1) % 2]
-        print(f"\n{emoji} {current_speaker}'s Turn {turn}")
+            bus.emit(events.ROUND_STARTED, match_id=match_id, round_number=(turn + 1) // 2)
+            if digester:
+                # the previous round is final now: summarize it while this one plays
+                digester.submit(turn // 2, match_data["turns"][-2:])
 
+        current_speaker = speakers[(turn - 1) % 2]
+        bus.emit(events.TURN_STARTED, match_id=match_id, turn_number=turn, speaker=current_speaker)
 
-        # Get the debater's model and temperature
+
+        # The debater for this turn and its node in the debate tree (if any)
         d = debater_map[current_speaker]
-        model_name  = d["model"]
-        temperature = d["temperature"]
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            **chat_extra_kwargs(model_name, temperature),
-        )
-        content = response.choices[0].message.content
-        usage = response.usage
-        cleaned_content = re.sub(r'【.*?†source】', '', content).strip()
-        cleaned_content = _trim_to_sentence_boundary(cleaned_content)
-
-        print(f"{emoji} [Prompt tokens: {usage.prompt_tokens}, Completion tokens: {usage.completion_tokens}, Total tokens: {usage.total_tokens}]")
-        print(cleaned_content)
-
-        messages.append({"role": "assistant", "content": cleaned_content})
-        match_data["turns"].append({
-            "turn_number": turn,
-            "speaker": current_speaker,
-            "tokens_used_prompt": usage.prompt_tokens,
-            "tokens_used_completion": usage.completion_tokens,
-            "content": cleaned_content
-        })
-        update_turn_stats(usage.prompt_tokens,usage.completion_tokens)
+        parent, node_id = node_id, (tree.child(node_id, current_speaker,
+                                               _label_to_text[current_speaker], d, branch)
+                                    if tree else None)
+        with profile_stage("turn"), tree.slot(node_id) if tree else NO_SLOT as slot:
+            if slot.node is None:
+                _generate_turn(match_id, turn, current_speaker, d, messages, match_data, conv, bus)
+                slot.fill(parent, d["model"], match_data["turns"][-1])
+                if tree:
+                    _count_tree_turn(d["model"], match_data["turns"][-1], reused=False)
+            else:
+                conv.break_chain()      # the server-side chain never saw this turn
+                _replay_turn(slot.node, messages, match_data, bus, match_id)
+        turns_played = turn
 
         # per-turn progress dot (quiet mode only)
         if progress_turn_cb and quiet:
             progress_turn_cb()
 
-        if turn < config.TURNS_PER_MATCH:
-            next_speaker, _ = speakers[(turn) % 2]
-            next_stance = config.SIDE_STANCE.get(next_speaker, "")
-            messages.append({
-                "role": "user",
-                "content": (
-                f"You are advocating for {next_speaker}. {next_stance}\n"
-                "Base your response only on the provided context. Do not include salutations.\n\n"
-                f"{next_speaker}, please respond to your opponent."
-                ),
-                })
-        time.sleep(1)  # Pacing delay
+        # ---- probe judging after each full round --------------------------
+        if (early_cfg and turn % 2 == 0 and turn < turns_per_match
+                and turn // 2 >= early_cfg.get("min_rounds", 1) and early_winner is None):
+            with profile_stage("probe"):
+                pr = probe_debate(match_data, early_cfg, prefix=judge_prefix)
+            pr["round"] = turn // 2
+            probes.append(pr)
+            confident = (pr["winner"] is not None and pr["confidence"] is not None
+                         and pr["confidence"] >= early_cfg.get("threshold", 0.9))
+            if confident and pr["winner"] == streak_winner:
+                streak += 1
+            else:
+                streak_winner, streak = (pr["winner"], 1) if confident else (None, 0)
+            if streak >= early_cfg.get("patience", 2):
+                early_winner = streak_winner
+                match_data["early_stop"] = {
+                    "stopped_at_turn": turn,
+                    "turns_saved": 0 if calibration else turns_per_match - turn,
+                    "probe_winner": early_winner,
+                    "calibration": calibration,
+                }
+                if not calibration:
+                    break
+
+        if turn < turns_per_match:
+            next_speaker = speakers[(turn) % 2]
+            messages.append(turn_instruction(next_speaker, _label_to_text[next_speaker]))
+        if config.TURN_PACING_SECONDS:
+            time.sleep(config.TURN_PACING_SECONDS)  # Pacing delay
+
+    if conv.disabled_reason:
+        match_data["stateful_fallback"] = conv.disabled_reason
+        update_conversation_stats(0, 0, fallback=True)
 
     # Invoke the judge after the debate match is complete
-    verdict = judge_debate(match_data)
+    with profile_stage("judge"):
+        if digester:
+            match_data["round_digests"] = digester.collect()
+        verdict = judge_debate(match_data, bus=bus, prefix=judge_prefix)
+        if digester:
+            digests.account(match_data, digest_cfg, prefix=judge_prefix)
     winner = match_data.get("judge_evaluation", {}).get("winner")
     match_data["winner"] = winner
+    if early_cfg:
+        match_data.setdefault("early_stop", {"stopped_at_turn": None, "turns_saved": 0,
+                                             "probe_winner": None, "calibration": calibration})
+        match_data["early_stop"]["probes"] = probes
+        update_early_stop_stats(
+            turns_played=turns_played,
+            turns_planned=turns_per_match,
+            probes=len(probes),
+            stopped_early=turns_played < turns_per_match,
+            calibration=calibration,
+            early_winner=early_winner,
+            final_winner=winner,
+        )
     update_match_stats(winner_label=winner, verdict_text=verdict, stance_assignment=match_data.get("stance_assignment"),)
     match_data["side_labels"] = [SIDE_A_LABEL, SIDE_B_LABEL]
     match_data["side_to_debater_id"] = {
     SIDE_A_LABEL: debater_side_a["id"],   # Strategy 1 
     SIDE_B_LABEL: debater_side_b["id"],   # Strategy 2
     }
-    match_data["start_label"] = speakers[0][0]        # who opened
+    match_data["start_label"] = speakers[0]           # who opened
     match_data["winner"] = match_data.get("judge_evaluation", {}).get("winner")
 
     match_data["verdict"]     = verdict
 
 
-    # Restore the original global SIDE_STANCE mapping
-    config.SIDE_STANCE = _SIDE_STANCE_ORIG
-
-
     return match_data
 
 
@@ -299,155 +476,191 @@ def run_all_matches(
     seed=0,
     ctx_p5_text=None,
     ctx_fcc_text=None,
+    contexts: Optional[ContextRegistry] = None,
+    bus: Optional[events.EventBus] = None,
+    budget: Optional[Budget] = None,
 ):
     """
     Runs the full tournament.
     New optional args (backward-compatible):
       - context_order: "random" | "p5_first" | "fcc_first" | "alternate"
+        ("canonical" / "reversed" are the N-corpus names of p5_first / fcc_first)
       - seed: RNG seed when using random ordering
-      - ctx_p5_text / ctx_fcc_text: when both provided, we build per-match context
-        by concatenating in the chosen order; otherwise we use static_context unchanged.
+      - contexts: contexts.ContextRegistry of the corpora; stances rotate over
+        its corpus pairs and each match plays on a precomputed variant
+        (config.CONTEXT_SUBSET picks all corpora or the match's two).
+      - ctx_p5_text / ctx_fcc_text: without *contexts*, both texts form a
+        two-corpus registry ("P5", "FCC").
+      - bus: event bus receiving progress events (default: events.bus). When
+        not quiet and nobody subscribed, a console renderer is attached for
+        the duration of the run so notebooks still see the transcript.
+      - budget: cost_module.Budget; checked before each new match. Once a cap
+        is hit no further matches are scheduled, the in-flight match finishes,
+        and global_stats["budget_stop"] records why and where the run stopped.
+    With config.MATCH_SCHEDULER set, matches run concurrently in predicted
+    longest-first order (scheduler.py); IDs, context draws and the returned
+    order (by match_id) are those of the sequential run.
+    Returns a records.MatchLog of the match dicts. With config.TRANSCRIPT_SPILL
+    set they are read-only MatchRecords instead, which read like the match dict
+    and serialise back to it (json.dump with default=records.json_default).
     """
+    bus = bus or events.bus
+    console = None
+    if not quiet and not bus.has_subscribers():
+        console = bus.subscribe(events.ConsoleRenderer(side_emoji=SIDE_EMOJI))
+    try:
+        return _run_all_matches(
+            static_context, initial_topic, progress_cb, progress_turn_cb, quiet,
+            context_order=context_order, seed=seed,
+            ctx_p5_text=ctx_p5_text, ctx_fcc_text=ctx_fcc_text, contexts=contexts,
+            bus=bus, budget=budget,
+        )
+    finally:
+        if console is not None:
+            bus.unsubscribe(console)
+
+
+def _run_all_matches(
+    static_context,
+    initial_topic,
+    progress_cb,
+    progress_turn_cb,
+    quiet,
+    *,
+    context_order,
+    seed,
+    ctx_p5_text,
+    ctx_fcc_text,
+    contexts,
+    bus,
+    budget,
+):
     rng = random.Random(seed)
-    matches_data = []
+    matches_data = MatchLog(spill_store())
     debs = config.DEBATERS
-    match_id = 1
-
-    def _decide_order(mid: int) -> str:
-        if context_order == "p5_first":
-            return "P5+FCC"
-        if context_order == "fcc_first":
-            return "FCC+P5"
-        if context_order == "alternate":
-            # alternate by match id for determinism across the whole run
-            return "P5+FCC" if (mid % 2 == 1) else "FCC+P5"
-        # random
-        return "P5+FCC" if rng.random() < 0.5 else "FCC+P5"
-
-    def _ctx_for(order_tag: str) -> str:
-        # if split contexts provided, honour order; else fall back to static_context unchanged
-        if ctx_p5_text is not None and ctx_fcc_text is not None:
-            return (
-                (ctx_p5_text + "\n\n" + ctx_fcc_text)
-                if order_tag == "P5+FCC"
-                else (ctx_fcc_text + "\n\n" + ctx_p5_text)
-            )
-        
+
+    registry = contexts
+    if registry is None and ctx_p5_text is not None and ctx_fcc_text is not None:
+        registry = ContextRegistry.from_texts({"P5": ctx_p5_text, "FCC": ctx_fcc_text})
+    if registry is None:
         raise RuntimeError(
-            "No split contexts loaded: ctx_p5_text and/or ctx_fcc_text is None. "
-            "Provide --ctx-p5 and --ctx-fcc when calling scripts/run_debate.py, "
-            "or configure P5/FCC context files in config.py."
+            "No split contexts loaded: pass contexts= (a ContextRegistry) or both "
+            "ctx_p5_text and ctx_fcc_text. Provide --ctx NAME=PATH (or --ctx-p5 and "
+            "--ctx-fcc) when calling scripts/run_debate.py."
         )
-
-
+    stance_pairs = registry.stance_pairs()
+    if not stance_pairs:
+        raise RuntimeError(f"need at least two context corpora for stances, got {registry.names}")
+    subset_mode = getattr(config, "CONTEXT_SUBSET", "all")
+    if subset_mode not in ("all", "stances"):
+        raise ValueError(f"config.CONTEXT_SUBSET must be 'all' or 'stances', not {subset_mode!r}")
+    # every variant a match can draw, built once per corpus subset
+    context_options = {}
+    for name in registry.names:
+        global_stats["wins_by_stance"].setdefault(name, 0)
+
+    # ---- build the schedule up front; match IDs are fixed here ----------
+    schedule = []
     for deb_pro, deb_con in product(debs, debs):
         if deb_pro["id"] == deb_con["id"]:
             continue  # skip self-play
 
         for rep in range(1, config.REPEATS_PER_PAIR + 1):
             # --- Stance mapping is constant across the two directions in this pair ---
-            # Minimal, deterministic alternation by repeat: odd rep → P5 to SIDE_A; even rep → P5 to SIDE_B
-            p5_is_side_a = (rep % 2 == 1)
-            pair_label_to_stance = {
-                SIDE_A_LABEL: ("P5" if p5_is_side_a else "FCC"),
-                SIDE_B_LABEL: ("FCC" if p5_is_side_a else "P5"),
-            }
-            # -------- direction 1: {SIDE_A_LABEL} opens ------------
-            print("\n===========================")
-            print(
-                f"🔁 Starting Debate Match {match_id} "
-                f"[{deb_pro['id']}-{SIDE_A_LABEL}  vs  {deb_con['id']}-{SIDE_B_LABEL}] "
-                f"(repeat {rep}/{config.REPEATS_PER_PAIR})"
-            )
-            print("===========================")
-
-            order_tag = (
-                _decide_order(match_id)
-                if (ctx_p5_text is not None and ctx_fcc_text is not None)
-                else "CONCAT_UNSPECIFIED"
-            )
-            mctx = _ctx_for(order_tag)
-
-            m = run_debate_match(
-                match_id,
-                deb_pro,
-                deb_con,
-                mctx,
-                initial_topic,
-                side_a_starts=True,
-                progress_turn_cb=progress_turn_cb,
-                quiet=quiet,
-                label_to_stance=pair_label_to_stance
-            )
-            m["context_order"] = order_tag
-            matches_data.append(m)
-
-            if progress_cb:
-                progress_cb()
-            if not quiet:
-                print(f"\n✅ Debate Match {match_id} complete.")
-
-            match_id += 1
-
-            # -------- direction 2: {SIDE_B_LABEL} opens ------------
-            print("\n===========================")
-            print(
-                f"🔁 Starting Debate Match {match_id} "
-                f"[{deb_con['id']}-{SIDE_A_LABEL}  vs  {deb_pro['id']}-{SIDE_B_LABEL}] "
-                f"(repeat {rep}/{config.REPEATS_PER_PAIR})"
-            )
-            print("===========================")
-
-            order_tag = (
-                _decide_order(match_id)
-                if (ctx_p5_text is not None and ctx_fcc_text is not None)
-                else "CONCAT_UNSPECIFIED"
-            )
-            mctx = _ctx_for(order_tag)
-
-            m = run_debate_match(
-                match_id,
-                deb_con,
-                deb_pro,
-                mctx,
-                initial_topic,
-                side_a_starts=False,
-                progress_turn_cb=progress_turn_cb,
-                quiet=quiet,
-                label_to_stance=pair_label_to_stance
-            )
-            m["context_order"] = order_tag
-            matches_data.append(m)
-
-            if progress_cb:
-                progress_cb()
-            if not quiet:
-                print(f"\n✅ Debate Match {match_id} complete.")
-
-            match_id += 1
-
-    # ------- Post-hoc aggregation: add-only stats (no changes to stats_module) ------
+            # Deterministic rotation by repeat: reps 2k-1 / 2k take the k-th stance pair
+            # (cycling), first stance to SIDE_A on odd reps, to SIDE_B on even ones
+            first, second = stance_pairs[((rep - 1) // 2) % len(stance_pairs)]
+            if rep % 2 == 0:
+                first, second = second, first
+            pair_label_to_stance = {SIDE_A_LABEL: first, SIDE_B_LABEL: second}
+            subset = None if subset_mode == "all" else frozenset((first, second))
+            if subset not in context_options:
+                context_options[subset] = registry.orderings(context_order, subset)
+            # direction 1: {SIDE_A_LABEL} opens; direction 2: {SIDE_B_LABEL} opens
+            for side_a, side_b, side_a_starts in ((deb_pro, deb_con, True),
+                                                  (deb_con, deb_pro, False)):
+                schedule.append({
+                    "match_id": len(schedule) + 1,
+                    "side_a": side_a,
+                    "side_b": side_b,
+                    "side_a_starts": side_a_starts,
+                    "repeat": rep,
+                    "label_to_stance": pair_label_to_stance,
+                    "contexts": context_options[subset],
+                })
 
-    matches_by_context_order = Counter()
-    wins_by_context_order = Counter()  # kept for back-compat; equals matches today (1 winner/match)
-    wins_by_stance_given_order = defaultdict(Counter)
+    # context variants are drawn in match-id order, whatever order matches run in
+    for spec in schedule:
+        spec["variant"] = registry.pick(context_order, spec["contexts"], spec["match_id"], rng)
+
+    def _play(spec) -> dict:
+        match_id = spec["match_id"]
+        bus.emit(events.MATCH_STARTED, match_id=match_id,
+                 side_a_id=spec["side_a"]["id"], side_a_label=SIDE_A_LABEL,
+                 side_b_id=spec["side_b"]["id"], side_b_label=SIDE_B_LABEL,
+                 repeat=spec["repeat"], repeats=config.REPEATS_PER_PAIR)
+
+        m = run_debate_match(
+            match_id,
+            spec["side_a"],
+            spec["side_b"],
+            spec["variant"].text,
+            initial_topic,
+            side_a_starts=spec["side_a_starts"],
+            progress_turn_cb=progress_turn_cb,
+            quiet=quiet,
+            label_to_stance=spec["label_to_stance"],
+            bus=bus,
+            branch=spec["repeat"],
+            stance_texts={label: registry.corpus(stance).stance
+                          for label, stance in spec["label_to_stance"].items()},
+        )
+        m["context_order"] = spec["variant"].id
+        return m
 
-    for m in matches_data:
-        order = m.get("context_order", "CONCAT_UNSPECIFIED")
-        matches_by_context_order[order] += 1
+    def _finish(spec, m) -> None:
+        order_tag = m["context_order"]
+        matches_data.add(m)         # compact record under TRANSCRIPT_SPILL
         winner = m.get("winner")
-        if winner:
-            wins_by_context_order[order] += 1
-            stance_map = m.get("stance_assignment", {})
-            if isinstance(stance_map, dict) and winner in stance_map:
-                winner_stance = stance_map[winner]
-                wins_by_stance_given_order[order][winner_stance] += 1
-
-# Save into global_stats using plain dicts
-    global_stats["matches_by_context_order"] = dict(matches_by_context_order)
-    global_stats["wins_by_context_order"] = dict(wins_by_context_order)  # deprecated; equals matches today
-    global_stats["wins_by_stance_given_order"] = {
-        k: dict(v) for k, v in wins_by_stance_given_order.items()
-}
+        stance_map = m.get("stance_assignment")
+        update_context_order_stats(
+            order_tag, winner,
+            stance_map.get(winner) if isinstance(stance_map, dict) and winner else None)
+
+        if progress_cb:
+            progress_cb()
+        bus.emit(events.MATCH_COMPLETED, match_id=spec["match_id"], winner=m.get("winner"))
+
+    stop_reason = None
+    sched_cfg = scheduler.settings()
+    if sched_cfg is None:
+        for spec in schedule:
+            if budget is not None:
+                stop_reason = budget.exceeded(cost_ledger)
+                if stop_reason:
+                    break   # stop scheduling; everything finished so far is complete
+            _finish(spec, _play(spec))
+    else:
+        scheduler.cost_model.configure(sched_cfg)
+        runner = scheduler.MatchScheduler(sched_cfg, budget=budget)
+        stop_reason = runner.run(schedule, _play, _finish)
+        matches_data.sort(key=lambda r: r["match_id"])     # log order = match IDs
+        global_stats["schedule"] = runner.report()
+
+    hedger.drain()      # losing duplicates still in flight are billed too
+    with profile_stage("stats"):
+        global_stats["cost"] = cost_ledger.to_dict()
+        global_stats["prompt_cache"] = prompt_cache_stats(global_stats["cost"])
+    pool = vars(config).get("client")
+    if hasattr(pool, "stats") and callable(pool.stats):
+        global_stats["endpoints"] = pool.stats()     # ClientPool routing/health telemetry
+    if stop_reason:
+        global_stats["budget_stop"] = {
+            "reason": stop_reason,
+            "matches_completed": len(matches_data),
+            "matches_planned": len(schedule),
+            **budget.to_dict(),
+        }
 
+    bus.emit(events.TOURNAMENT_DONE, matches=len(matches_data))
     return matches_data
\ No newline at end of file
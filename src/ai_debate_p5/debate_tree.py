@@ -0,0 +1,132 @@
+"""
+Debate trees: generated turns stored as shared nodes (config.DEBATE_TREE).
+
+A node is one turn, keyed by
+
+    sha256(parent key, speaker label, stance text, speaker config, branch)
+
+where the root key covers the context (prompt_layout.context_sha256), topic,
+system prompt and MAX_TOKENS_PER_RESPONSE. The key holds everything the
+turn's prompt depends on and nothing about what comes after it, so a match
+whose prefix is already in the tree replays those turns instead of
+regenerating them:
+
+• an opener (config, side, stance, repeat) writes its opening once and every
+  pairing it opens forks from it;
+• a rerun with a larger TURNS_PER_MATCH extends the stored transcripts and
+  only generates the new turns;
+• branch is the repeat index, so repeats of a pairing stay independent.
+
+DEBATE_TREE: None → off; ":memory:" → shared within this process; a path →
+JSON-lines store, loaded on first use and appended to as nodes are created,
+so later runs build on earlier ones. Concurrent matches that reach the same
+missing node generate it once: the first claims it, the others wait.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+import config
+from .prompt_layout import context_sha256
+
+
+def _sha(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True,
+                                     default=str).encode("utf-8")).hexdigest()
+
+
+class _Slot:
+    """One node for the duration of a turn: ``node`` is the stored turn or None."""
+
+    def __init__(self, tree: Optional["DebateTree"], key: Optional[str],
+                 node: Optional[dict], owner: bool):
+        self.tree = tree
+        self.key = key
+        self.node = node
+        self._owner = owner
+
+    def __enter__(self) -> "_Slot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._owner:
+            self.tree._release(self.key)
+
+    def fill(self, parent: Optional[str], model: str, turn: dict) -> None:
+        if self._owner:
+            self.tree._put(self.key, parent, model, turn)
+
+
+NO_SLOT = _Slot(None, None, None, False)
+
+
+class DebateTree:
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._nodes = {}
+        self._in_flight = set()
+        if self.path is not None and self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        n = json.loads(line)
+                        self._nodes.setdefault(n["id"], n)
+
+    def node_count(self) -> int:
+        with self._lock:
+            return len(self._nodes)
+
+    @staticmethod
+    def root(static_context: str, initial_topic: str) -> str:
+        return _sha("root", context_sha256(static_context), initial_topic,
+                    config.SYSTEM_PROMPT, config.MAX_TOKENS_PER_RESPONSE)
+
+    @staticmethod
+    def child(parent: str, speaker: str, stance_text: str, debater: dict, branch: int) -> str:
+        return _sha(parent, speaker, stance_text, debater, branch)
+
+    def slot(self, key: str) -> _Slot:
+        """
+        The stored node for *key*, or ownership of it (node None): the owner
+        generates the turn and fill()s it; exiting the slot releases it.
+        """
+        with self._changed:
+            while key in self._in_flight:
+                self._changed.wait()
+            node = self._nodes.get(key)
+            if node is not None:
+                return _Slot(self, key, node, False)
+            self._in_flight.add(key)
+            return _Slot(self, key, None, True)
+
+    def _put(self, key: str, parent: Optional[str], model: str, turn: dict) -> None:
+        node = {"id": key, "parent": parent, "model": model, "turn": turn}
+        with self._lock:
+            self._nodes[key] = node
+            if self.path is not None:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(node, ensure_ascii=False) + "\n")
+
+    def _release(self, key: str) -> None:
+        with self._changed:
+            self._in_flight.discard(key)
+            self._changed.notify_all()
+
+
+_trees = {}
+_trees_lock = threading.Lock()
+
+
+def active_tree() -> Optional[DebateTree]:
+    """The tree for config.DEBATE_TREE (one per setting), or None when off."""
+    where = getattr(config, "DEBATE_TREE", None)
+    if not where:
+        return None
+    with _trees_lock:
+        if where not in _trees:
+            _trees[where] = DebateTree(None if where == ":memory:" else where)
+        return _trees[where]
@@ -0,0 +1,169 @@
+"""
+Round digests for the judge (config.JUDGE_DIGEST).
+
+The full-transcript judge prompt grows with every turn. With digests on, each
+finished round is summarized by a cheap model in the background as soon as
+the next round starts, so summarizing overlaps with the rest of the debate.
+The judge then reads the round digests plus the final round verbatim
+(judge_module.build_judge_prompt renders whatever match_data["round_digests"]
+holds; a round whose digest failed stays verbatim).
+
+• Cache: digests are keyed by sha256 of the digest request, so a round that
+  recurs verbatim (replayed debate-tree prefixes, reruns in one process) is
+  summarized once; in-flight duplicates wait for the first request.
+• Cost: digest calls are billed under the "judge_digest" stage.
+• Trade-off: every match records offline token estimates of its judge prompt
+  with digests vs the full transcript; a "calibration_rate" share of matches
+  is also judged on the full transcript through the same cascade / panel /
+  single-judge path as the main verdict (every call billed as "judge_full")
+  and the two winners are compared (global_stats["judge_digest"]["agreement"]).
+
+Probe verdicts (config.EARLY_STOP) are taken mid-debate and keep reading the
+full transcript so far.
+"""
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import config
+from .backends import get_backend
+from .cost_module import ledger as cost_ledger, price_tokens, cached_tokens_of
+from .judge_module import build_judge_prompt, _decide, sampled
+from .stats_module import update_call_stats, update_digest_call_stats, update_digest_stats
+from .utils_openai import count_tokens
+
+_DEFAULTS = {
+    "model": None,              # None → config.MODEL
+    "temperature": 0.0,
+    "max_tokens": 150,
+    "calibration_rate": 0.0,
+    "max_workers": 8,
+}
+
+_DIGEST_INSTRUCTION = (
+    "Summarize this round of a debate for the judge who will decide it. For each side, "
+    "in at most three short sentences: its main claims, the evidence it cited and how it "
+    "answered the other side. Keep the side labels exactly as written. Be neutral: do not "
+    "judge who is winning."
+)
+
+
+def settings() -> Optional[dict]:
+    """config.JUDGE_DIGEST with defaults filled in; None when digests are off."""
+    cfg = getattr(config, "JUDGE_DIGEST", None)
+    if not cfg:
+        return None
+    out = {**_DEFAULTS, **cfg}
+    out["model"] = out["model"] or config.MODEL
+    return out
+
+
+# ---------- cache + executor (process-wide) --------------------------------
+
+_lock = threading.Lock()
+_cache = {}                     # request sha → Future[str]
+_executor = None
+
+
+def _pool(cfg) -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=cfg["max_workers"],
+                                           thread_name_prefix="digest")
+        return _executor
+
+
+def digest_messages(round_number: int, turns: List[dict]) -> list:
+    transcript = "\n".join(f"{t['speaker']}: {t['content']}" for t in turns)
+    return [
+        {"role": "system", "content": _DIGEST_INSTRUCTION},
+        {"role": "user", "content": f"Round {round_number}:\n{transcript}"},
+    ]
+
+
+def _summarize(cfg: dict, messages: list) -> str:
+    model = cfg["model"]
+    backend = get_backend(model, config.JUDGE_ENDPOINT_GROUP)
+    gen = backend.generate(model, messages, temperature=cfg["temperature"],
+                           max_tokens=cfg["max_tokens"])
+    u = gen.usage
+    cost_ledger.record("judge_digest", model, u)
+    update_call_stats("judge_digest", u.prompt_tokens, u.completion_tokens)
+    update_digest_call_stats(u.prompt_tokens, u.completion_tokens,
+                             price_tokens(model, u.prompt_tokens, u.completion_tokens,
+                                          cached_tokens_of(u)))
+    return gen.text.strip()
+
+
+def _forget(key: str, fut: Future) -> None:
+    if fut.exception() is not None:
+        with _lock:
+            if _cache.get(key) is fut:
+                del _cache[key]         # failures are retried by the next request
+
+
+class RoundDigester:
+    """Digests of one match's finished rounds, requested as the match goes on."""
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self._rounds = {}           # round number → (Future[str], cached)
+
+    def submit(self, round_number: int, turns: List[dict]) -> None:
+        """Start summarizing *round_number* (its turns) in the background."""
+        messages = digest_messages(round_number, turns)
+        key = hashlib.sha256(json.dumps(
+            [self.cfg["model"], self.cfg["temperature"], self.cfg["max_tokens"], messages],
+            ensure_ascii=False).encode("utf-8")).hexdigest()
+        ex = _pool(self.cfg)
+        with _lock:
+            fut = _cache.get(key)
+            cached = fut is not None
+            if not cached:
+                fut = _cache[key] = ex.submit(_summarize, self.cfg, messages)
+        if cached:
+            update_digest_call_stats(cached=True)
+        else:
+            fut.add_done_callback(lambda f: _forget(key, f))
+        self._rounds[round_number] = (fut, cached)
+
+    def collect(self) -> List[dict]:
+        """Wait for the submitted digests: [{"round", "digest", "cached"}] in order."""
+        out = []
+        for r in sorted(self._rounds):
+            fut, cached = self._rounds[r]
+            if fut.exception() is not None:
+                continue                # that round goes to the judge verbatim
+            out.append({"round": r, "digest": fut.result(), "cached": cached})
+        return out
+
+
+def account(match_data: dict, cfg: dict, prefix=None) -> None:
+    """
+    After the verdict: prompt-size estimates, and for calibration matches a
+    full-transcript verdict to compare with. Stored under
+    match_data["judge_evaluation"]["digest"].
+    """
+    model = config.MODEL
+    with_digests, _ = build_judge_prompt(match_data)
+    full, allowed = build_judge_prompt(match_data, use_digests=False)
+    info = {
+        "rounds": len(match_data.get("round_digests") or ()),
+        "judge_prompt_tokens_est": count_tokens(with_digests, model),
+        "full_prompt_tokens_est": count_tokens(full, model),
+    }
+    winner = match_data.get("judge_evaluation", {}).get("winner")
+    calibration = info["rounds"] > 0 and sampled("digest_calibration", match_data.get("match_id"),
+                                                 cfg["calibration_rate"])
+    full_winner = None
+    if calibration:
+        _, full_winner, _, _ = _decide({k: v for k, v in match_data.items() if k != "round_digests"},
+                                       allowed, prefix, stage="judge_full")
+        info["calibration"] = {"full_winner": full_winner,
+                               "agreed": winner is not None and winner == full_winner}
+    update_digest_stats(info["judge_prompt_tokens_est"], info["full_prompt_tokens_est"],
+                        digest_winner=winner, full_winner=full_winner, calibration=calibration)
+    match_data.setdefault("judge_evaluation", {})["digest"] = info
@@ -0,0 +1,224 @@
+"""
+In-process event bus for the debate engine.
+
+The engine and judge no longer print; they *emit* typed events
+(match_started, turn_completed, judge_completed, …) carrying raw values.
+Console rendering, progress dots and log files are subscribers.
+
+• emit() returns immediately when nobody listens to an event type, so a
+  quiet run does no string formatting and no stdout I/O at all.
+• Wrap a slow subscriber in QueuedSubscriber to move its work onto a
+  background thread (same idea as logging.handlers.QueueHandler).
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# ---------- event types -------------------------------------------------
+MATCH_STARTED     = "match_started"
+ROUND_STARTED     = "round_started"
+OPENING_STARTED   = "opening_started"
+TURN_STARTED      = "turn_started"
+TURN_COMPLETED    = "turn_completed"
+JUDGE_COMPLETED   = "judge_completed"
+MATCH_COMPLETED   = "match_completed"
+TOURNAMENT_DONE   = "tournament_done"
+
+ALL_EVENTS = (
+    MATCH_STARTED, ROUND_STARTED, OPENING_STARTED, TURN_STARTED,
+    TURN_COMPLETED, JUDGE_COMPLETED, MATCH_COMPLETED, TOURNAMENT_DONE,
+)
+
+
+@dataclass(frozen=True)
+class Event:
+    type: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    ts: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {"type": self.type, "ts": self.ts, **self.payload}
+
+
+Handler = Callable[[Event], None]
+
+
+class EventBus:
+    """Thread-safe publish/subscribe hub. Handlers are plain callables."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, handler: Handler, types: Optional[Sequence[str]] = None) -> Handler:
+        """Register *handler* for *types* (all event types when None)."""
+        with self._lock:
+            for t in (types or ALL_EVENTS):
+                # copy-on-write so emit() can iterate without holding the lock
+                self._subs[t] = self._subs.get(t, []) + [handler]
+        return handler
+
+    def unsubscribe(self, handler: Handler) -> None:
+        with self._lock:
+            self._subs = {
+                t: [h for h in hs if h is not handler]
+                for t, hs in self._subs.items()
+            }
+
+    def wants(self, event_type: str) -> bool:
+        return bool(self._subs.get(event_type))
+
+    def has_subscribers(self) -> bool:
+        return any(self._subs.values())
+
+    def emit(self, event_type: str, **payload) -> None:
+        handlers = self._subs.get(event_type)
+        if not handlers:
+            return  # nobody listening → no work
+        ev = Event(event_type, payload, time.time())
+        for h in handlers:
+            h(ev)
+
+    def close(self) -> None:
+        """Flush and stop every queued subscriber, then drop all handlers."""
+        seen = set()
+        for hs in self._subs.values():
+            for h in hs:
+                if id(h) not in seen and hasattr(h, "close"):
+                    seen.add(id(h))
+                    h.close()
+        with self._lock:
+            self._subs = {}
+
+
+# Process-wide default bus used by debate_engine / judge_module
+bus = EventBus()
+
+
+# ---------- non-blocking dispatch --------------------------------------
+
+_STOP = object()
+
+
+class QueuedSubscriber:
+    """
+    Hand events to *handler* on a background thread.
+
+    The emitting (engine) thread only pays for a queue put; formatting and
+    I/O happen in the worker. close() drains the queue before returning.
+    """
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self._q: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="event-subscriber", daemon=True)
+        self._thread.start()
+
+    def __call__(self, ev: Event) -> None:
+        self._q.put(ev)
+
+    def _run(self) -> None:
+        while True:
+            ev = self._q.get()
+            if ev is _STOP:
+                break
+            try:
+                self.handler(ev)
+            except Exception as exc:  # a broken subscriber must not kill the run
+                sys.stderr.write(f"[events] subscriber error: {exc!r}\n")
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._q.put(_STOP)
+            self._thread.join()
+        if hasattr(self.handler, "close"):
+            self.handler.close()
+
+
+# ---------- stock subscribers -------------------------------------------
+
+class ConsoleRenderer:
+    """Human-readable transcript on stdout (the old print() output)."""
+
+    def __init__(self, stream=None, side_emoji: Optional[Dict[str, str]] = None):
+        self.stream = stream or sys.stdout
+        self.side_emoji = side_emoji or {}
+
+    def _w(self, text: str = "") -> None:
+        self.stream.write(text + "\n")
+
+    def __call__(self, ev: Event) -> None:
+        p = ev.payload
+        t = ev.type
+        if t == MATCH_STARTED:
+            self._w("\n===========================")
+            self._w(
+                f"🔁 Starting Debate Match {p['match_id']} "
+                f"[{p['side_a_id']}-{p['side_a_label']}  vs  {p['side_b_id']}-{p['side_b_label']}] "
+                f"(repeat {p['repeat']}/{p['repeats']})"
+            )
+            self._w("===========================")
+        elif t == OPENING_STARTED:
+            self._w(f"\nGenerating opening variants for {p['speaker']} side...")
+        elif t == ROUND_STARTED:
+            self._w(f"\n🔁 Starting Round {p['round_number']}")
+        elif t == TURN_STARTED:
+            if p["turn_number"] > 1:
+                emoji = self.side_emoji.get(p["speaker"], "")
+                self._w(f"\n{emoji} {p['speaker']}'s Turn {p['turn_number']}")
+        elif t == TURN_COMPLETED:
+            emoji = self.side_emoji.get(p["speaker"], "")
+            if p["turn_number"] == 1:
+                self._w(
+                    f"\n{emoji} [Opening Token usage: Prompt tokens: {p['prompt_tokens']}, "
+                    f"Completion tokens: {p['completion_tokens']}, Total tokens: {p['total_tokens']}]"
+                )
+                self._w(f"\n{emoji} {p['speaker']}'s Opening Argument (Turn 1):")
+            else:
+                self._w(
+                    f"{emoji} [Prompt tokens: {p['prompt_tokens']}, Completion tokens: "
+                    f"{p['completion_tokens']}, Total tokens: {p['total_tokens']}]"
+                )
+            self._w(p["content"])
+        elif t == JUDGE_COMPLETED:
+            self._w("\n📢 Judge's Evaluation:")
+            self._w(p["verdict"])
+            self._w(
+                f"[Judge Token usage: Prompt tokens: {p['prompt_tokens']}, "
+                f"Completion tokens: {p['completion_tokens']}, Total tokens: {p['total_tokens']}]"
+            )
+        elif t == MATCH_COMPLETED:
+            self._w(f"\n✅ Debate Match {p['match_id']} complete.")
+        self.stream.flush()
+
+
+class ProgressDots:
+    """One dot per completed turn, wrapping every *wrap* dots."""
+
+    def __init__(self, wrap: int = 60, stream=None):
+        self.wrap = wrap
+        self.stream = stream or sys.stdout
+        self.count = 0
+
+    def __call__(self, ev: Event) -> None:
+        self.count += 1
+        self.stream.write("." if (self.count % self.wrap) else ".\n")
+        self.stream.flush()
+
+
+class JsonlEventLog:
+    """Append every event as one JSON line (structured run log)."""
+
+    def __init__(self, path):
+        self._f = open(path, "a", encoding="utf-8")
+
+    def __call__(self, ev: Event) -> None:
+        self._f.write(json.dumps(ev.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
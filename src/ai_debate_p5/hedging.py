@@ -0,0 +1,198 @@
+"""
+Hedged requests for debate turns and judge calls (config.HEDGE).
+
+A call that has not returned after its observed p95 latency gets one
+duplicate, optionally on another endpoint group; whichever answers first is
+used. The SDK cannot abort a request already on the wire, so the loser is
+cancelled if it has not started yet and otherwise finishes in the background:
+its tokens are billed and recorded in the ledger under "<stage>_hedge", which
+is the extra spend the hedge budget caps.
+
+• Delay: "percentile" of every finished attempt's own latency (hedged or
+  not) for the same model and stage, so short tier-1 / probe judge calls do
+  not pull down the delay of full turns. Until a (model, stage) has
+  "min_samples" the model's sketch over all stages is used, and
+  "initial_delay_s" until that has them too.
+• Budget: at most "max_hedge_rate" of hedgeable calls get a duplicate, and
+  none once loser spend reaches "max_extra_cost_usd".
+• Report: global_stats["hedging"] (hedge rate, duplicate win rate, loser
+  tokens / cost) and per-model latency sketches as served vs what the
+  primary alone took (latency_tail()).
+
+Streamed and stateful turns are never hedged: a stream is already consumed
+as it arrives, and a duplicate would fork the server-side conversation chain.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional
+
+import config
+from .backends import Backend, Generation, get_backend
+from .cost_module import ledger as cost_ledger, price_tokens, cached_tokens_of
+from .stats_module import (QuantileSketch, global_stats, update_call_stats, update_hedge_stats,
+                           update_hedge_spend)
+
+_DEFAULTS = {
+    "percentile": 0.95,
+    "min_samples": 20,
+    "initial_delay_s": 8.0,
+    "max_hedge_rate": 0.1,
+    "max_extra_cost_usd": None,
+    "endpoint_group": None,
+    "stages": ("turn", "judge"),
+    "max_workers": 32,
+}
+
+
+def settings() -> Optional[dict]:
+    """config.HEDGE with defaults filled in; None when hedging is off."""
+    cfg = getattr(config, "HEDGE", None)
+    return {**_DEFAULTS, **cfg} if cfg else None
+
+
+class Hedger:
+    """Process-wide hedging state: latency sketches, budget and in-flight losers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._latency = {}              # model / (model, stage) → QuantileSketch of attempt latencies (s)
+        self._calls = 0
+        self._hedged = 0
+        self._extra_cost = 0.0
+        self._losers = set()
+        self._executor = None
+
+    def _pool(self, cfg) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=cfg["max_workers"], thread_name_prefix="hedge")
+            return self._executor
+
+    def delay_for(self, model: str, cfg: dict, stage: Optional[str] = None) -> float:
+        with self._lock:
+            for key in ((model, stage), model):
+                sk = self._latency.get(key)
+                if sk is not None and sk.count >= cfg["min_samples"]:
+                    return sk.quantile(cfg["percentile"])
+            return cfg["initial_delay_s"]
+
+    def _allow(self, cfg: dict) -> bool:
+        with self._lock:
+            cap = cfg["max_extra_cost_usd"]
+            if cap is not None and self._extra_cost >= cap:
+                return False
+            if self._hedged + 1 > cfg["max_hedge_rate"] * self._calls:
+                return False
+            self._hedged += 1
+            return True
+
+    def _timed(self, model: str, stage: str, attempt: Callable[[Backend], Generation],
+               backend: Backend):
+        t0 = time.perf_counter()
+        gen = attempt(backend)
+        dt = time.perf_counter() - t0
+        with self._lock:
+            for key in ((model, stage), model):
+                self._latency.setdefault(key, QuantileSketch()).add(dt)
+        return gen, dt
+
+    def call(self, backend: Backend, model: str, stage: str,
+             attempt: Callable[[Backend], Generation],
+             debater_id: Optional[str] = None,
+             endpoint_group: Optional[str] = None) -> Generation:
+        """
+        ``attempt(backend)`` with hedging when enabled for *stage*; returns the
+        winning Generation (the caller records its usage as usual).
+        """
+        cfg = settings()
+        if cfg is None or not any(stage == s or stage.startswith(s + "_") for s in cfg["stages"]):
+            return attempt(backend)
+
+        ex = self._pool(cfg)
+        with self._lock:
+            self._calls += 1
+        t0 = time.perf_counter()
+        primary = ex.submit(self._timed, model, stage, attempt, backend)
+        done, _ = wait([primary], timeout=self.delay_for(model, cfg, stage))
+        if done or not self._allow(cfg):
+            gen, primary_s = primary.result()
+            update_hedge_stats(model, time.perf_counter() - t0, primary_s=primary_s,
+                               denied=not done)
+            return gen
+
+        hedge_backend = get_backend(model, cfg["endpoint_group"] or endpoint_group)
+        hedge = ex.submit(self._timed, model, stage, attempt, hedge_backend)
+        pending, winner, error = {primary, hedge}, None, None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in (primary, hedge):          # primary first on a tie
+                if f in done:
+                    if f.exception() is None:
+                        winner = f
+                        break
+                    error = error or f.exception()
+        if winner is None:
+            raise error
+
+        served_s = time.perf_counter() - t0
+        loser = hedge if winner is primary else primary
+        update_hedge_stats(model, served_s,
+                           primary_s=winner.result()[1] if winner is primary else None,
+                           hedged=True, hedge_won=winner is hedge)
+        self._settle(loser, model, stage, debater_id, loser_is_primary=loser is primary)
+        return winner.result()[0]
+
+    def _settle(self, loser, model, stage, debater_id, loser_is_primary: bool) -> None:
+        if loser.cancel():
+            update_hedge_spend(model, cancelled=True)
+            return
+        with self._lock:
+            self._losers.add(loser)
+
+        def _done(f):
+            try:
+                if not f.cancelled() and f.exception() is None:
+                    self._bill(f, model, stage, debater_id, loser_is_primary)
+            finally:
+                with self._settled:
+                    self._losers.discard(f)
+                    self._settled.notify_all()
+
+        loser.add_done_callback(_done)
+
+    def _bill(self, f, model, stage, debater_id, loser_is_primary: bool) -> None:
+        gen, dt = f.result()
+        u = gen.usage
+        cost_ledger.record(f"{stage}_hedge", model, u, debater_id=debater_id)
+        update_call_stats(f"{stage}_hedge", u.prompt_tokens, u.completion_tokens,
+                          debater_id=debater_id)
+        cost = price_tokens(model, u.prompt_tokens, u.completion_tokens, cached_tokens_of(u))
+        with self._lock:
+            self._extra_cost += cost
+        update_hedge_spend(model, u.prompt_tokens, u.completion_tokens, cost,
+                           primary_s=dt if loser_is_primary else None)
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait for losers still in flight, so their spend is in the ledger."""
+        with self._settled:
+            self._settled.wait_for(lambda: not self._losers, timeout)
+
+
+# Process-wide hedger, like cost_module.ledger
+hedger = Hedger()
+
+
+def latency_tail(q: float, stats=None):
+    """(primary-only, as served) latency quantile *q* over all models, or None."""
+    s = global_stats if stats is None else stats
+    with s.lock:
+        out = []
+        for name in ("hedge_primary_latency_s", "hedge_served_latency_s"):
+            merged = None
+            for sk in s.sketches.get(name, {}).values():
+                merged = QuantileSketch(sk.alpha).merge(sk) if merged is None else merged.merge(sk)
+            out.append(merged.quantile(q) if merged else None)
+    return None if None in out else tuple(out)
@@ -1,7 +1,19 @@
+import json
+import math
+import random
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional
+
 import config
-from config import client
-from ai_debate_p5.stats_module import update_turn_stats, update_judge_stats
+from ai_debate_p5.stats_module import (update_turn_stats, update_judge_stats, update_cascade_stats,
+                                       update_call_stats)
+from ai_debate_p5 import events
+from ai_debate_p5.backends import get_backend
+from ai_debate_p5.hedging import hedger
+from ai_debate_p5.cost_module import ledger as cost_ledger
+from ai_debate_p5.profiling import stage as profile_stage
 
 
 WINNER_RE = re.compile(r'^\s*WINNER:\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
@@ -19,83 +31,574 @@ def _extract_winner(text: str, allowed_labels):
             return lab
     return None
 
-def judge_debate(match_data):
+def _usage_dict(u) -> dict:
+    return {
+        "prompt_tokens": u.prompt_tokens,
+        "completion_tokens": u.completion_tokens,
+        "total_tokens": u.total_tokens,
+    }
+
+
+def build_judge_prompt(match_data, structured: bool = False, brief: bool = False,
+                       use_digests: bool = True):
     """
-    Evaluate the debate transcript and decide which debater was more persuasive.
-    The function builds the debate transcript, constructs a detailed prompt, and then queries the OpenAI API
-    to obtain the judge's verdict. It also prints and stores the token usage information.
+    Return (judge_prompt, allowed_labels) for a match transcript.
+    *structured* swaps the closing WINNER-line instruction for the JSON verdict
+    requested through response_format (see verdict_schema); *brief* asks for
+    the decision only, without per-side notes (cascade tier 1).
+    When match_data carries "round_digests" (config.JUDGE_DIGEST) and
+    *use_digests* is set, those rounds are replaced by their digest and the
+    remaining turns (at least the final round) stay verbatim.
     """
     # Build the transcript string from match turns.
+    digests = {d["round"]: d["digest"] for d in (match_data.get("round_digests") or ())} \
+        if use_digests else {}
     transcript_lines = []
     for turn in match_data["turns"]:
+        rnd = (turn["turn_number"] + 1) // 2
+        if rnd in digests:
+            if turn["turn_number"] % 2 == 1:
+                transcript_lines.append(f"Round {rnd} (summary): {digests[rnd]}")
+            continue
         transcript_lines.append(f"Turn {turn['turn_number']} - {turn['speaker']}: {turn['content']}")
     transcript = "\n".join(transcript_lines)
-    
+    heading = ("Debate Transcript (earlier rounds summarized, final round verbatim):\n"
+               if digests else "Debate Transcript:\n")
 
     # === Derive the two side labels directly from the first two turns ===
     side1 = match_data["turns"][0]["speaker"]
     side2 = match_data["turns"][1]["speaker"] if len(match_data["turns"]) > 1 else ("Strategy 2" if side1 != "Strategy 2" else "Strategy 1")
     allowed = (side1, side2)
 
+    if brief:
+        task = "Decide which side was more persuasive.\n\n"
+    else:
+        task = ("For each side, briefly note one key strength and one key area for improvement. "
+                "Then decide which side was more persuasive.\n\n")
+    if structured:
+        closing = (f"Reply in the requested JSON format: "
+                   + ("" if brief else "one strength and one weakness per side, then ")
+                   + f"the winner ({side1} or {side2}).\n\n")
+    elif brief:
+        closing = f"Reply with exactly one line: WINNER: {side1} or WINNER: {side2}.\n\n"
+    else:
+        closing = (f"At the very end, write exactly one line: WINNER: {side1} or WINNER: {side2}. "
+                   "Do not add any text after that line.\n\n")
     judge_prompt = (
         "You are an impartial judge. Evaluate the debate strictly based on the transcript below (no external knowledge). "
-        "For each side, briefly note one key strength and one key area for improvement. Then decide which side was more persuasive.\n\n"
-        f"At the very end, write exactly one line: WINNER: {side1} or WINNER: {side2}. "
-        "Do not add any text after that line.\n\n"
-        "Debate Transcript:\n" + transcript + "\n\n"
+        + task + closing
+        + heading + transcript + "\n\n"
         f"Keep your response concise and end at a natural boundary within {config.MAX_TOKENS_PER_RESPONSE} tokens."
     )
+    return judge_prompt, allowed
 
 
-    # ---------- first attempt -------------------------------------------------
-    judge_response = client.chat.completions.create(
-    model=config.MODEL,
-    messages=[
+def verdict_schema(allowed, brief: bool = False) -> dict:
+    """
+    response_format for a schema-constrained verdict: per-side notes first
+    (so the rationale still precedes the decision), then an enum-restricted
+    winner, so the label can never be malformed. *brief* keeps only the winner.
+    """
+    labels = list(allowed)
+    if brief:
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "debate_winner",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {"winner": {"type": "string", "enum": labels}},
+                    "required": ["winner"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "debate_verdict",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "assessment": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "side": {"type": "string", "enum": labels},
+                                "strength": {"type": "string"},
+                                "weakness": {"type": "string"},
+                            },
+                            "required": ["side", "strength", "weakness"],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "winner": {"type": "string", "enum": labels},
+                },
+                "required": ["assessment", "winner"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+_WINNER_VALUE_RE = re.compile(r'"winner"\s*:\s*"')
+
+
+def _parse_structured(text: str, allowed):
+    """(winner, assessment, offset of the winner value in *text*) or Nones."""
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        return None, None, None
+    winner = obj.get("winner") if isinstance(obj, dict) else None
+    if winner not in allowed:
+        return None, None, None
+    m = None
+    for m in _WINNER_VALUE_RE.finditer(text):
+        pass                    # last occurrence: the top-level key closes the object
+    return winner, obj.get("assessment") or [], (m.end() if m else None)
+
+
+def _render_structured(assessment, winner) -> str:
+    """Plain-text verdict in the legacy layout (ends with the WINNER line)."""
+    lines = [f"{a.get('side')}: strength: {a.get('strength')} | weakness: {a.get('weakness')}"
+             for a in assessment if isinstance(a, dict)]
+    lines.append(f"WINNER: {winner}")
+    return "\n".join(lines)
+
+
+def verdict_confidence(choice, text: str, start: Optional[int], winner, allowed) -> Optional[float]:
+    """
+    P(winner) from the logprob of the token where the two labels first differ
+    ("1" vs "2" in "Strategy 1"/"Strategy 2"). When the rival label shows up in
+    top_logprobs the probability is renormalised over the two labels.
+    *start* is the character offset of the winner label in *text*.
+    """
+    toks = choice.logprobs
+    if not toks or start is None or winner not in allowed:
+        return None
+    other = allowed[1] if winner == allowed[0] else allowed[0]
+    d = 0
+    while d < min(len(winner), len(other)) and winner[d] == other[d]:
+        d += 1
+    pos = start + d
+    off = 0
+    for t in toks:
+        end = off + len(t.token)
+        if end > pos:
+            p = math.exp(t.logprob)
+            # what the rival label would look like from this token's start
+            rival = text[off:pos] + other[d:]
+            p_other = sum(
+                math.exp(alt.logprob) for alt in t.top_logprobs
+                if alt.token != t.token and len(alt.token) > pos - off
+                and (rival.startswith(alt.token) or alt.token.startswith(rival))
+            )
+            return p / (p + p_other) if p_other else p
+        off = end
+    return None
+
+
+def _judge_messages(judge_prompt, prefix=None):
+    if prefix:
+        return list(prefix) + [{"role": "user", "content": judge_prompt}]
+    return [
         {"role": "system", "content": "You are an impartial judge evaluating a debate."},
         {"role": "user",   "content": judge_prompt},
-    ],
-    temperature=config.TEMPERATURE,
-    max_tokens=400,
-)
-    verdict_text = judge_response.choices[0].message.content.strip()
-    update_judge_stats(judge_response.usage.prompt_tokens,
-                        judge_response.usage.completion_tokens)
-
-
-    winner = _extract_winner(verdict_text, allowed)
-    full_verdict  = verdict_text        
-
-# ---------- fallback reprompt --------------------------------------------
-    if winner is None:
-        reprompt = client.chat.completions.create(
-            model=config.MODEL,
-            messages=[{
-                "role": "system",
-                "content": f"Reply with exactly one line: WINNER: {side1} or WINNER: {side2}"
-            }],
-            temperature=0,
-            max_tokens=10,
+    ]
+
+
+def _judge_once(match_data, model, temperature, seed=None, stage="judge",
+                brief=False, max_tokens=400, prefix=None):
+    """
+    One judge verdict. Models with structured output answer a JSON schema whose
+    winner is an enum of the two labels; a reply that still does not parse
+    (refusal, cut off at max_tokens) is retried once with the brief
+    winner-only schema. Other models keep the WINNER-line prompt plus the
+    short reprompt fallback. Stats and
+    cost are recorded here, so abandoned panel calls are still counted.
+    *prefix* (prompt_layout.context_prefix messages) puts the debaters' cached
+    system + context prefix in front of the judge instructions.
+    """
+    backend = get_backend(model, config.JUDGE_ENDPOINT_GROUP)
+    caps = backend.capabilities(model)
+    structured = caps.structured_output
+    with profile_stage("prompt_build"):
+        judge_prompt, allowed = build_judge_prompt(match_data, structured=structured, brief=brief)
+        messages = _judge_messages(judge_prompt, prefix)
+    side1, side2 = allowed
+
+    # ---------- first attempt -------------------------------------------------
+    with profile_stage("api"):
+        judge_response = hedger.call(
+            backend, model, stage,
+            lambda b: b.generate(
+                model,
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                seed=seed if caps.seed else None,
+                response_format=verdict_schema(allowed, brief=brief) if structured else None,
+                logprobs=caps.logprobs,
+                top_logprobs=min(5, caps.top_logprobs) or None,
+            ),
+            endpoint_group=config.JUDGE_ENDPOINT_GROUP,
         )
+    choice = judge_response.choices[0]
+    # label offsets index the raw text: the token logprobs run over it unstripped
+    raw_text = choice.text
+    verdict_text = raw_text.strip()
+    update_judge_stats(judge_response.usage.prompt_tokens,
+                       judge_response.usage.completion_tokens)
+    cost_ledger.record(stage, model, judge_response.usage)
+    update_call_stats(stage, judge_response.usage.prompt_tokens,
+                      judge_response.usage.completion_tokens)
+
+    assessment = None
+    if structured:
+        winner, assessment, start = _parse_structured(raw_text, allowed)
+        full_verdict = _render_structured(assessment, winner) if winner else verdict_text
+        confidence = verdict_confidence(choice, raw_text, start, winner, allowed)
+    else:
+        winner = _extract_winner(verdict_text, allowed)
+        full_verdict = verdict_text
+        m = WINNER_RE.search(raw_text)
+        confidence = (verdict_confidence(choice, raw_text, m.start(1), winner, allowed)
+                      if m and m.group(1).strip() == winner else None)
+
+    # ---------- structured retry: winner-only schema, transcript included -----
+    if winner is None and structured:
+        brief_prompt, _ = build_judge_prompt(match_data, structured=True, brief=True)
+        with profile_stage("api"):
+            retry = backend.generate(
+                model,
+                _judge_messages(brief_prompt, prefix),
+                temperature=temperature,
+                max_tokens=40,
+                seed=seed if caps.seed else None,
+                response_format=verdict_schema(allowed, brief=True),
+                logprobs=caps.logprobs,
+                top_logprobs=min(5, caps.top_logprobs) or None,
+            )
+        update_judge_stats(retry.usage.prompt_tokens, retry.usage.completion_tokens)
+        cost_ledger.record("judge_reprompt", model, retry.usage)
+        update_call_stats("judge_reprompt", retry.usage.prompt_tokens,
+                          retry.usage.completion_tokens)
+        retry_choice = retry.choices[0]
+        winner, _, start = _parse_structured(retry_choice.text, allowed)
+        confidence = verdict_confidence(retry_choice, retry_choice.text, start, winner, allowed)
+        full_verdict += "\n\n--- reprompt ---\n" + (
+            _render_structured([], winner) if winner else retry_choice.text.strip())
+
+    # ---------- fallback reprompt (no structured output only) -----------------
+    if winner is None and not structured:
+        with profile_stage("api"):
+            reprompt = backend.generate(
+                model,
+                [{
+                    "role": "system",
+                    "content": f"Reply with exactly one line: WINNER: {side1} or WINNER: {side2}"
+                }],
+                temperature=0,
+                max_tokens=10,
+            )
         update_judge_stats(reprompt.usage.prompt_tokens, reprompt.usage.completion_tokens)
-        short_line = reprompt.choices[0].message.content.strip()
+        cost_ledger.record("judge_reprompt", model, reprompt.usage)
+        update_call_stats("judge_reprompt", reprompt.usage.prompt_tokens,
+                          reprompt.usage.completion_tokens)
+        short_line = reprompt.text.strip()
         full_verdict += "\n\n--- reprompt ---\n" + short_line
         winner = _extract_winner(short_line, allowed)
 
-    verdict = full_verdict
-    judge_usage = judge_response.usage
-    
-    print("\n📢 Judge's Evaluation:")
-    print(verdict)
-    print(f"[Judge Token usage: Prompt tokens: {judge_usage.prompt_tokens}, "
-          f"Completion tokens: {judge_usage.completion_tokens}, Total tokens: {judge_usage.total_tokens}]")
-    
+    return {
+        "model": model,
+        "temperature": temperature,
+        "seed": seed,
+        "winner": winner,
+        "verdict": full_verdict,
+        "format": "json_schema" if structured else "text",
+        "assessment": assessment,
+        "confidence": confidence,
+        "usage": judge_response.usage,
+    }
+
+
+# ---------- judge panel ----------------------------------------------------
+
+_panel_executor = None
+_panel_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _panel_executor
+    with _panel_executor_lock:
+        if _panel_executor is None:
+            _panel_executor = ThreadPoolExecutor(
+                max_workers=config.JUDGE_PANEL_MAX_WORKERS, thread_name_prefix="judge")
+        return _panel_executor
+
+
+def panel_specs():
+    """config.JUDGE_PANEL normalised to a list of judge dicts (None → no panel)."""
+    panel = config.JUDGE_PANEL
+    if not panel:
+        return None
+    if isinstance(panel, int):
+        panel = [{"seed": i + 1} for i in range(panel)]
+    return [{"model": config.MODEL, "temperature": config.TEMPERATURE, "seed": None, **j} for j in panel]
+
+
+def _run_panel(match_data, allowed, specs, prefix=None, stage="judge_panel"):
+    """
+    Query K judges concurrently, stopping as soon as one label holds a strict
+    majority of K. Only as many judges as could still be needed are in flight,
+    so undecided-only judges are never sent; queued ones are cancelled.
+    With config.JUDGE_PANEL_EARLY_STOP off all K judges are sent and awaited.
+    """
+    k = len(specs)
+    majority = k // 2 + 1
+    early_stop = getattr(config, "JUDGE_PANEL_EARLY_STOP", True)
+    ex = _executor()
+    counts = {lab: 0 for lab in allowed}
+    results = []
+    pending = set()
+    sent = 0
+
+    def _submit():
+        nonlocal sent
+        spec = specs[sent]
+        sent += 1
+        pending.add(ex.submit(_judge_once, match_data, spec["model"],
+                              spec["temperature"], spec["seed"], stage,
+                              prefix=prefix))
+
+    for _ in range(min(majority, k) if early_stop else k):
+        _submit()
+
+    decided = None
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            pending.discard(f)
+            r = f.result()
+            results.append(r)
+            if r["winner"] in counts:
+                counts[r["winner"]] += 1
+        if not early_stop:
+            continue
+        leader = max(counts, key=counts.get)
+        if counts[leader] >= majority:
+            decided = leader
+            break
+        need = majority - counts[leader]
+        while len(pending) < need and sent < k:
+            _submit()
+
+    abandoned = 0
+    for f in pending:
+        if not f.cancel():
+            abandoned += 1      # already running: finishes in background, usage still recorded
+
+    if decided is None:
+        # majority unreachable (abstentions): plurality, None on a tie
+        top = sorted(counts.values(), reverse=True)
+        decided = max(counts, key=counts.get) if top and top[0] > (top[1] if len(top) > 1 else 0) else None
+
+    completed = len(results)
+    votes_cast = sum(counts.values())
+    ordered = sorted(counts.values(), reverse=True) + [0]
+    return {
+        "winner": decided,
+        "results": results,
+        "panel": {
+            "size": k,
+            "majority": majority,
+            "sent": sent,
+            "completed": completed,
+            "abandoned_in_flight": abandoned,
+            "early_stopped": sent < k,
+            "votes": dict(counts),
+            "vote_fraction": {lab: (c / votes_cast if votes_cast else 0.0) for lab, c in counts.items()},
+            "margin": (ordered[0] - ordered[1]) / votes_cast if votes_cast else 0.0,
+        },
+    }
+
+
+def _full_judgement(match_data, allowed, prefix=None, stage=None):
+    """Single judge or panel; returns (verdict, winner, token_usage, extra fields)."""
+    specs = panel_specs()
+    if specs is None:
+        r = _judge_once(match_data, config.MODEL, config.TEMPERATURE, stage=stage or "judge",
+                        prefix=prefix)
+        details = {"format": r["format"], "confidence": r["confidence"]}
+        if r["assessment"] is not None:
+            details["assessment"] = r["assessment"]
+        return r["verdict"], r["winner"], _usage_dict(r["usage"]), details
+
+    out = _run_panel(match_data, allowed, specs, prefix, stage=stage or "judge_panel")
+    winner = out["winner"]
+    results = out["results"]
+    # representative verdict: first judge that voted with the panel
+    rep = next((r for r in results if r["winner"] == winner), results[0])
+    verdict = rep["verdict"]
+    if winner is not None and _extract_winner(verdict, allowed) != winner:
+        verdict += f"\nWINNER: {winner}"
+    token_usage = {
+        key: sum(_usage_dict(r["usage"])[key] for r in results)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    panel = out["panel"]
+    panel["judges"] = [
+        {
+            "model": r["model"],
+            "temperature": r["temperature"],
+            "seed": r["seed"],
+            "winner": r["winner"],
+            "verdict": r["verdict"],
+            "format": r["format"],
+            "confidence": r["confidence"],
+            "token_usage": _usage_dict(r["usage"]),
+        }
+        for r in results
+    ]
+    return verdict, winner, token_usage, {"panel": panel}
+
+
+def _cascade_tier1(match_data, cascade: dict, prefix=None, stage=None) -> dict:
+    """Short-output verdict from the cheap tier-1 judge (winner + confidence)."""
+    return _judge_once(
+        match_data,
+        cascade.get("model", config.MODEL),
+        cascade.get("temperature", 0.0),
+        stage=stage or "judge_tier1",
+        brief=True,
+        max_tokens=cascade.get("max_tokens", 40),
+        prefix=prefix,
+    )
+
+
+def sampled(tag: str, match_id, rate: float) -> bool:
+    """Deterministic per-match Bernoulli(rate) draw, so reruns pick the same matches."""
+    return rate > 0 and random.Random(f"{tag}:{match_id}").random() < rate
+
+
+def probe_debate(match_data, probe: dict, prefix=None) -> dict:
+    """
+    Cheap mid-debate verdict on the transcript so far (the cascade's tier-1
+    prompt): {"winner", "confidence", "token_usage"}. Not stored on match_data.
+    """
+    r = _judge_once(
+        match_data,
+        probe.get("model", config.MODEL),
+        probe.get("temperature", 0.0),
+        stage="judge_probe",
+        brief=True,
+        max_tokens=probe.get("max_tokens", 40),
+        prefix=prefix,
+    )
+    return {"winner": r["winner"], "confidence": r["confidence"],
+            "token_usage": _usage_dict(r["usage"])}
+
+
+def _decide(match_data, allowed, prefix=None, stage=None):
+    """
+    The configured verdict path (cascade, then single judge or panel):
+    (verdict, winner, token_usage, extra fields). *stage* bills every call
+    under that one cost stage instead of the per-role stages; digests.account
+    uses it to re-judge the full transcript the same way as the main verdict.
+    """
+    cascade = config.JUDGE_CASCADE
+
+    cascade_info = None
+    if cascade:
+        t1 = _cascade_tier1(match_data, cascade, prefix, stage)
+        conf = t1["confidence"]
+        confident = t1["winner"] is not None and conf is not None and conf >= cascade.get("threshold", 0.85)
+        audited = confident and sampled("audit", match_data.get("match_id"), cascade.get("audit_rate", 0.0))
+        escalated = not confident
+        cascade_info = {
+            "tier": 2 if escalated else 1,
+            "escalated": escalated,
+            "audited": audited,
+            "threshold": cascade.get("threshold", 0.85),
+            "tier1": {
+                "model": t1["model"],
+                "winner": t1["winner"],
+                "confidence": conf,
+                "token_usage": _usage_dict(t1["usage"]),
+            },
+        }
+
+    if cascade_info is None or cascade_info["escalated"] or cascade_info["audited"]:
+        verdict, winner, token_usage, details = _full_judgement(match_data, allowed, prefix, stage)
+    if cascade_info is not None:
+        t1_usage = cascade_info["tier1"]["token_usage"]
+        if cascade_info["escalated"]:
+            token_usage = {k: token_usage[k] + t1_usage[k] for k in token_usage}
+        elif cascade_info["audited"]:
+            # audit runs only for statistics; the tier-1 verdict stands
+            cascade_info["audit_winner"] = winner
+            token_usage = {k: token_usage[k] + t1_usage[k] for k in token_usage}
+            verdict, winner = t1["verdict"], t1["winner"]
+            details = {"format": t1["format"], "confidence": t1["confidence"]}
+        else:
+            verdict, winner, token_usage = t1["verdict"], t1["winner"], dict(t1_usage)
+            details = {"format": t1["format"], "confidence": t1["confidence"]}
+        details["cascade"] = cascade_info
+    return verdict, winner, token_usage, details
+
+
+def judge_debate(match_data, bus=None, prefix=None):
+    """
+    Evaluate the debate transcript and decide which debater was more persuasive.
+    The function builds the debate transcript, constructs a detailed prompt, and then queries the OpenAI API
+    to obtain the judge's verdict. It stores the token usage information and emits a
+    judge_completed event on *bus* (default: events.bus).
+
+    With config.JUDGE_PANEL set, a panel of judges votes instead (see _run_panel);
+    per-judge verdicts, vote counts/fractions and the margin are stored under
+    judge_evaluation["panel"], and token_usage sums the completed judges.
+
+    A single judge also records "format" ("json_schema" / "text"), "confidence"
+    (P(winner) from logprobs, None without them) and, for structured verdicts,
+    the per-side "assessment".
+
+    With config.JUDGE_CASCADE set, a cheap short-output judge decides first and
+    only low-confidence matches reach the judge/panel above; the tier-1 result
+    is stored under judge_evaluation["cascade"] and token_usage covers both tiers.
+
+    *prefix*: the match's shared system + context messages
+    (config.JUDGE_SHARE_CONTEXT_PREFIX), so judge calls reuse the debaters'
+    prompt-cache entry.
+    """
+    bus = bus or events.bus
+    _, allowed = build_judge_prompt(match_data)
+    verdict, winner, token_usage, details = _decide(match_data, allowed, prefix)
+    cascade_info = details.get("cascade")
+    if cascade_info is not None:
+        update_cascade_stats(
+            cascade_info["tier1"]["winner"],
+            cascade_info.get("audit_winner", winner),
+            escalated=cascade_info["escalated"],
+            audited=cascade_info["audited"],
+            confidence=cascade_info["tier1"]["confidence"],
+        )
+
+    panel = details.get("panel")
+    bus.emit(events.JUDGE_COMPLETED, match_id=match_data.get("match_id"),
+             verdict=verdict, winner=winner,
+             prompt_tokens=token_usage["prompt_tokens"],
+             completion_tokens=token_usage["completion_tokens"],
+             total_tokens=token_usage["total_tokens"],
+             panel_votes=(panel["votes"] if panel else None))
+
     match_data["judge_evaluation"] = {
         "verdict": verdict,
         "winner": winner,
-        "token_usage": {
-            "prompt_tokens": judge_usage.prompt_tokens,
-            "completion_tokens": judge_usage.completion_tokens,
-            "total_tokens": judge_usage.total_tokens,
-        }
+        "token_usage": token_usage,
+        **details,
     }
     return verdict
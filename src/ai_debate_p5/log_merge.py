@@ -0,0 +1,318 @@
+"""
+Streaming reader and merger for debate logs (scripts/merge_logs.py,
+compute_elo.py with several logs).
+
+Logs are read one match at a time, never whole:
+
+• Formats: run_debate.py / sweep logs ({"matches": [...], "global_stats",
+  "roster", ...} in any key order), legacy logs that are a bare list of
+  matches, and JSON-lines files (one match per line; lines without "turns"
+  carry top-level keys such as "roster").
+• Header: everything but the matches (global_stats, roster, …), read in a
+  first pass that skips over the match array.
+• Dedup: a match's content key is a hash of what was played and judged
+  (debaters per side, stances, opener, context variant, turn speakers and
+  texts, winner, verdict), not of its match_id or timestamp, so the same
+  match copied into several files or re-logged by a rerun counts once. Only
+  the 16-byte keys are kept in memory.
+• Compatibility: context fingerprints (context variant id → SHA-256, from
+  "context_variants" or, in older logs, "context_sha256" of the mode's
+  default ordering) and debater definitions must agree wherever two logs
+  name the same variant or debater id. on_mismatch="error" raises
+  LogMismatch, "skip" leaves the offending log out, "warn" keeps it.
+
+Merged matches are renumbered 1..n in input order and keep their origin under
+"merged_from" ({"log", "match_id"}).
+"""
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .roster import Debater, roster_ids
+from .stats_module import DebateStats
+
+_decoder = json.JSONDecoder()
+_WS = " \t\n\r"
+_CHUNK = 1 << 20
+
+MISMATCH_POLICIES = ("error", "skip", "warn")
+
+
+class LogMismatch(ValueError):
+    pass
+
+
+# ---------- streaming JSON ---------------------------------------------------
+
+class _Stream:
+    """Incremental JSON tokens over a text file: punctuation plus whole values."""
+
+    def __init__(self, f, chunk: int = _CHUNK):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        data = self.f.read(size or self.chunk)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise json.JSONDecodeError(f"expected {ch!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = _decoder.raw_decode(self.buf, self.pos)
+                # a value ending exactly at the buffer end may be cut short (numbers)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return v
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # read at least as much again as is pending, so a large value costs O(n)
+            if not self._fill(max(self.chunk, len(self.buf) - self.pos)) and self.pos >= len(self.buf):
+                raise json.JSONDecodeError("unexpected end of log", self.buf, self.pos)
+
+    def array(self) -> Iterator:
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.take("]")
+            return
+
+    def object_items(self) -> Iterator[Tuple[str, "_Stream"]]:
+        """Yields (key, self) positioned at each value; the consumer must read it."""
+        self.take("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.take(":")
+            yield key, self
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.take("}")
+            return
+
+
+def _events(path: Path, skip_matches: bool = False) -> Iterator[Tuple[str, object, object]]:
+    """("key", name, value) for top-level entries and ("match", None, match) per match."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                if "turns" in obj:
+                    if not skip_matches:
+                        yield "match", None, obj
+                else:
+                    for k, v in obj.items():
+                        yield "key", k, v
+            return
+        s = _Stream(f)
+        first = s.peek()
+        if first == "[":                    # legacy: a bare list of matches
+            for m in s.array():
+                if not skip_matches:
+                    yield "match", None, m
+            return
+        for key, st in s.object_items():
+            if key == "matches" and st.peek() == "[":
+                for m in st.array():
+                    if not skip_matches:
+                        yield "match", None, m
+            else:
+                yield "key", key, st.value()
+
+
+def read_header(path) -> dict:
+    """Every top-level entry of the log except the matches."""
+    return {k: v for kind, k, v in _events(Path(path), skip_matches=True) if kind == "key"}
+
+
+def iter_matches(path) -> Iterator[dict]:
+    """The log's matches, one at a time, in file order."""
+    for kind, _, m in _events(Path(path)):
+        if kind == "match":
+            yield m
+
+
+# ---------- keys and fingerprints --------------------------------------------
+
+def content_key(m: dict) -> bytes:
+    """16-byte hash of what was played and judged (ignores ids, timestamps, timings)."""
+    je = m.get("judge_evaluation") or {}
+    payload = [
+        m.get("side_to_debater_id") or [m.get("debater_side_a"), m.get("debater_side_b")],
+        m.get("stance_assignment"),
+        m.get("start_label"),
+        m.get("context_order"),
+        [(t.get("speaker"), t.get("content")) for t in m.get("turns") or ()],
+        m.get("winner") or je.get("winner"),
+        m.get("verdict") or je.get("verdict"),
+    ]
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def context_fingerprint(global_stats: Optional[dict]) -> Dict[str, str]:
+    """Context variant id → SHA-256 recorded by the run ({} when unknown)."""
+    gs = global_stats or {}
+    if gs.get("context_variants"):
+        return {vid: v["sha256"] for vid, v in gs["context_variants"].items()}
+    if gs.get("context_sha256"):
+        # older two-file runs hashed the mode's default ordering only
+        vid = "FCC+P5" if gs.get("context_order_mode") == "fcc_first" else "P5+FCC"
+        return {vid: gs["context_sha256"]}
+    return {}
+
+
+def roster_definitions(header: dict) -> Dict[str, dict]:
+    """Debater id → normalised definition from the log's roster ({} for legacy logs)."""
+    return {d.id: d.to_dict() for d in map(Debater.from_dict, header.get("roster") or ())}
+
+
+# ---------- merging ----------------------------------------------------------
+
+class LogMerger:
+    """
+    Streams matches from several logs: compatibility-checked, deduplicated,
+    renumbered. Iterate it (once) for the matches; afterwards ``summary()``
+    and ``global_stats()`` describe what was merged.
+    """
+
+    def __init__(self, paths: List, on_mismatch: str = "error"):
+        if on_mismatch not in MISMATCH_POLICIES:
+            raise ValueError(f"on_mismatch must be one of {MISMATCH_POLICIES}, not {on_mismatch!r}")
+        self.paths = [Path(p) for p in paths]
+        self.on_mismatch = on_mismatch
+        self.context: Dict[str, str] = {}
+        self.roster: Dict[str, dict] = {}
+        self.sources: List[dict] = []
+        self._headers: List[Tuple[Path, dict]] = []
+        self._check()
+
+    def _conflicts(self, ctx: Dict[str, str], roster: Dict[str, dict]) -> List[str]:
+        out = [f"context {vid}: {sha[:12]} vs {self.context[vid][:12]}"
+               for vid, sha in ctx.items() if vid in self.context and self.context[vid] != sha]
+        out += [f"debater {d!r}: {defn} vs {self.roster[d]}"
+                for d, defn in roster.items() if d in self.roster and self.roster[d] != defn]
+        return out
+
+    def _check(self) -> None:
+        for p in self.paths:
+            header = read_header(p)
+            ctx = context_fingerprint(header.get("global_stats"))
+            roster = roster_definitions(header)
+            problems = self._conflicts(ctx, roster)
+            src = {"log": str(p), "context_known": bool(ctx), "roster_known": bool(roster),
+                   "included": True, "matches": 0, "duplicates": 0}
+            if problems:
+                msg = f"{p} is incompatible with earlier logs: " + "; ".join(problems)
+                if self.on_mismatch == "error":
+                    raise LogMismatch(msg)
+                print(f"[warn] {msg}" + (" — skipped" if self.on_mismatch == "skip" else ""),
+                      file=sys.stderr)
+                src["problems"] = problems
+                if self.on_mismatch == "skip":
+                    src["included"] = False
+                    self.sources.append(src)
+                    continue
+            for vid, sha in ctx.items():
+                self.context.setdefault(vid, sha)
+            for d, defn in roster.items():
+                self.roster.setdefault(d, defn)
+            self.sources.append(src)
+            self._headers.append((p, header))
+
+    def __iter__(self) -> Iterator[dict]:
+        seen = set()
+        n = 0
+        included = [s for s in self.sources if s["included"]]
+        for src, (p, _) in zip(included, self._headers):
+            for m in iter_matches(p):
+                key = content_key(m)
+                if key in seen:
+                    src["duplicates"] += 1
+                    continue
+                seen.add(key)
+                n += 1
+                src["matches"] += 1
+                old = m.get("match_id")
+                m = dict(m)
+                m["match_id"] = n
+                m["merged_from"] = {"log": p.name, "match_id": old}
+                yield m
+
+    # ---- after iteration ------------------------------------------------
+    def debater_ids(self) -> List[str]:
+        """Union of the included logs' roster ids (config.DEBATERS for logs without one)."""
+        return list(dict.fromkeys(d for _, header in self._headers for d in roster_ids(header)))
+
+    def roster_list(self) -> List[dict]:
+        """Union of the logs' rosters, first definition of each id, in first-seen order."""
+        return list(self.roster.values())
+
+    def global_stats(self) -> dict:
+        """Source logs' global_stats merged (duplicates dropped here are still counted there)."""
+        combined = DebateStats()
+        for _, header in self._headers:
+            if header.get("global_stats"):
+                combined.merge(header["global_stats"])
+        return combined.to_dict()
+
+    def summary(self) -> dict:
+        return {
+            "sources": self.sources,
+            "matches": sum(s["matches"] for s in self.sources),
+            "duplicates_dropped": sum(s["duplicates"] for s in self.sources),
+            "context_variants": dict(self.context),
+        }
+
+
+def write_merged(merger: LogMerger, out_path) -> dict:
+    """Stream the merged log to *out_path* (run_debate.py layout); returns the summary."""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write('{\n  "matches": [')
+        for i, m in enumerate(merger):
+            body = json.dumps(m, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            f.write(("," if i else "") + "\n    " + body)
+        f.write("\n  ],\n")
+        tail = {"global_stats": merger.global_stats(), "roster": merger.roster_list(),
+                "merge": merger.summary()}
+        body = json.dumps(tail, ensure_ascii=False, indent=2)
+        f.write(body[body.index("\n") + 1:])           # drop the opening brace
+    return merger.summary()
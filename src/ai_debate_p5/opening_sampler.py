@@ -0,0 +1,268 @@
+"""
+Best-of-N opening selection: candidate sampling and scoring.
+
+Two modes, chosen per debater (config.DEBATERS keys, all optional):
+
+  "boN_mode":     "batch" (default) – one request with n=boN, as before
+                  "adaptive"        – sample in waves, stop early
+  "boN_scorer":   "sum_logprob" (batch default) | "mean_logprob"
+                  (adaptive default; length-normalised) | "judge"
+  "boN_wave":     candidates per wave (adaptive; default 2)
+  "boN_min_gain": stop once the expected score improvement of the next
+                  wave falls below this (adaptive; default 0.01)
+  "boN_split":    max completions per request; larger waves/batches are
+                  split into concurrent sub-requests (default: no split)
+
+Each wave is scored once, on its own drafts; earlier drafts keep their
+scores, so a judge scorer makes one call per wave over that wave only.
+A judge reply that cannot be parsed leaves its drafts unscored (−inf) and is
+counted in "scorer_failures"; if no draft got a judge score the drafts are
+ranked by mean logprob instead where the model returns logprobs
+("scorer_fallback").
+
+Adaptive stopping models candidate scores as normal and computes the
+expected improvement of the best score from one more wave:
+    EI = k · [ (μ − b)·Φ(z) + σ·φ(z) ],  z = (μ − b)/σ
+with b the best score so far and k the wave size. Models without logprobs
+give every candidate the same score, so adaptive mode stops after the first
+wave there (no signal to pay for).
+"""
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import config
+from .backends import get_backend
+from .cost_module import cached_tokens_of
+
+
+# ---------- helpers -------------------------------------------------------
+
+def token_logprobs(choice) -> Optional[List[float]]:
+    """Per-token logprobs of one backends.Choice, None if absent."""
+    return [t.logprob for t in choice.logprobs] if choice.logprobs else None
+
+
+def combine_usage(usages: Sequence) -> SimpleNamespace:
+    """Sum several usage objects into one usage-shaped object."""
+    p = sum(u.prompt_tokens for u in usages)
+    c = sum(u.completion_tokens for u in usages)
+    return SimpleNamespace(
+        prompt_tokens=p,
+        completion_tokens=c,
+        total_tokens=p + c,
+        prompt_tokens_details=SimpleNamespace(
+            cached_tokens=sum(cached_tokens_of(u) for u in usages)),
+    )
+
+
+# ---------- scorers -------------------------------------------------------
+# Signature: scorer(drafts, logprobs) -> np.ndarray of scores (higher = better)
+
+def _flat_reduce(lps: Sequence[Optional[List[float]]]):
+    """Sums and lengths of ragged logprob lists in one vectorised pass."""
+    lens = np.array([len(x) if x else 0 for x in lps], dtype=np.int64)
+    if lens.sum() == 0:
+        return np.zeros(len(lps)), lens
+    flat = np.concatenate([np.asarray(x, dtype=np.float64) for x in lps if x])
+    starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    sums = np.zeros(len(lps))
+    nz = lens > 0
+    sums[nz] = np.add.reduceat(flat, starts[nz])
+    return sums, lens
+
+
+def _missing_last(scores: np.ndarray, lens: np.ndarray) -> np.ndarray:
+    # drafts without logprobs never beat drafts that have them
+    if lens.any():
+        scores[lens == 0] = -np.inf
+    return scores
+
+
+def sum_logprob(drafts, lps) -> np.ndarray:
+    """Legacy score: summed token logprob (favours short drafts)."""
+    sums, lens = _flat_reduce(lps)
+    return _missing_last(sums, lens)
+
+
+def mean_logprob(drafts, lps) -> np.ndarray:
+    """Length-normalised score: mean token logprob per draft."""
+    sums, lens = _flat_reduce(lps)
+    return _missing_last(np.divide(sums, lens, out=np.zeros_like(sums), where=lens > 0), lens)
+
+
+class JudgeScorer:
+    """Score drafts 1–10 with one cheap judge-model call (no logprobs needed)."""
+
+    def __init__(self, model: Optional[str] = None, side: str = ""):
+        self.model = model or getattr(config, "OPENING_SCORER_MODEL", config.MODEL)
+        self.side = side
+        self.usages: List = []
+        self.failures = 0               # replies without one score per draft
+
+    def __call__(self, drafts, lps) -> np.ndarray:
+        listing = "\n\n".join(f"[{i}]\n{d}" for i, d in enumerate(drafts))
+        prompt = (
+            f"Rate each opening argument for {self.side} from 1 (weak) to 10 (compelling) on "
+            "persuasiveness and use of evidence. Reply with JSON only: "
+            '{"scores": [<one number per draft, in order>]}\n\n' + listing
+        )
+        backend = get_backend(self.model)
+        json_mode = backend.capabilities(self.model).structured_output
+        gen = backend.generate(
+            self.model,
+            [{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=16 + 6 * len(drafts),
+            response_format={"type": "json_object"} if json_mode else None,
+        )
+        self.usages.append(gen.usage)
+        try:
+            scores = json.loads(gen.text)["scores"]
+            out = np.asarray([float(x) for x in scores], dtype=np.float64)
+            if out.shape[0] == len(drafts):
+                return out
+        except (ValueError, KeyError, TypeError):
+            pass
+        self.failures += 1
+        return np.full(len(drafts), -np.inf)      # unscored; never beats a scored draft
+
+
+SCORERS: Dict[str, Callable] = {
+    "sum_logprob": sum_logprob,
+    "mean_logprob": mean_logprob,
+}
+
+
+def _make_scorer(name: str, side: str):
+    if name == "judge":
+        return JudgeScorer(side=side)
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f"unknown boN_scorer {name!r}; choose from {sorted(SCORERS) + ['judge']}") from None
+
+
+# ---------- sampling --------------------------------------------------------
+
+def _sample(messages, k: int, model_name: str, temperature: float,
+            want_logprobs: bool, endpoint_group: Optional[str], split: Optional[int]):
+    """
+    k completions, split into concurrent sub-requests of at most *split*
+    (and never more than the backend's declared max_n).
+    """
+    backend = get_backend(model_name, endpoint_group)
+    max_n = backend.capabilities(model_name).max_n
+    split = min(split, max_n) if split else (max_n if max_n < k else None)
+    sizes = [k] if not split or split >= k else [split] * (k // split) + ([k % split] if k % split else [])
+
+    def _one(n):
+        return backend.generate(
+            model_name,
+            messages,
+            n=n,
+            temperature=temperature,
+            max_tokens=config.MAX_TOKENS_PER_RESPONSE,
+            logprobs=want_logprobs,
+        )
+
+    if len(sizes) == 1:
+        responses = [_one(sizes[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(sizes)) as ex:
+            responses = list(ex.map(_one, sizes))
+    choices = [c for r in responses for c in r.choices]
+    return choices, [r.usage for r in responses]
+
+
+def expected_improvement(scores: np.ndarray, k: int) -> float:
+    """EI of the max over k more normal draws (see module docstring)."""
+    scores = scores[np.isfinite(scores)]
+    if scores.size < 2:
+        return float("inf")
+    mu, sd, best = float(scores.mean()), float(scores.std(ddof=1)), float(scores.max())
+    if sd <= 0.0:
+        return 0.0
+    z = (mu - best) / sd
+    pdf = math.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi)
+    cdf = 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
+    return k * ((mu - best) * cdf + sd * pdf)
+
+
+def best_of_n(messages, boN: int, model_name: str, temperature: float,
+              endpoint_group: Optional[str] = None, sampling: Optional[dict] = None,
+              side: str = "") -> dict:
+    """
+    Sample up to *boN* drafts and return the best one.
+
+    Returns {"text", "usage" (combined generation usage), "usages" (one per
+    generation request), "scorer_usages" (judge-scorer calls), "n_generated",
+    "waves", "score" (None if unscored), "scorer", "scorer_failures",
+    "scorer_fallback"}.
+    """
+    sampling = sampling or {}
+    mode = sampling.get("boN_mode", "batch")
+    scorer_name = sampling.get("boN_scorer", "mean_logprob" if mode == "adaptive" else "sum_logprob")
+    split = sampling.get("boN_split")
+    scorer = _make_scorer(scorer_name, side)
+    # also with the judge scorer: logprobs rank the drafts if its replies fail
+    want_logprobs = get_backend(model_name, endpoint_group).capabilities(model_name).logprobs
+
+    drafts: List[str] = []
+    lps: List[Optional[List[float]]] = []
+    usages: List = []
+    waves = 0
+    scores = np.zeros(0)
+
+    if mode == "adaptive":
+        wave = max(1, int(sampling.get("boN_wave", 2)))
+        min_gain = float(sampling.get("boN_min_gain", 0.01))
+        while len(drafts) < boN:
+            k = min(wave if waves else max(wave, 2), boN - len(drafts))
+            choices, us = _sample(messages, k, model_name, temperature,
+                                  want_logprobs, endpoint_group, split)
+            usages.extend(us)
+            waves += 1
+            new_drafts = [c.text.strip() for c in choices]
+            new_lps = [token_logprobs(c) for c in choices]
+            drafts.extend(new_drafts)
+            lps.extend(new_lps)
+            # score this wave only; earlier drafts keep the scores they got
+            scores = np.concatenate((scores, np.asarray(scorer(new_drafts, new_lps),
+                                                        dtype=np.float64)))
+            if scorer_name != "judge":
+                # drafts without logprobs rank last across waves too
+                scores = _missing_last(scores, _flat_reduce(lps)[1])
+            remaining = boN - len(drafts)
+            if remaining <= 0 or expected_improvement(scores, min(wave, remaining)) < min_gain:
+                break
+    else:
+        choices, us = _sample(messages, boN, model_name, temperature,
+                              want_logprobs, endpoint_group, split)
+        usages.extend(us)
+        waves = 1
+        drafts = [c.text.strip() for c in choices]
+        lps = [token_logprobs(c) for c in choices]
+        scores = np.asarray(scorer(drafts, lps), dtype=np.float64) if len(drafts) > 1 else np.zeros(1)
+
+    fallback = None
+    if scores.size > 1 and not np.isfinite(scores).any() and any(lps):
+        scores, fallback = mean_logprob(drafts, lps), "mean_logprob"
+    best = int(np.argmax(scores)) if scores.size else 0
+    scorer_usages = list(getattr(scorer, "usages", []))
+    return {
+        "text": drafts[best],
+        "usage": combine_usage(usages),
+        "usages": usages,
+        "scorer_usages": scorer_usages,
+        "n_generated": len(drafts),
+        "waves": waves,
+        "score": float(scores[best]) if scores.size and np.isfinite(scores[best]) else None,
+        "scorer": scorer_name,
+        "scorer_failures": getattr(scorer, "failures", 0),
+        "scorer_fallback": fallback,
+    }
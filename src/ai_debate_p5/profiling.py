@@ -0,0 +1,224 @@
+"""
+Per-stage wall / CPU attribution for run_debate.py and compute_elo.py --profile.
+
+Named stages are marked in the code with
+
+    with profiling.stage("turn"):
+        ...
+
+and nest: "api" inside "turn" is charged to "api", and "turn" keeps only its
+self time apart from the inclusive total. Stages used:
+
+    context_load, opening, turn, judge, stats, log_write   (run_debate.py)
+    log_load, win_matrix, fit, write                       (compute_elo.py)
+    probe        – early-stop probe verdicts (config.EARLY_STOP)
+    api          – model calls (network wait + SDK parsing)
+    prompt_build – message / payload construction
+    cleanup      – source-tag regex, sentence trimming, wasted-token count
+
+Per stage: calls, inclusive and self wall time, thread CPU time and the
+difference (time spent waiting: network, locks, sleeps), with per-call p95
+from a QuantileSketch. Stages on worker threads (judge panel, hedges) are
+timed on their own thread, so summed self time can exceed the run's wall time.
+
+Optionally a sampling profiler snapshots every thread's stack at a fixed
+interval (sys._current_frames) and writes collapsed stacks, one
+"frame;frame;… count" line each, for flamegraph.pl / speedscope. Each stack is
+prefixed with the thread's open stages ("[turn];[api];…"). Samples are wall
+clock: a thread blocked on a socket is sampled like a busy one.
+
+Disabled (the default), stage() returns one shared no-op context manager;
+the cost is a function call and an attribute check.
+"""
+import contextlib
+import csv
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from .stats_module import QuantileSketch
+
+_NOOP = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("prof", "name", "frame")
+
+    def __init__(self, prof: "Profiler", name: str):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.frame = self.prof._push(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.prof._pop(self.frame)
+
+
+class Profiler:
+    """Process-wide stage timers and the optional stack sampler."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._open = {}                 # thread ident → its stack of open frames
+        self._totals = {}               # stage → {"calls", "wall_s", "cpu_s", "self_wall_s", "self_cpu_s"}
+        self._sketches = {}             # stage → QuantileSketch of per-call wall time (s)
+        self._samples = Counter()
+        self._sampler = None
+        self._stop = threading.Event()
+        self.interval_s = None
+
+    # ---- control ------------------------------------------------------
+    def enable(self, sample_interval_s: Optional[float] = None) -> None:
+        self.reset()
+        self.enabled = True
+        if sample_interval_s:
+            self.interval_s = sample_interval_s
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler",
+                                             daemon=True)
+            self._sampler.start()
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals = {}
+            self._sketches = {}
+            self._samples = Counter()
+
+    # ---- timers -------------------------------------------------------
+    def _stack(self) -> list:
+        st = getattr(self._local, "stack", None)
+        if st is None:
+            st = self._local.stack = []
+            with self._lock:
+                self._open[threading.get_ident()] = st
+        return st
+
+    def _push(self, name: str) -> list:
+        # [name, wall start, cpu start, child wall, child cpu]
+        frame = [name, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        self._stack().append(frame)
+        return frame
+
+    def _pop(self, frame: list) -> None:
+        wall = time.perf_counter() - frame[1]
+        cpu = time.thread_time() - frame[2]
+        st = self._stack()
+        st.pop()
+        if st:
+            st[-1][3] += wall
+            st[-1][4] += cpu
+        name = frame[0]
+        with self._lock:
+            t = self._totals.get(name)
+            if t is None:
+                t = self._totals[name] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                          "self_wall_s": 0.0, "self_cpu_s": 0.0}
+                self._sketches[name] = QuantileSketch()
+            t["calls"] += 1
+            t["wall_s"] += wall
+            t["cpu_s"] += cpu
+            t["self_wall_s"] += wall - frame[3]
+            t["self_cpu_s"] += cpu - frame[4]
+            self._sketches[name].add(wall)
+
+    # ---- sampler ------------------------------------------------------
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            with self._lock:
+                open_stages = {ident: [f[0] for f in st] for ident, st in self._open.items()}
+            batch = []
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                stack.reverse()
+                prefix = [names.get(ident, str(ident))] + [f"[{s}]" for s in open_stages.get(ident, ())]
+                batch.append(";".join(prefix + stack))
+            with self._lock:
+                self._samples.update(batch)
+
+    # ---- reports ------------------------------------------------------
+    def rows(self) -> list:
+        """One dict per stage, largest self wall time first."""
+        with self._lock:
+            total_self = sum(t["self_wall_s"] for t in self._totals.values()) or 1.0
+            out = []
+            for name, t in self._totals.items():
+                out.append({
+                    "stage": name,
+                    **t,
+                    "wait_s": max(0.0, t["self_wall_s"] - t["self_cpu_s"]),
+                    "mean_ms": 1000 * t["wall_s"] / t["calls"],
+                    "p95_ms": 1000 * self._sketches[name].quantile(0.95),
+                    "share": t["self_wall_s"] / total_self,
+                })
+        return sorted(out, key=lambda r: -r["self_wall_s"])
+
+    def format_table(self) -> str:
+        head = ["stage", "calls", "wall s", "self s", "cpu s", "wait s", "mean ms", "p95 ms", "share"]
+        body = [[r["stage"], str(r["calls"]), f"{r['wall_s']:.3f}", f"{r['self_wall_s']:.3f}",
+                 f"{r['self_cpu_s']:.3f}", f"{r['wait_s']:.3f}", f"{r['mean_ms']:.2f}",
+                 f"{r['p95_ms']:.2f}", f"{r['share']:.1%}"] for r in self.rows()]
+        widths = [max(len(x) for x in col) for col in zip(head, *body)]
+        fmt = lambda cells: "  ".join(x.rjust(w) if i else x.ljust(w)
+                                      for i, (x, w) in enumerate(zip(cells, widths)))
+        return "\n".join([fmt(head), fmt(["-" * w for w in widths]), *map(fmt, body)])
+
+    def write(self, base_path) -> list:
+        """
+        <base>_profile.csv (stage table) and, when sampling, <base>_profile.collapsed;
+        returns the paths written.
+        """
+        base = Path(base_path)
+        table = base.with_name(base.stem + "_profile.csv")
+        table.parent.mkdir(parents=True, exist_ok=True)
+        cols = ["stage", "calls", "wall_s", "self_wall_s", "cpu_s", "self_cpu_s", "wait_s",
+                "mean_ms", "p95_ms", "share"]
+        with table.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(cols)
+            for r in self.rows():
+                w.writerow([r["stage"], r["calls"]] + [f"{r[c]:.6f}" for c in cols[2:]])
+        written = [table]
+        with self._lock:
+            samples = sorted(self._samples.items())
+        if samples:
+            collapsed = base.with_name(base.stem + "_profile.collapsed")
+            with collapsed.open("w", encoding="utf-8") as f:
+                for stack, n in samples:
+                    f.write(f"{stack} {n}\n")
+            written.append(collapsed)
+        return written
+
+
+# Process-wide profiler, like cost_module.ledger
+profiler = Profiler()
+
+
+def stage(name: str):
+    """Time the enclosed block as *name* when profiling is on; a no-op otherwise."""
+    if profiler.enabled:
+        return _Timer(profiler, name)
+    return _NOOP
@@ -0,0 +1,55 @@
+"""
+Canonical, prefix-cache-friendly message layout.
+
+Every call that shares a context (same context_sha256) starts with the same
+two messages, byte for byte:
+
+    system: config.SYSTEM_PROMPT
+    user:   "Debate topic: …\\n\\nContext:\\n<static context>"
+
+Anything that varies per call — side, stance, the transcript so far, judge
+instructions — comes after this prefix. Provider-side prompt caching (and
+KV-cache reuse on self-hosted servers) only matches on an exact leading
+prefix, so openings, turns and (optionally) the judge then all hit the same
+cache entry instead of each embedding the context at a different offset.
+"""
+import functools
+import hashlib
+from typing import List
+
+import config
+
+
+@functools.lru_cache(maxsize=64)
+def context_sha256(static_context: str) -> str:
+    return hashlib.sha256(static_context.encode("utf-8")).hexdigest()
+
+
+def context_prefix(static_context: str, initial_topic: str) -> List[dict]:
+    """The shared leading messages (fresh list; the strings are identical)."""
+    return [
+        {"role": "system", "content": config.SYSTEM_PROMPT},
+        {"role": "user", "content": f"Debate topic: {initial_topic}\n\nContext:\n{static_context}"},
+    ]
+
+
+def opening_instruction(side: str, stance_text: str) -> dict:
+    return {
+        "role": "user",
+        "content": (
+            f"You are a debater advocating for {side}. {stance_text}\n\n"
+            "Please write your opening argument. Use only the provided context."
+        ),
+    }
+
+
+def turn_instruction(side: str, stance_text: str, first_reply: bool = False) -> dict:
+    tail = " End on a complete sentence; do not stop mid-sentence." if first_reply else ""
+    return {
+        "role": "user",
+        "content": (
+            f"You are advocating for {side}. {stance_text}\n"
+            f"Base your response only on the provided context. Do not include salutations.{tail}\n\n"
+            f"{side}, please respond to your opponent."
+        ),
+    }
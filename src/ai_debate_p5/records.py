@@ -0,0 +1,283 @@
+"""
+Compact in-memory match records: what run_all_matches keeps for the run.
+
+A match is built as a plain dict while it plays (judge, probes and digests
+read it). With config.TRANSCRIPT_SPILL set it is compacted into a MatchRecord
+once it finishes; without it run_all_matches keeps the plain dicts, so callers
+that mutate, isinstance-check or json.dump the log need no adapter.
+
+• MatchRecord / TurnRecord / VerdictRecord (judge_evaluation) are __slots__
+  classes instead of dicts; the key order of the original dict is kept as a
+  shared, interned tuple, so every record of the same shape points at one
+  tuple rather than carrying its own keys.
+• Speaker / stance / winner / context-order labels and debater ids are
+  interned; label maps (stance_assignment, side_to_debater_id), of which a
+  run has only a handful, are stored as shared tuples of items. Numeric maps
+  (token_usage) differ per match and are stored as unshared item tuples.
+• With config.TRANSCRIPT_SPILL set to a path, turn contents and verdict texts
+  are appended to that file (UTF-8, append-only, one process-wide store per
+  path) and the record keeps only (offset, length); they are read back on
+  access. The file grows across runs; delete it between runs if unwanted.
+• Keys outside the typed fields (early_stop, round_digests, panel, …) are
+  kept as given.
+
+Records are read-only Mappings (m["turns"], m.get("winner")), so code that
+only reads the dicts keeps working, and to_dict() rebuilds the original dict
+exactly, key order included. Pass json_default as json.dump's ``default`` to
+serialise a MatchLog record by record.
+"""
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Optional
+
+import config
+
+_shapes = {}          # key-order tuple → the shared instance
+_item_tuples = {}     # label-map items → the shared instance
+
+
+def _shape(keys) -> tuple:
+    t = tuple(sys.intern(k) for k in keys)
+    return _shapes.setdefault(t, t)
+
+
+def _label(v):
+    return sys.intern(v) if type(v) is str else v
+
+
+def _items(d: dict) -> tuple:
+    t = tuple((sys.intern(k), _label(v)) for k, v in d.items())
+    return _item_tuples.setdefault(t, t)
+
+
+def _pairs(d: dict) -> tuple:
+    return tuple((sys.intern(k), v) for k, v in d.items())
+
+
+# ---------- blob spill -----------------------------------------------------
+
+class Blob:
+    """Text spilled to a BlobStore: (offset, length) in bytes."""
+
+    __slots__ = ("store", "offset", "length")
+
+    def __init__(self, store: "BlobStore", offset: int, length: int):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+    def text(self) -> str:
+        return self.store.read(self.offset, self.length)
+
+
+class BlobStore:
+    """Append-only UTF-8 text file; put() returns a Blob referencing it."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._w = open(self.path, "ab")
+        self._size = self._w.tell()
+        self._r = os.open(self.path, os.O_RDONLY)
+
+    def put(self, text: str) -> Blob:
+        data = text.encode("utf-8")
+        with self._lock:
+            off = self._size
+            self._w.write(data)
+            self._size += len(data)
+        return Blob(self, off, len(data))
+
+    def read(self, offset: int, length: int) -> str:
+        with self._lock:
+            self._w.flush()
+        return os.pread(self._r, length, offset).decode("utf-8")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def spill_store() -> Optional[BlobStore]:
+    """The store for config.TRANSCRIPT_SPILL (one per path), or None when off."""
+    where = getattr(config, "TRANSCRIPT_SPILL", None)
+    if not where:
+        return None
+    with _stores_lock:
+        if where not in _stores:
+            _stores[where] = BlobStore(where)
+        return _stores[where]
+
+
+# ---------- records ---------------------------------------------------------
+
+class _Record(Mapping):
+    """
+    Typed fields live in slots named after their key; ``_KINDS`` says how
+    each is stored: "plain" as given, "label" interned, "items" a shared label
+    map, "pairs" an unshared map (numbers), "labels" a label list, "text" spillable, "turns" / "verdict" nested records.
+    """
+
+    __slots__ = ()
+    _KINDS = {}
+
+    @classmethod
+    def from_dict(cls, d: dict, blobs: Optional[BlobStore] = None, _memo=None) -> "_Record":
+        memo = {} if _memo is None else _memo
+        r = cls.__new__(cls)
+        extra = None
+        for k, v in d.items():
+            kind = cls._KINDS.get(k)
+            if kind is None:
+                extra = {} if extra is None else extra
+                extra[k] = v
+            else:
+                setattr(r, k, _encode(kind, v, blobs, memo))
+        r._keys = _shape(d)
+        r._extra = extra
+        return r
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        kind = self._KINDS.get(key)
+        if kind is None:
+            return self._extra[key]
+        return _decode(kind, getattr(self, key))
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def to_dict(self) -> dict:
+        """The dict this record was built from (same keys, order and values)."""
+        out = {}
+        for k in self._keys:
+            v = self[k]
+            if isinstance(v, _Record):
+                v = v.to_dict()
+            elif self._KINDS.get(k) == "turns":
+                v = [t.to_dict() for t in v]
+            out[k] = v
+        return out
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class TurnRecord(_Record):
+    __slots__ = ("_keys", "_extra", "turn_number", "speaker", "tokens_used_prompt",
+                 "tokens_used_completion", "tokens_used_completion_all", "tokens_cached_prompt",
+                 "request_bytes", "content", "timing", "usage_estimated", "reused_node")
+    _KINDS = {
+        "turn_number": "plain",
+        "speaker": "label",
+        "tokens_used_prompt": "plain",
+        "tokens_used_completion": "plain",
+        "tokens_used_completion_all": "plain",
+        "tokens_cached_prompt": "plain",
+        "request_bytes": "plain",
+        "content": "text",
+        "timing": "plain",
+        "usage_estimated": "plain",
+        "reused_node": "label",
+    }
+
+
+class VerdictRecord(_Record):
+    __slots__ = ("_keys", "_extra", "verdict", "winner", "token_usage", "format", "confidence")
+    _KINDS = {
+        "verdict": "text",
+        "winner": "label",
+        "token_usage": "pairs",
+        "format": "label",
+        "confidence": "plain",
+    }
+
+
+class MatchRecord(_Record):
+    __slots__ = ("_keys", "_extra", "match_id", "timestamp", "turns", "stance_assignment",
+                 "judge_evaluation", "winner", "side_labels", "side_to_debater_id",
+                 "start_label", "verdict", "context_order")
+    _KINDS = {
+        "match_id": "plain",
+        "timestamp": "plain",
+        "turns": "turns",
+        "stance_assignment": "items",
+        "judge_evaluation": "verdict",
+        "winner": "label",
+        "side_labels": "labels",
+        "side_to_debater_id": "items",
+        "start_label": "label",
+        "verdict": "text",
+        "context_order": "label",
+    }
+
+
+def _encode(kind: str, v, blobs: Optional[BlobStore], memo: dict):
+    if kind == "plain" or v is None:
+        return v
+    if kind == "label":
+        return _label(v)
+    if kind == "items":
+        return _items(v)
+    if kind == "pairs":
+        return _pairs(v)
+    if kind == "labels":
+        return tuple(_label(x) for x in v)
+    if kind == "text":
+        if blobs is None or type(v) is not str:
+            return v
+        if id(v) not in memo:               # verdict text appears twice per match
+            memo[id(v)] = (v, blobs.put(v))
+        return memo[id(v)][1]
+    if kind == "turns":
+        return tuple(TurnRecord.from_dict(t, blobs, memo) for t in v)
+    if kind == "verdict":
+        return VerdictRecord.from_dict(v, blobs, memo)
+    raise ValueError(f"unknown record field kind {kind!r}")
+
+
+def _decode(kind: str, v):
+    if v is None:
+        return v
+    if kind == "text":
+        return v.text() if isinstance(v, Blob) else v
+    if kind in ("items", "pairs"):
+        return dict(v)
+    if kind in ("labels", "turns"):
+        return list(v)
+    return v
+
+
+class MatchLog(list):
+    """
+    run_all_matches' result. With *compact* (default: only when a spill store
+    is given) matches are kept as MatchRecords sharing that store; otherwise
+    as the plain dicts they were built as.
+    """
+
+    def __init__(self, blobs: Optional[BlobStore] = None, compact: Optional[bool] = None):
+        super().__init__()
+        self.blobs = blobs
+        self.compact = blobs is not None if compact is None else compact
+
+    def add(self, match_data: dict):
+        rec = MatchRecord.from_dict(match_data, self.blobs) if self.compact else match_data
+        self.append(rec)
+        return rec
+
+
+def json_default(o):
+    """json.dump ``default`` hook: records serialise to their original dicts."""
+    if isinstance(o, _Record):
+        return o.to_dict()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
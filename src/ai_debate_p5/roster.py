@@ -0,0 +1,50 @@
+"""
+Lightweight debater roster schema.
+
+Pure-Python (no openai / numpy imports) so analysis tools can read a roster
+from config.DEBATERS or from a finished log without touching the SDK.
+run_debate.py records the roster it ran with under the log's "roster" key.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+_CORE_KEYS = ("id", "boN", "temperature", "model")
+
+
+@dataclass(frozen=True)
+class Debater:
+    id: str
+    boN: int = 1
+    temperature: float = 0.7
+    model: str = "gpt-4o-mini"
+    extra: Dict[str, Any] = field(default_factory=dict)   # any additional config keys
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Debater":
+        if "id" not in d:
+            raise ValueError(f"debater entry without 'id': {d!r}")
+        core = {k: d[k] for k in _CORE_KEYS if k in d}
+        extra = {k: v for k, v in d.items() if k not in _CORE_KEYS}
+        return cls(**core, extra=extra)
+
+    def to_dict(self) -> dict:
+        """Round-trips to the config.DEBATERS entry format."""
+        return {"id": self.id, "boN": self.boN, "temperature": self.temperature,
+                "model": self.model, **self.extra}
+
+
+def load_roster(log: Optional[dict] = None) -> List[Debater]:
+    """
+    Roster recorded in *log* (a parsed debate log) if present, otherwise
+    config.DEBATERS. Importing config is cheap: the client is built lazily.
+    """
+    if log is not None and log.get("roster"):
+        entries = log["roster"]
+    else:
+        import config
+        entries = config.DEBATERS
+    return [Debater.from_dict(d) for d in entries]
+
+
+def roster_ids(log: Optional[dict] = None) -> List[str]:
+    return [d.id for d in load_roster(log)]
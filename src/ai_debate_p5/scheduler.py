@@ -0,0 +1,387 @@
+"""
+Cost-aware match scheduling (config.MATCH_SCHEDULER).
+
+Match cost is far from uniform: the opener's best-of-N candidates, slower
+models and longer contexts make some matches several times longer than
+others. Issued in plain schedule order, the expensive ones tend to land at
+the end of a parallel run. Instead:
+
+• Prediction: each match gets a predicted duration, token count and USD cost
+  from its roster (turns per side, the opener's boN, each side's model, the
+  context variant's tokens, the judge call). Durations are "call units" times
+  a per-model seconds-per-unit (from telemetry) times a per-debater
+  correction; both corrections are geometric EWMAs of actual / predicted,
+  updated as matches finish, so a debater that is slower than its model and
+  boN suggest is pushed ahead in the queue.
+• Telemetry: "telemetry" names a previous run's _stats.json. Its "schedule"
+  block (the fitted model of that run) is reused as is; older stats fall
+  back to turn_timing (mean seconds and completion tokens per turn).
+• Pools: "pools" maps model → worker count (default: one "*" pool of
+  "workers" threads). A match queues on the pool of its costlier side's
+  model ("*", or the least loaded pool, for models without one).
+• Order: each pool takes its longest predicted match first (LPT); with
+  "steal" an idle pool takes the head of the pool with the most predicted
+  work left.
+• IDs: match IDs are fixed by the schedule before anything runs, so the
+  log (sorted by match_id) is the same whatever order matches finish in.
+• Report: global_stats["schedule"] – measured makespan, the makespan the
+  naive schedule order would have had on the same workers with the same
+  match durations, the predicted-LPT and ideal-LPT makespans, a lower bound,
+  steals, prediction error and predicted vs actual cost.
+
+Simulated makespans replay the measured durations on the total worker count
+with list scheduling; they ignore pool boundaries and the contention of
+running more matches at once.
+"""
+import heapq
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+from .cost_module import ledger as cost_ledger, Budget, price_tokens
+
+_DEFAULTS = {
+    "workers": 4,
+    "pools": None,
+    "steal": True,
+    "telemetry": None,
+    "candidate_weight": 0.5,
+    "alpha": 0.3,
+}
+DEFAULT_POOL = "*"
+
+
+def settings() -> Optional[dict]:
+    """config.MATCH_SCHEDULER with defaults filled in; None → sequential run."""
+    cfg = getattr(config, "MATCH_SCHEDULER", None)
+    if not cfg:
+        return None
+    if isinstance(cfg, int):
+        cfg = {"workers": cfg}
+    return {**_DEFAULTS, **cfg}
+
+
+def _match_turns(spec: dict) -> Tuple[int, int]:
+    """Turns of the opener and of the other side."""
+    t = config.TURNS_PER_MATCH
+    return (t + 1) // 2, t // 2
+
+
+def _sides(spec: dict) -> Tuple[dict, dict]:
+    """(opener, other) debater dicts."""
+    if spec["side_a_starts"]:
+        return spec["side_a"], spec["side_b"]
+    return spec["side_b"], spec["side_a"]
+
+
+# ---------- cost model -------------------------------------------------------
+
+class MatchCostModel:
+    """Predicted seconds / tokens / USD per match, corrected by finished matches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sec_per_unit: Dict[str, float] = {}     # model → seconds per call unit
+        self.default_sec_per_unit: Optional[float] = None
+        self.factor: Dict[str, float] = {}           # debater id → duration correction
+        self.token_scale = 1.0
+        self.completion_tokens: Optional[float] = None   # per debate turn
+        self.observed = 0
+        self.candidate_weight = _DEFAULTS["candidate_weight"]
+        self.alpha = _DEFAULTS["alpha"]
+
+    # ---- priors -------------------------------------------------------
+    def configure(self, cfg: dict) -> None:
+        self.candidate_weight = cfg["candidate_weight"]
+        self.alpha = cfg["alpha"]
+        if cfg.get("telemetry"):
+            self.seed(json.loads(Path(cfg["telemetry"]).read_text(encoding="utf-8")))
+
+    def seed(self, stats: dict) -> None:
+        """Priors from a run's global_stats / _stats.json (see module docstring)."""
+        stats = stats.get("global_stats", stats)
+        with self._lock:
+            fitted = (stats.get("schedule") or {}).get("model")
+            if fitted:
+                self.sec_per_unit.update(fitted.get("sec_per_unit") or {})
+                self.default_sec_per_unit = fitted.get("default_sec_per_unit")
+                self.factor.update(fitted.get("debater_factor") or {})
+                self.token_scale = fitted.get("token_scale", 1.0)
+                self.completion_tokens = fitted.get("completion_tokens")
+                return
+            tt = stats.get("turn_timing") or {}
+            if tt.get("turns"):
+                self.default_sec_per_unit = tt["total_s_sum"] / tt["turns"]
+                self.completion_tokens = tt["completion_tokens"] / tt["turns"]
+
+    # ---- prediction ---------------------------------------------------
+    def _spu(self, model: str) -> float:
+        return self.sec_per_unit.get(model, self.default_sec_per_unit or 1.0)
+
+    def _units(self, spec: dict) -> List[Tuple[dict, float]]:
+        """(debater, call units) for both sides; the opener also draws boN candidates."""
+        opener, other = _sides(spec)
+        n_open, n_other = _match_turns(spec)
+        extra = self.candidate_weight * max(0, opener.get("boN", 1) - 1)
+        return [(opener, n_open + extra), (other, n_other)]
+
+    def predict(self, spec: dict) -> dict:
+        """{"seconds", "prompt_tokens", "completion_tokens", "cost_usd"} for one match."""
+        with self._lock:
+            return self._predict(spec)
+
+    def _predict(self, spec: dict) -> dict:
+        sides = self._units(spec)
+        seconds = sum(u * self._spu(d["model"]) * self.factor.get(d["id"], 1.0) for d, u in sides)
+        seconds += self._spu(config.MODEL)                  # the judge call
+        turns = config.TURNS_PER_MATCH
+        seconds += turns * (config.TURN_PACING_SECONDS or 0)
+        variant = spec.get("variant") or (spec.get("contexts") or [None])[0]
+        ctx = variant.tokens if variant is not None else 0
+        comp = self.completion_tokens or config.MAX_TOKENS_PER_RESPONSE / 2
+        history = comp * (turns - 1) / 2                   # mean transcript before a turn
+        prompt = completion = cost = 0.0
+        for (d, _), n, opens in zip(sides, _match_turns(spec), (True, False)):
+            p = n * (ctx + history) * self.token_scale
+            c = (n + (max(0, d.get("boN", 1) - 1) if opens else 0)) * comp * self.token_scale
+            prompt, completion = prompt + p, completion + c
+            cost += price_tokens(d["model"], int(p), int(c))
+        p, c = (ctx + turns * comp) * self.token_scale, comp * self.token_scale
+        cost += price_tokens(config.MODEL, int(p), int(c))
+        return {"seconds": seconds, "prompt_tokens": int(prompt + p),
+                "completion_tokens": int(completion + c), "cost_usd": cost}
+
+    # ---- online correction --------------------------------------------
+    def observe(self, spec: dict, seconds: float, tokens: Optional[int] = None) -> None:
+        """Fold one finished match's duration (and tokens) into the corrections."""
+        with self._lock:
+            pred = self._predict(spec)
+            pacing = config.TURNS_PER_MATCH * (config.TURN_PACING_SECONDS or 0)
+            work, pred_work = seconds - pacing, pred["seconds"] - pacing
+            self.observed += 1
+            if work > 0 and pred_work > 0:
+                r = work / pred_work
+                if self.default_sec_per_unit is None:
+                    # first measurement sets the absolute scale for every model
+                    self.default_sec_per_unit = r
+                    self.sec_per_unit = {m: v * r for m, v in self.sec_per_unit.items()}
+                else:
+                    sides = self._units(spec)
+                    total = sum(u for _, u in sides) + 1
+                    for d, u in sides:
+                        self.factor[d["id"]] = (self.factor.get(d["id"], 1.0)
+                                                * r ** (self.alpha * u / total))
+                    for m in {d["model"] for d, _ in sides}:
+                        self.sec_per_unit[m] = self._spu(m) * r ** (self.alpha / 2)
+            want = pred["prompt_tokens"] + pred["completion_tokens"]
+            if tokens and want:
+                self.token_scale *= (tokens / want) ** self.alpha
+
+    def to_dict(self) -> dict:
+        """The fitted model; a later run's "telemetry" reuses it as its prior."""
+        with self._lock:
+            return {
+                "sec_per_unit": {m: round(v, 6) for m, v in self.sec_per_unit.items()},
+                "default_sec_per_unit": (round(self.default_sec_per_unit, 6)
+                                         if self.default_sec_per_unit is not None else None),
+                "debater_factor": {d: round(v, 4) for d, v in sorted(self.factor.items())},
+                "token_scale": round(self.token_scale, 4),
+                "completion_tokens": self.completion_tokens,
+                "observed": self.observed,
+            }
+
+
+cost_model = MatchCostModel()
+
+
+def actual_usage(m: dict, models: Dict[str, str]) -> Tuple[int, float]:
+    """(tokens, USD) a finished match spent on its turns and its judge (*models*: label → model)."""
+    tokens, cost = 0, 0.0
+    for t in m.get("turns") or ():
+        p = t.get("tokens_used_prompt") or 0
+        c = t.get("tokens_used_completion_all", t.get("tokens_used_completion")) or 0
+        tokens += p + c
+        cost += price_tokens(models.get(t.get("speaker"), config.MODEL), p, c)
+    usage = (m.get("judge_evaluation") or {}).get("token_usage") or {}
+    p, c = usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return tokens + p + c, cost + price_tokens(config.MODEL, p, c)
+
+
+# ---------- makespan simulation ----------------------------------------------
+
+def list_schedule(durations: List[float], workers: int) -> float:
+    """Makespan of handing *durations* out in order to the first free of *workers*."""
+    free = [0.0] * max(1, workers)
+    for d in durations:
+        heapq.heappush(free, heapq.heappop(free) + d)
+    return max(free) if durations else 0.0
+
+
+# ---------- scheduler --------------------------------------------------------
+
+class _Task:
+    __slots__ = ("spec", "pool", "prior", "pred", "calibrated", "start", "end", "stolen",
+                 "tokens", "cost")
+
+    def __init__(self, spec: dict, pool: str, pred: dict):
+        self.spec = spec
+        self.pool = pool
+        self.prior = self.pred = pred
+        self.start = self.end = None
+        self.stolen = self.calibrated = False
+        self.tokens = self.cost = None
+
+
+class MatchScheduler:
+    """Per-model worker pools draining LPT-ordered queues, with work stealing."""
+
+    def __init__(self, cfg: dict, model: MatchCostModel = cost_model,
+                 budget: Optional[Budget] = None):
+        self.cfg = cfg
+        self.model = model
+        self.budget = budget
+        pools = cfg["pools"] or {DEFAULT_POOL: cfg["workers"]}
+        self.pools = {name: max(1, int(n)) for name, n in pools.items()}
+        self.queues: Dict[str, List[_Task]] = {name: [] for name in self.pools}
+        self.tasks: List[_Task] = []
+        self.stop_reason: Optional[str] = None
+        self.steals = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._error: Optional[BaseException] = None
+
+    # ---- queueing -----------------------------------------------------
+    def _pool_for(self, spec: dict) -> str:
+        sides = self.model._units(spec)
+        heavy = max(sides, key=lambda s: s[1] * self.model._spu(s[0]["model"])
+                    * self.model.factor.get(s[0]["id"], 1.0))[0]
+        if heavy["model"] in self.pools:
+            return heavy["model"]
+        if DEFAULT_POOL in self.pools:
+            return DEFAULT_POOL
+        return min(self.pools, key=lambda p: sum(t.pred["seconds"] for t in self.queues[p])
+                   / self.pools[p])
+
+    def _resort(self) -> None:
+        """Ascending by predicted seconds, ties by descending match_id: pop() is next."""
+        for q in self.queues.values():
+            for t in q:
+                t.pred = self.model.predict(t.spec)
+            q.sort(key=lambda t: (t.pred["seconds"], -t.spec["match_id"]))
+        self._dirty = False
+
+    def _take(self, pool: str) -> Optional[_Task]:
+        with self._lock:
+            if self.stop_reason or self._error:
+                return None
+            if self.budget is not None:
+                self.stop_reason = self.budget.exceeded(cost_ledger)
+                if self.stop_reason:
+                    return None     # stop scheduling; in-flight matches finish
+            if self._dirty:
+                self._resort()
+            q = self.queues[pool]
+            stolen = False
+            if not q and self.cfg["steal"]:
+                victim = max(self.queues.values(), key=lambda v: sum(t.pred["seconds"] for t in v))
+                q, stolen = victim, True
+            if not q:
+                return None
+            task = q.pop()
+            task.stolen = stolen
+            self.steals += stolen
+            task.pred = dict(task.pred)     # prediction as of dispatch
+            task.calibrated = self.model.observed > 0 or self.model.default_sec_per_unit is not None
+            return task
+
+    # ---- running ------------------------------------------------------
+    def run(self, schedule: List[dict], play: Callable[[dict], dict],
+            finish: Callable[[dict, dict], None]) -> Optional[str]:
+        """
+        Play every spec of *schedule* with play(spec) → match dict; finish(spec,
+        match) runs under the scheduler lock as each match completes. Returns
+        the budget stop reason, if any. Re-raises the first match failure.
+        """
+        for spec in schedule:
+            pred = self.model.predict(spec)
+            task = _Task(spec, self._pool_for(spec), pred)
+            self.queues[task.pool].append(task)
+            self.tasks.append(task)
+        self._resort()
+        self._t0 = time.perf_counter()
+
+        def worker(pool: str) -> None:
+            while True:
+                task = self._take(pool)
+                if task is None:
+                    return
+                task.start = time.perf_counter() - self._t0
+                try:
+                    m = play(task.spec)
+                except BaseException as exc:    # surfaced by run() after the join
+                    with self._lock:
+                        self._error = self._error or exc
+                    return
+                task.end = time.perf_counter() - self._t0
+                task.tokens, task.cost = actual_usage(m, {
+                    config.SIDE_A_LABEL: task.spec["side_a"]["model"],
+                    config.SIDE_B_LABEL: task.spec["side_b"]["model"],
+                })
+                self.model.observe(task.spec, task.end - task.start, task.tokens)
+                with self._lock:
+                    self._dirty = True
+                    finish(task.spec, m)
+
+        threads = [threading.Thread(target=worker, args=(pool,), daemon=True,
+                                    name=f"match-{pool}-{i}")
+                   for pool, n in self.pools.items() for i in range(n)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        if self._error is not None:
+            raise self._error
+        return self.stop_reason
+
+    # ---- report -------------------------------------------------------
+    def report(self) -> dict:
+        """global_stats["schedule"]; simulated makespans reuse the measured durations."""
+        done = [t for t in self.tasks if t.end is not None]
+        workers = sum(self.pools.values())
+        dur = {t.spec["match_id"]: t.end - t.start for t in done}
+        naive = [dur[mid] for mid in sorted(dur)]
+        by_prior = sorted(done, key=lambda t: (-t.prior["seconds"], t.spec["match_id"]))
+        makespan = max((t.end for t in done), default=0.0)
+        naive_s = list_schedule(naive, workers)
+        errors = [abs(t.pred["seconds"] - dur[t.spec["match_id"]]) / dur[t.spec["match_id"]]
+                  for t in done if t.calibrated and dur[t.spec["match_id"]] > 0]
+        return {
+            "workers": dict(self.pools),
+            "steal": bool(self.cfg["steal"]),
+            "matches": len(done),
+            "matches_planned": len(self.tasks),
+            "steals": self.steals,
+            "makespan_s": round(makespan, 3),
+            "naive_makespan_s": round(naive_s, 3),
+            "lpt_predicted_makespan_s": round(list_schedule([dur[t.spec["match_id"]] for t in by_prior],
+                                                            workers), 3),
+            "lpt_ideal_makespan_s": round(list_schedule(sorted(naive, reverse=True), workers), 3),
+            "lower_bound_s": round(max(sum(naive) / workers, max(naive, default=0.0)), 3),
+            "speedup_vs_naive": round(naive_s / makespan, 3) if makespan else None,
+            "match_seconds_sum": round(sum(naive), 3),
+            "prediction": {
+                # only predictions made once a duration scale was known (telemetry or a finished match)
+                "seconds_mape": round(sum(errors) / len(errors), 4) if errors else None,
+                "calibrated_predictions": len(errors),
+                "predicted_cost_usd": round(sum(t.pred["cost_usd"] for t in done), 6),
+                "actual_cost_usd": round(sum(t.cost for t in done), 6),
+                "predicted_tokens": sum(t.pred["prompt_tokens"] + t.pred["completion_tokens"]
+                                        for t in done),
+                "actual_tokens": sum(t.tokens for t in done),
+            },
+            "by_pool": {p: sum(1 for t in done if t.pool == p) for p in self.pools},
+            "model": self.model.to_dict(),
+        }
@@ -1,33 +1,392 @@
+"""
+Run statistics.
+
+global_stats is a DebateStats: a dict holding the legacy counters (the keys
+every log / _stats.json has always had) plus streaming quantile sketches of
+tokens per turn, per call stage and per debater, and turn latency. All
+update_* functions lock the target, take an optional ``stats=`` (default
+global_stats) so workers can fill private accumulators, and DebateStats.merge
+combines accumulators, or _stats.json files written by other processes,
+commutatively: counters add, *_max/*_min keep the extreme, sketches add
+bucket counts, rates are recomputed.
+"""
 from typing import Optional
+import copy
+import functools
+import math
 import re
+import threading
 
 # Strict parser for a single-line structured verdict
 _WINNER_LINE = re.compile(r'^\s*WINNER:\s*(.+?)\s*$', re.IGNORECASE | re.MULTILINE)
 
+def _fresh_stats() -> dict:
+    return {
+        "total_matches": 0,
+        "total_turns": 0,
+        "total_prompt_tokens": 0,
+        "total_completion_tokens": 0,
+        "total_token_usage": 0,
+        "total_judge_calls": 0,
+        # Labels levels (e.g., "Strategy 1", "Strategy 2")
+        "wins_by_label": {},
+        # stance-level  (decoupled from labels); one key per context corpus,
+        # the engine adds the registered ones
+        "wins_by_stance": {"P5": 0, "FCC": 0},
+        # how often each per-match mapping is used (JSON-friendly string key)
+        # e.g., "Strategy 1->P5 | Strategy 2->FCC": 30
+        "stance_assignment_counts": {},
+        # matches / wins per context concatenation order ("P5+FCC", …)
+        "matches_by_context_order": {},
+        "wins_by_context_order": {},
+        "wins_by_stance_given_order": {},
+        # best-of-N opening sampling per debater (candidates, tokens saved)
+        "openings_by_debater": {},
+        # debate-turn latency and trimmed-tail waste (streamed or not)
+        "turn_timing": {
+            "turns": 0,
+            "streamed_turns": 0,
+            "stopped_early": 0,
+            "total_s_sum": 0.0,
+            "ttft_s_sum": 0.0,
+            "ttft_s_max": 0.0,
+            "tokens_per_s_sum": 0.0,
+            "completion_tokens": 0,
+            "wasted_tail_tokens": 0,
+        },
+        # cheap-first judge cascade (config.JUDGE_CASCADE)
+        "judge_cascade": {
+            "matches": 0,
+            "resolved_tier1": 0,
+            "escalated": 0,
+            "no_confidence": 0,
+            "audited": 0,
+            "escalation_rate": 0.0,
+            # tier-1 vs full-judge winner: on escalated matches, and on
+            # confident matches re-judged for audit (tier-1 accuracy estimate)
+            "agreement": {
+                "escalated": {"compared": 0, "agreed": 0},
+                "audited": {"compared": 0, "agreed": 0},
+            },
+        },
+        # round-by-round probe judging (config.EARLY_STOP)
+        "early_stop": {
+            "matches": 0,
+            "stopped_early": 0,
+            "probes": 0,
+            "turns_played": 0,
+            "turns_saved": 0,
+            # calibration matches always run to completion; early = the probe
+            # winner at the round the match would have stopped
+            "calibration": {"matches": 0, "would_stop": 0, "compared": 0, "agreed": 0},
+        },
+        # request payload per debate turn; full_history_bytes is what resending
+        # the whole messages array would have cost (config.STATEFUL_TURNS)
+        "conversation": {
+            "turns": 0,
+            "stateful_turns": 0,
+            "chained_turns": 0,
+            "fallbacks": 0,
+            "request_bytes": 0,
+            "full_history_bytes": 0,
+        },
+        # debate-tree turns (config.DEBATE_TREE): replayed from a stored prefix
+        # vs generated; *_reused is what the replayed turns originally cost
+        "debate_tree": {
+            "turns_generated": 0,
+            "turns_reused": 0,
+            "tokens_reused": 0,
+            "cost_reused_usd": 0.0,
+        },
+        # hedged turn / judge calls (config.HEDGE); extra_* is what the
+        # losing duplicates were billed
+        "hedging": {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_won": 0,
+            "budget_denied": 0,
+            "losers_cancelled": 0,
+            "extra_prompt_tokens": 0,
+            "extra_completion_tokens": 0,
+            "extra_cost_usd": 0.0,
+            "hedge_rate": 0.0,
+            "win_rate": 0.0,
+        },
+        # digest judging (config.JUDGE_DIGEST); *_prompt_tokens_est are offline
+        # counts of the judge prompt with digests vs the full transcript, and
+        # calibration matches are also judged on the full transcript
+        "judge_digest": {
+            "matches": 0,
+            "rounds_digested": 0,
+            "digests_cached": 0,
+            "digest_prompt_tokens": 0,
+            "digest_completion_tokens": 0,
+            "digest_cost_usd": 0.0,
+            "judge_prompt_tokens_est": 0,
+            "full_prompt_tokens_est": 0,
+            "agreement": {"compared": 0, "agreed": 0},
+        },
+    }
+
+
+# ---------- quantile sketch ------------------------------------------------
+
+class QuantileSketch:
+    """
+    Log-bucketed (HDR / DDSketch-style) histogram: a value v > 0 is counted in
+    bucket ceil(log_gamma v), gamma = (1 + alpha) / (1 - alpha), so every
+    quantile comes back within relative error *alpha* in O(log range) memory.
+    Values <= 0 share one bucket. merge() adds bucket counts: exact and
+    order-independent.
+    """
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.buckets = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        v = float(value)
+        self.count += 1
+        self.sum += v
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+        if v <= 0:
+            self.zero += 1
+        else:
+            i = math.ceil(math.log(v) / self._log_gamma)
+            self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.alpha != self.alpha:
+            raise ValueError(f"cannot merge sketches with alpha {self.alpha} and {other.alpha}")
+        for i, c in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        # nearest rank (0-based): the smallest value with at least q of the samples at or below it
+        rank = min(max(math.ceil(q * self.count) - 1, 0), self.count - 1)
+        if rank < self.zero:
+            return self.min
+        seen = self.zero
+        gamma = math.exp(self._log_gamma)
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                est = 2 * gamma ** i / (gamma + 1)      # bucket midpoint (relative)
+                return min(max(est, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        """Summary plus the raw buckets, so written stats can be merged later."""
+        empty = not self.count
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": None if empty else self.min,
+            "max": None if empty else self.max,
+            "mean": (self.sum / self.count) if self.count else None,
+            **{f"p{int(q * 100)}": self.quantile(q) for q in (0.5, 0.9, 0.95, 0.99)},
+            "sketch": {
+                "alpha": self.alpha,
+                "zero": self.zero,
+                "buckets": {str(i): c for i, c in sorted(self.buckets.items())},
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QuantileSketch":
+        sk = d["sketch"]
+        out = cls(sk["alpha"])
+        out.buckets = {int(i): int(c) for i, c in sk["buckets"].items()}
+        out.zero = int(sk["zero"])
+        out.count = int(d["count"])
+        out.sum = float(d["sum"])
+        out.min = math.inf if d["min"] is None else float(d["min"])
+        out.max = -math.inf if d["max"] is None else float(d["max"])
+        return out
+
+
+# ---------- stats object --------------------------------------------------
+
+# run metadata set by scripts (paths, hashes, seeds): kept when all parts
+# agree, dropped (None) otherwise — never summed
+_META_KEYS = {"context_path", "context_paths", "context_order_mode",
+              "context_order_seed", "context_bytes", "context_sha256",
+              "context_variants", "context_subset", "schedule"}
+# ratios recomputed from the merged counters by _refresh_derived
+_DERIVED_KEYS = {"escalation_rate", "average_tokens_per_turn", "prompt_cache"}
+
+
+def _merge_value(key, a, b):
+    if key in _META_KEYS:
+        return a if a == b else None
+    if isinstance(a, dict) and isinstance(b, dict):
+        out = dict(a)
+        for k, v in b.items():
+            out[k] = _merge_value(k, a[k], v) if k in a else copy.deepcopy(v)
+        return out
+    if isinstance(a, bool) or isinstance(b, bool):
+        return bool(a) or bool(b)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        if key.endswith("_max"):
+            return max(a, b)
+        if key.endswith("_min"):
+            return min(a, b)
+        return a + b
+    if isinstance(a, list) and isinstance(b, list):
+        return sorted(set(a) | set(b), key=str)
+    return a if a == b else None
+
+
+def prompt_cache_stats(cost: dict) -> dict:
+    """Cached share of prompt tokens, overall and per stage (from the ledger)."""
+    def _rate(b):
+        return {
+            "prompt_tokens": b["prompt_tokens"],
+            "cached_tokens": b["cached_prompt_tokens"],
+            "cache_hit_rate": (b["cached_prompt_tokens"] / b["prompt_tokens"]) if b["prompt_tokens"] else 0.0,
+        }
+    return {**_rate(cost["total"]),
+            "by_stage": {k: _rate(v) for k, v in cost["by_stage"].items()}}
+
+
+def _refresh_derived(s: dict) -> None:
+    c = s.get("judge_cascade")
+    if c is not None:
+        c["escalation_rate"] = c["escalated"] / c["matches"] if c["matches"] else 0.0
+    h = s.get("hedging")
+    if h is not None:
+        h["hedge_rate"] = h["hedged"] / h["calls"] if h["calls"] else 0.0
+        h["win_rate"] = h["hedge_won"] / h["hedged"] if h["hedged"] else 0.0
+    if "average_tokens_per_turn" in s:
+        s["average_tokens_per_turn"] = (s["total_token_usage"] / s["total_turns"]
+                                        if s["total_turns"] else 0.0)
+    if "cost" in s:
+        s["prompt_cache"] = prompt_cache_stats(s["cost"])
+
+
+class DebateStats(dict):
+    """
+    Legacy counter dict + quantile sketches behind one re-entrant lock.
+
+    Sketches (``distributions`` in to_dict()):
+    • tokens_per_turn      – prompt + completion tokens of each debate turn
+    • turn_latency_s       – wall time of each debate turn
+    • ttft_s               – time to first token of streamed turns
+    • by_stage[stage]      – tokens per API call (opening, turn, judge, …)
+    • by_debater[id]       – tokens per API call ("judge" for judge calls)
+    • hedge_served_latency_s[model] / hedge_primary_latency_s[model]
+                           – hedged-stage calls as served vs the primary alone
+    """
+
+    def __init__(self, alpha: float = 0.01):
+        super().__init__(_fresh_stats())
+        self.lock = threading.RLock()
+        self.alpha = alpha
+        self.sketches = {}
+
+    def reset(self) -> None:
+        """Zero everything in place (keeps the identity other modules imported)."""
+        with self.lock:
+            self.clear()
+            self.update(_fresh_stats())
+            self.sketches = {}
+
+    def observe(self, value: float, name: str, key: Optional[str] = None) -> None:
+        """Add *value* to sketch *name* (or *name*[*key*] for grouped sketches)."""
+        with self.lock:
+            if key is None:
+                sk = self.sketches.setdefault(name, QuantileSketch(self.alpha))
+            else:
+                sk = self.sketches.setdefault(name, {}).setdefault(key, QuantileSketch(self.alpha))
+            sk.add(value)
+
+    def quantile(self, name: str, q: float, key: Optional[str] = None) -> Optional[float]:
+        with self.lock:
+            sk = self.sketches.get(name)
+            if key is not None:
+                sk = (sk or {}).get(key)
+            return sk.quantile(q) if sk else None
+
+    def merge(self, other) -> "DebateStats":
+        """Fold *other* (a DebateStats or its to_dict()) into self; returns self."""
+        snap = other.to_dict() if isinstance(other, DebateStats) else other
+        dists = snap.get("distributions", {})
+        with self.lock:
+            for k, v in snap.items():
+                if k == "distributions" or k in _DERIVED_KEYS:
+                    continue
+                self[k] = _merge_value(k, self[k], v) if k in self else copy.deepcopy(v)
+            for name, d in dists.items():
+                if "sketch" in d:
+                    self.sketches.setdefault(name, QuantileSketch(d["sketch"]["alpha"])).merge(
+                        QuantileSketch.from_dict(d))
+                else:
+                    group = self.sketches.setdefault(name, {})
+                    for key, dd in d.items():
+                        group.setdefault(key, QuantileSketch(dd["sketch"]["alpha"])).merge(
+                            QuantileSketch.from_dict(dd))
+            if "average_tokens_per_turn" in snap:
+                self.setdefault("average_tokens_per_turn", 0.0)
+            _refresh_derived(self)
+        return self
+
+    def to_dict(self) -> dict:
+        """JSON-friendly snapshot: the legacy keys plus ``distributions``."""
+        with self.lock:
+            out = copy.deepcopy(dict(self))
+            out["distributions"] = {
+                name: (sk.to_dict() if isinstance(sk, QuantileSketch)
+                       else {k: v.to_dict() for k, v in sorted(sk.items())})
+                for name, sk in sorted(self.sketches.items())
+            }
+        return out
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DebateStats":
+        return cls().merge(d)
+
+
 # Aggregate counters
-global_stats = {
-    "total_matches": 0,
-    "total_turns": 0,
-    "total_prompt_tokens": 0,
-    "total_completion_tokens": 0,
-    "total_token_usage": 0,
-    "total_judge_calls": 0,
-    # Labels levels (e.g., "Strategy 1", "Strategy 2")
-    "wins_by_label": {},
-    # stance-level  (decoupled from labels)
-    "wins_by_stance": {"P5": 0, "FCC": 0},
-    # how often each per-match mapping is used (JSON-friendly string key)
-    # e.g., "Strategy 1->P5 | Strategy 2->FCC": 30
-    "stance_assignment_counts": {},
-}
-
-def update_judge_stats(prompt_tokens: int, completion_tokens: int) -> None:
+global_stats = DebateStats()
+
+
+def _locked(fn):
+    """Run *fn* on ``stats=`` (default global_stats) while holding its lock."""
+    @functools.wraps(fn)
+    def wrapper(*args, stats: Optional[DebateStats] = None, **kwargs):
+        s = global_stats if stats is None else stats
+        with s.lock:
+            return fn(s, *args, **kwargs)
+    return wrapper
+
+
+def reset_global_stats() -> None:
+    """Zero every counter in place (keeps the dict identity other modules imported)."""
+    global_stats.reset()
+
+@_locked
+def update_judge_stats(s, prompt_tokens: int, completion_tokens: int) -> None:
     """Accumulate tokens for a judge call without bumping total_turns."""
-    global_stats["total_judge_calls"] += 1
-    global_stats["total_prompt_tokens"]     += prompt_tokens
-    global_stats["total_completion_tokens"] += completion_tokens
-    global_stats["total_token_usage"] = (
-        global_stats["total_prompt_tokens"] + global_stats["total_completion_tokens"]
+    s["total_judge_calls"] += 1
+    s["total_prompt_tokens"]     += prompt_tokens
+    s["total_completion_tokens"] += completion_tokens
+    s["total_token_usage"] = (
+        s["total_prompt_tokens"] + s["total_completion_tokens"]
     )
 
 def _extract_winner_from_text(verdict_text: Optional[str]) -> Optional[str]:
@@ -37,16 +396,222 @@ def _extract_winner_from_text(verdict_text: Optional[str]) -> Optional[str]:
     m = _WINNER_LINE.search(verdict_text)
     return m.group(1).strip() if m else None
 
-def update_turn_stats(prompt_tokens: int, completion_tokens: int) -> None:
+@_locked
+def update_opening_stats(s, debater_id: str, requested: int, generated: int,
+                         completion_tokens: int, waves: int = 1,
+                         scorer_failures: int = 0) -> None:
+    """
+    Per-debater best-of-N bookkeeping. Tokens saved are estimated as the
+    skipped candidates times the mean completion length of generated ones;
+    scorer_failures counts judge-scorer replies that could not be parsed.
+    """
+    o = s["openings_by_debater"].setdefault(debater_id, {
+        "openings": 0,
+        "candidates_requested": 0,
+        "candidates_generated": 0,
+        "waves": 0,
+        "completion_tokens": 0,
+        "est_completion_tokens_saved": 0,
+        "scorer_failures": 0,
+    })
+    o["openings"] += 1
+    o["candidates_requested"] += requested
+    o["candidates_generated"] += generated
+    o["waves"] += waves
+    o["scorer_failures"] += scorer_failures
+    o["completion_tokens"] += completion_tokens
+    if generated > 0 and requested > generated:
+        o["est_completion_tokens_saved"] += (requested - generated) * completion_tokens // generated
+
+@_locked
+def update_turn_timing(s, completion_tokens: int, wasted_tail_tokens: int, total_s: float,
+                       ttft_s: Optional[float] = None, tokens_per_s: Optional[float] = None,
+                       stopped_early: bool = False) -> None:
+    """Per-turn latency; ttft/tokens-per-sec only exist for streamed turns."""
+    t = s["turn_timing"]
+    t["turns"] += 1
+    t["total_s_sum"] += total_s
+    t["completion_tokens"] += completion_tokens
+    t["wasted_tail_tokens"] += wasted_tail_tokens
+    if ttft_s is not None:
+        t["streamed_turns"] += 1
+        t["ttft_s_sum"] += ttft_s
+        t["ttft_s_max"] = max(t["ttft_s_max"], ttft_s)
+        t["tokens_per_s_sum"] += tokens_per_s or 0.0
+    if stopped_early:
+        t["stopped_early"] += 1
+    s.observe(total_s, "turn_latency_s")
+    if ttft_s is not None:
+        s.observe(ttft_s, "ttft_s")
+
+@_locked
+def update_cascade_stats(s, tier1_winner: Optional[str], final_winner: Optional[str],
+                         escalated: bool, audited: bool = False,
+                         confidence: Optional[float] = None) -> None:
+    """One cascade decision; agreement only counts when the full judge ran."""
+    c = s["judge_cascade"]
+    c["matches"] += 1
+    if confidence is None:
+        c["no_confidence"] += 1
+    if escalated:
+        c["escalated"] += 1
+    else:
+        c["resolved_tier1"] += 1
+    if audited:
+        c["audited"] += 1
+    c["escalation_rate"] = c["escalated"] / c["matches"]
+    if escalated or audited:
+        a = c["agreement"]["escalated" if escalated else "audited"]
+        a["compared"] += 1
+        if tier1_winner is not None and tier1_winner == final_winner:
+            a["agreed"] += 1
+
+@_locked
+def update_early_stop_stats(s, turns_played: int, turns_planned: int, probes: int,
+                            stopped_early: bool, calibration: bool = False,
+                            early_winner: Optional[str] = None,
+                            final_winner: Optional[str] = None) -> None:
+    """One match under probe judging; agreement is measured on calibration matches."""
+    e = s["early_stop"]
+    e["matches"] += 1
+    e["probes"] += probes
+    e["turns_played"] += turns_played
+    e["turns_saved"] += max(0, turns_planned - turns_played)
+    if stopped_early:
+        e["stopped_early"] += 1
+    if calibration:
+        c = e["calibration"]
+        c["matches"] += 1
+        if early_winner is not None:
+            c["would_stop"] += 1
+            c["compared"] += 1
+            if early_winner == final_winner:
+                c["agreed"] += 1
+
+@_locked
+def update_conversation_stats(s, request_bytes: int, full_history_bytes: int,
+                              stateful: bool = False, chained: bool = False,
+                              fallback: bool = False) -> None:
+    """Bytes sent for one debate turn, or (fallback=True) one match that lost stateful mode."""
+    c = s["conversation"]
+    if fallback:
+        c["fallbacks"] += 1
+        return
+    c["turns"] += 1
+    c["request_bytes"] += request_bytes
+    c["full_history_bytes"] += full_history_bytes
+    if stateful:
+        c["stateful_turns"] += 1
+    if chained:
+        c["chained_turns"] += 1
+
+@_locked
+def update_tree_stats(s, prompt_tokens: int, completion_tokens: int, cost_usd: float,
+                      reused: bool) -> None:
+    """One turn under config.DEBATE_TREE: generated, or replayed from the tree."""
+    t = s["debate_tree"]
+    if not reused:
+        t["turns_generated"] += 1
+        return
+    t["turns_reused"] += 1
+    t["tokens_reused"] += prompt_tokens + completion_tokens
+    t["cost_reused_usd"] += cost_usd
+
+@_locked
+def update_hedge_stats(s, model: str, served_s: float, primary_s: Optional[float] = None,
+                       hedged: bool = False, hedge_won: bool = False,
+                       denied: bool = False) -> None:
+    """One hedgeable call; primary_s is None until a losing primary finishes."""
+    h = s["hedging"]
+    h["calls"] += 1
+    if hedged:
+        h["hedged"] += 1
+    if hedge_won:
+        h["hedge_won"] += 1
+    if denied:
+        h["budget_denied"] += 1
+    h["hedge_rate"] = h["hedged"] / h["calls"]
+    h["win_rate"] = h["hedge_won"] / h["hedged"] if h["hedged"] else 0.0
+    s.observe(served_s, "hedge_served_latency_s", model)
+    if primary_s is not None:
+        s.observe(primary_s, "hedge_primary_latency_s", model)
+
+@_locked
+def update_hedge_spend(s, model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+                       cost_usd: float = 0.0, primary_s: Optional[float] = None,
+                       cancelled: bool = False) -> None:
+    """A losing duplicate: cancelled before it started, or finished and billed."""
+    h = s["hedging"]
+    if cancelled:
+        h["losers_cancelled"] += 1
+        return
+    h["extra_prompt_tokens"] += prompt_tokens
+    h["extra_completion_tokens"] += completion_tokens
+    h["extra_cost_usd"] += cost_usd
+    if primary_s is not None:
+        s.observe(primary_s, "hedge_primary_latency_s", model)
+
+@_locked
+def update_digest_call_stats(s, prompt_tokens: int = 0, completion_tokens: int = 0,
+                             cost_usd: float = 0.0, cached: bool = False) -> None:
+    """One round digest: summarized now, or served from the digest cache."""
+    d = s["judge_digest"]
+    d["rounds_digested"] += 1
+    if cached:
+        d["digests_cached"] += 1
+        return
+    d["digest_prompt_tokens"] += prompt_tokens
+    d["digest_completion_tokens"] += completion_tokens
+    d["digest_cost_usd"] += cost_usd
+
+@_locked
+def update_digest_stats(s, judge_prompt_tokens_est: int, full_prompt_tokens_est: int,
+                        digest_winner: Optional[str] = None,
+                        full_winner: Optional[str] = None,
+                        calibration: bool = False) -> None:
+    """One match judged on digests; agreement counts calibration matches only."""
+    d = s["judge_digest"]
+    d["matches"] += 1
+    d["judge_prompt_tokens_est"] += judge_prompt_tokens_est
+    d["full_prompt_tokens_est"] += full_prompt_tokens_est
+    if calibration:
+        d["agreement"]["compared"] += 1
+        if digest_winner is not None and digest_winner == full_winner:
+            d["agreement"]["agreed"] += 1
+
+@_locked
+def update_turn_stats(s, prompt_tokens: int, completion_tokens: int) -> None:
     """Accumulate prompt + completion counts for one turn."""
-    global_stats["total_turns"] += 1
-    global_stats["total_prompt_tokens"] += prompt_tokens
-    global_stats["total_completion_tokens"] += completion_tokens
-    global_stats["total_token_usage"] = (
-        global_stats["total_prompt_tokens"] + global_stats["total_completion_tokens"]
+    s["total_turns"] += 1
+    s["total_prompt_tokens"] += prompt_tokens
+    s["total_completion_tokens"] += completion_tokens
+    s["total_token_usage"] = (
+        s["total_prompt_tokens"] + s["total_completion_tokens"]
     )
+    s.observe(prompt_tokens + completion_tokens, "tokens_per_turn")
+
+@_locked
+def update_call_stats(s, stage: str, prompt_tokens: int, completion_tokens: int,
+                      debater_id: Optional[str] = None) -> None:
+    """Tokens of one API call into the per-stage / per-debater sketches."""
+    s.observe(prompt_tokens + completion_tokens, "by_stage", stage)
+    s.observe(prompt_tokens + completion_tokens, "by_debater", debater_id or "judge")
+
+@_locked
+def update_context_order_stats(s, order: str, winner: Optional[str] = None,
+                               winner_stance: Optional[str] = None) -> None:
+    """One finished match on context variant *order* ("P5+FCC", …; contexts.py)."""
+    mo = s["matches_by_context_order"]
+    mo[order] = mo.get(order, 0) + 1
+    if winner:
+        wo = s["wins_by_context_order"]       # deprecated; equals matches today
+        wo[order] = wo.get(order, 0) + 1
+        if winner_stance is not None:
+            ws = s["wins_by_stance_given_order"].setdefault(order, {})
+            ws[winner_stance] = ws.get(winner_stance, 0) + 1
 
-def update_match_stats(
+@_locked
+def update_match_stats(s,
     winner_label: Optional[str] = None,
     verdict_text: Optional[str] = None,
     stance_assignment: Optional[dict] = None,
@@ -73,22 +638,23 @@ def update_match_stats(
         return  # no clear winner → do not mutate match counters
 
     # Count by label (neutral to naming)
-    wb = global_stats["wins_by_label"]
+    wb = s["wins_by_label"]
     wb[winner] = wb.get(winner, 0) + 1
 
     # Mapping usage + stance-level tally (if mapping provided)
     if stance_assignment:
         # Count mapping usage with a deterministic, JSON-friendly key
         key = " | ".join(f"{k}->{v}" for k, v in sorted(stance_assignment.items()))
-        sac = global_stats["stance_assignment_counts"]
+        sac = s["stance_assignment_counts"]
         sac[key] = sac.get(key, 0) + 1
 
         # Attribute winner to stance (decoupled from label/UI)
         stance = stance_assignment.get(winner)
-        if stance in ("P5", "FCC"):
-            global_stats["wins_by_stance"][stance] += 1
+        if stance is not None:
+            ws = s["wins_by_stance"]
+            ws[stance] = ws.get(stance, 0) + 1
 
-    global_stats["total_matches"] += 1
+    s["total_matches"] += 1
 
 def compute_average_tokens_per_turn() -> float:
     turns = global_stats["total_turns"]
@@ -0,0 +1,142 @@
+"""
+Streaming debate turns with sentence-boundary early stop.
+
+Instead of waiting for a full MAX_TOKENS_PER_RESPONSE completion and then
+trimming the tail, the turn is streamed: token deltas are cleaned of
+``【…†source】`` tags as they arrive, and once a soft token budget is reached
+the stream is closed at the first sentence boundary: .!? (optionally
+closing quote) followed by whitespace, so a decimal such as "3.5" split
+across deltas never ends a turn; the delta completing the boundary is cut
+before the whitespace. The hard cap (max_tokens) still applies; if it is
+hit mid-sentence the caller trims as before.
+
+Timing per turn: time-to-first-token, total wall time and tokens/sec.
+"""
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from .utils_openai import count_tokens
+from .backends import Usage
+
+# shared with debate_engine._trim_to_sentence_boundary
+_END_PUNCT = re.compile(r'[.!?]["”\']?\s*$')
+_BOUNDARY = re.compile(r'[.!?]["”\']?\s')
+SOURCE_TAG_RE = re.compile(r'【.*?†source】')
+
+_TAG_OPEN = "【"
+_MAX_PENDING = 256      # an unclosed 【 longer than this is plain text
+
+
+class IncrementalCleaner:
+    """Streaming equivalent of ``SOURCE_TAG_RE.sub('', text)``."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, delta: str) -> str:
+        """Return the part of the text that is final (cannot be a tag)."""
+        buf = self._pending + delta
+        start = buf.find(_TAG_OPEN)
+        if start == -1:
+            self._pending = ""
+            return buf
+        head, rest = buf[:start], SOURCE_TAG_RE.sub("", buf[start:])
+        nxt = rest.find(_TAG_OPEN)
+        if nxt == -1:
+            self._pending = ""
+            return head + rest
+        # keep an open tag back unless it can no longer match (newline / too long)
+        tail = rest[nxt:]
+        if "\n" in tail or len(tail) > _MAX_PENDING:
+            self._pending = ""
+            return head + rest
+        self._pending = tail
+        return head + rest[:nxt]
+
+    def flush(self) -> str:
+        out, self._pending = self._pending, ""
+        return out
+
+
+@dataclass
+class StreamResult:
+    content: str
+    usage: object               # usage-shaped; estimated when stopped early
+    usage_estimated: bool
+    ttft_s: Optional[float]
+    total_s: float
+    completion_tokens: int
+    stopped_early: bool
+
+    @property
+    def tokens_per_s(self) -> float:
+        gen_s = self.total_s - (self.ttft_s or 0.0)
+        return self.completion_tokens / gen_s if gen_s > 0 else 0.0
+
+    def timing(self) -> dict:
+        return {
+            "ttft_s": self.ttft_s,
+            "total_s": self.total_s,
+            "tokens_per_s": self.tokens_per_s,
+            "stopped_early": self.stopped_early,
+        }
+
+
+def stream_completion(backend, *, model: str, messages, soft_budget: Optional[int],
+                      temperature: Optional[float] = None,
+                      max_tokens: Optional[int] = None) -> StreamResult:
+    """
+    Stream one completion from *backend* (backends.Backend) and stop at the
+    first sentence boundary after *soft_budget* completion tokens
+    (None → run to the hard cap).
+    """
+    t0 = time.perf_counter()
+    stream = backend.stream(model, messages, temperature=temperature, max_tokens=max_tokens)
+    cleaner = IncrementalCleaner()
+    parts = []
+    tail = ""
+    n_tokens = 0
+    ttft = None
+    stopped = False
+    try:
+        for delta in stream:
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            n_tokens += 1       # the API streams ~one token per content delta
+            out = cleaner.feed(delta)
+            if not out:
+                continue
+            if soft_budget and n_tokens >= soft_budget:
+                # a boundary counts once the whitespace after it has arrived
+                joined = tail + out
+                m = next((m for m in _BOUNDARY.finditer(joined) if m.end() > len(tail)), None)
+                if m is not None:
+                    parts.append(out[:m.end() - 1 - len(tail)])
+                    stopped = True
+                    break
+            parts.append(out)
+            tail = (tail + out)[-8:]
+    finally:
+        if stopped:
+            stream.close()      # stop generation server-side; no more tokens billed
+    usage = stream.usage
+    if not stopped:
+        parts.append(cleaner.flush())   # held-back text past a stop is dropped
+    total = time.perf_counter() - t0
+    content = "".join(parts).strip()
+
+    estimated = usage is None
+    if estimated:
+        prompt = count_tokens("".join(m.get("content") or "" for m in messages), model)
+        usage = Usage(prompt, n_tokens)
+    return StreamResult(
+        content=content,
+        usage=usage,
+        usage_estimated=estimated,
+        ttft_s=ttft,
+        total_s=total,
+        completion_tokens=usage.completion_tokens,
+        stopped_early=stopped,
+    )
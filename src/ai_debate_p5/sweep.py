@@ -0,0 +1,281 @@
+"""
+Hyperparameter sweeps: many configurations of the tournament in one process.
+
+A spec names the values to try (grid) or the distributions to draw from
+(random search):
+
+    {"mode": "grid",
+     "params": {"boN": [1, 4], "temperature": [0.3, 0.7],
+                "turns": [2, 4], "context_order": ["p5_first", "fcc_first"]}}
+
+    {"mode": "random", "samples": 8, "seed": 0,
+     "params": {"temperature": {"uniform": [0.2, 1.0]}, "boN": [1, 2, 4, 8]}}
+
+Parameters:
+• turns / repeats / context_order – TURNS_PER_MATCH, REPEATS_PER_PAIR and
+  run_debate.py --context-order for the configuration;
+• any other key (boN, temperature, model, stream, …) – set on every entry of
+  config.DEBATERS; "<id>.<key>" (e.g. "B.boN") sets it on one debater only.
+
+The expanded configurations form one schedule run back to back in this
+process, so they share what a fresh run_debate.py launch starts cold with:
+the client / ClientPool (connections, rate-limit headers, endpoint health),
+the judge panel and hedge executors with their latency history, and the
+debate tree (":memory:" unless config.DEBATE_TREE names one). Configurations
+that differ only in turns are ordered shortest first, so longer ones extend
+the stored transcripts; identical openers fork from the same opening.
+
+Each configuration gets its own directory (debates.json + debates_stats.json,
+the same files run_debate.py writes) and a row in sweep_summary.csv / .json:
+Elo per debater, matches, tokens, cost and wall time. Cost is what the
+configuration actually spent; turns replayed from the tree are reported
+separately as "cost_reused_usd" (what a cold run would have paid on top).
+"""
+import contextlib
+import csv
+import io
+import itertools
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+from . import events
+from .contexts import ContextRegistry, ORDER_MODES
+from .cost_module import ledger as cost_ledger
+from .debate_engine import run_all_matches
+from .records import json_default
+from .roster import roster_ids
+from .stats_module import DebateStats, global_stats, reset_global_stats, \
+    compute_average_tokens_per_turn
+
+# Parameters that are run settings rather than debater fields
+_RUN_KEYS = ("turns", "repeats", "context_order")
+
+
+# ---------- spec expansion ------------------------------------------------
+
+def _draw(rng: random.Random, dist):
+    if isinstance(dist, list):
+        return rng.choice(dist)
+    if isinstance(dist, dict) and "uniform" in dist:
+        lo, hi = dist["uniform"]
+        return round(rng.uniform(lo, hi), 3)
+    if isinstance(dist, dict) and "int" in dist:
+        lo, hi = dist["int"]
+        return rng.randint(lo, hi)
+    if isinstance(dist, dict) and "log_uniform" in dist:
+        lo, hi = dist["log_uniform"]
+        return round(lo * (hi / lo) ** rng.random(), 4)
+    return dist                                     # a fixed value
+
+
+def _name(i: int, params: dict) -> str:
+    tag = "_".join(f"{k}={v}" for k, v in params.items())
+    return re.sub(r"[^\w.=+-]", "-", f"c{i:02d}_{tag}" if tag else f"c{i:02d}")
+
+
+def expand(spec: dict) -> List[dict]:
+    """
+    Configurations of *spec* as [{"name", "params"}], in run order: same
+    settings apart from turns are adjacent, shortest first.
+    """
+    mode = spec.get("mode", "grid")
+    params = spec.get("params") or {}
+    if "context_order" in params:
+        bad = set(params["context_order"] if isinstance(params["context_order"], list)
+                  else [params["context_order"]]) - set(ORDER_MODES)
+        if bad:
+            raise ValueError(f"unknown context_order {sorted(bad)}; expected one of {ORDER_MODES}")
+
+    if mode == "grid":
+        keys = list(params)
+        axes = [v if isinstance(v, list) else [v] for v in params.values()]
+        combos = [dict(zip(keys, values)) for values in itertools.product(*axes)]
+    elif mode == "random":
+        rng = random.Random(spec.get("seed", 0))
+        combos, seen = [], set()
+        for _ in range(int(spec.get("samples", 10))):
+            c = {k: _draw(rng, d) for k, d in params.items()}
+            key = json.dumps(c, sort_keys=True)
+            if key not in seen:                     # duplicate draws add nothing
+                seen.add(key)
+                combos.append(c)
+    else:
+        raise ValueError(f"unknown sweep mode {mode!r}; expected 'grid' or 'random'")
+
+    combos.sort(key=lambda c: (json.dumps({k: v for k, v in c.items() if k != "turns"},
+                                          sort_keys=True), c.get("turns", 0)))
+    return [{"name": _name(i, c), "params": c} for i, c in enumerate(combos, 1)]
+
+
+def debaters_for(params: dict, base: Optional[List[dict]] = None) -> List[dict]:
+    """config.DEBATERS (or *base*) with the configuration's debater fields applied."""
+    out = [dict(d) for d in (base if base is not None else config.DEBATERS)]
+    ids = {d["id"] for d in out}
+    for key, value in params.items():
+        if key in _RUN_KEYS:
+            continue
+        target, _, field = key.rpartition(".")
+        if target and target not in ids:
+            raise ValueError(f"sweep parameter {key!r}: no debater {target!r} in the roster")
+        for d in out:
+            if not target or d["id"] == target:
+                d[field] = value
+    return out
+
+
+@contextlib.contextmanager
+def _applied(params: dict, debaters: List[dict]):
+    """config globals for one configuration, restored afterwards."""
+    saved = (config.DEBATERS, config.TURNS_PER_MATCH, config.REPEATS_PER_PAIR)
+    config.DEBATERS = debaters
+    config.TURNS_PER_MATCH = params.get("turns", config.TURNS_PER_MATCH)
+    config.REPEATS_PER_PAIR = params.get("repeats", config.REPEATS_PER_PAIR)
+    try:
+        yield
+    finally:
+        config.DEBATERS, config.TURNS_PER_MATCH, config.REPEATS_PER_PAIR = saved
+
+
+# ---------- Elo ------------------------------------------------------------
+
+def _elo(matches: List[dict], ids: List[str]) -> Dict[str, dict]:
+    import numpy as np
+    from .stats.elo_bt import fit_bt
+
+    idx = {d: i for i, d in enumerate(ids)}
+    W = np.zeros((len(ids), len(ids)))
+    for m in matches:
+        sid = m.get("side_to_debater_id") or {}
+        winner = m.get("winner")
+        if winner not in sid:
+            continue
+        loser = next((v for k, v in sid.items() if k != winner), None)
+        if sid[winner] in idx and loser in idx:
+            W[idx[sid[winner]], idx[loser]] += 1
+    if len(ids) < 2 or not W.any():
+        return {}
+    with contextlib.redirect_stdout(io.StringIO()):      # fit_bt prints diagnostics
+        E, COV = fit_bt(W)
+    ci = 1.96 * np.sqrt(np.clip(np.diag(COV), 0, None))
+    return {d: {"elo_mean": round(float(E[i]), 3), "elo_ci95": round(float(ci[i]), 3)}
+            for i, d in enumerate(ids)}
+
+
+# ---------- running --------------------------------------------------------
+
+def run_sweep(configs: List[dict],
+              out_dir,
+              contexts: ContextRegistry,
+              *,
+              initial_topic: Optional[str] = None,
+              context_order: str = "p5_first",
+              seed: int = 0,
+              quiet: bool = True,
+              bus: Optional[events.EventBus] = None,
+              on_config_done=None) -> List[dict]:
+    """
+    Run every configuration of expand() in turn on the corpora of *contexts*
+    (loaded once; variants are shared by every configuration); returns the
+    summary rows (also written to *out_dir*/sweep_summary.csv and .json, with
+    the merged statistics of all configurations in sweep_stats.json).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    bus = bus or events.bus
+    initial_topic = initial_topic or config.INITIAL_TOPIC
+    tree_setting = config.DEBATE_TREE
+    if not tree_setting:
+        config.DEBATE_TREE = ":memory:"             # the sweep's shared response cache
+
+    rows, combined = [], DebateStats()
+    try:
+        for c in configs:
+            params = c["params"]
+            debaters = debaters_for(params)
+            order = params.get("context_order", context_order)
+            reset_global_stats()
+            cost_ledger.reset()
+            global_stats["context_order_mode"] = order
+            global_stats["context_order_seed"] = seed
+
+            t0 = time.perf_counter()
+            with _applied(params, debaters):
+                matches = run_all_matches(
+                    None, initial_topic, quiet=quiet, bus=bus,
+                    context_order=order, seed=seed,
+                    contexts=contexts,
+                )
+            wall = time.perf_counter() - t0
+            global_stats["average_tokens_per_turn"] = compute_average_tokens_per_turn()
+
+            run_dir = out_dir / c["name"]
+            run_dir.mkdir(parents=True, exist_ok=True)
+            log = {"matches": matches, "global_stats": global_stats.to_dict(),
+                   "roster": debaters, "sweep": {"name": c["name"], "params": params}}
+            with open(run_dir / "debates.json", "w", encoding="utf-8") as f:
+                json.dump(log, f, ensure_ascii=False, indent=2, default=json_default)
+            with open(run_dir / "debates_stats.json", "w", encoding="utf-8") as f:
+                json.dump(log["global_stats"], f, ensure_ascii=False, indent=2)
+            combined.merge(log["global_stats"])
+
+            total = log["global_stats"]["cost"]["total"]
+            row = {
+                "config": c["name"],
+                "params": params,
+                "matches": len(matches),
+                "elo": _elo(matches, roster_ids(log)),
+                "tokens": total["prompt_tokens"] + total["completion_tokens"],
+                "cost_usd": round(total["cost_usd"], 6),
+                "cost_reused_usd": round(log["global_stats"]["debate_tree"]["cost_reused_usd"], 6),
+                "wall_s": round(wall, 3),
+                "dir": str(run_dir),
+            }
+            rows.append(row)
+            if on_config_done:
+                on_config_done(row)
+    finally:
+        config.DEBATE_TREE = tree_setting
+
+    write_summary(rows, out_dir)
+    with open(out_dir / "sweep_stats.json", "w", encoding="utf-8") as f:
+        json.dump(combined.to_dict(), f, ensure_ascii=False, indent=2)
+    return rows
+
+
+def write_summary(rows: List[dict], out_dir) -> None:
+    """sweep_summary.json (rows as returned) and a flat sweep_summary.csv."""
+    out_dir = Path(out_dir)
+    with open(out_dir / "sweep_summary.json", "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    param_keys = list(dict.fromkeys(k for r in rows for k in r["params"]))
+    ids = list(dict.fromkeys(d for r in rows for d in r["elo"]))
+    with open(out_dir / "sweep_summary.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["config", *param_keys,
+                    *[f"elo_{d}{s}" for d in ids for s in ("", "_ci95")],
+                    "matches", "tokens", "cost_usd", "cost_reused_usd", "wall_s"])
+        for r in rows:
+            elo = [(r["elo"][d]["elo_mean"], r["elo"][d]["elo_ci95"]) if d in r["elo"] else ("", "")
+                   for d in ids]
+            w.writerow([r["config"], *[r["params"].get(k, "") for k in param_keys],
+                        *[v for pair in elo for v in pair],
+                        r["matches"], r["tokens"], f"{r['cost_usd']:.6f}", f"{r['cost_reused_usd']:.6f}", f"{r['wall_s']:.3f}"])
+
+
+def format_table(rows: List[dict]) -> str:
+    """Plain-text table of the summary rows, one line per configuration."""
+    ids = list(dict.fromkeys(d for r in rows for d in r["elo"]))
+    head = ["config", *[f"Elo {d}" for d in ids], "matches", "tokens", "cost $", "reused $", "wall s"]
+    body = [[r["config"],
+             *[(f"{r['elo'][d]['elo_mean']:+.2f}±{r['elo'][d]['elo_ci95']:.2f}"
+                if d in r["elo"] else "–") for d in ids],
+             str(r["matches"]), str(r["tokens"]), f"{r['cost_usd']:.4f}", f"{r['cost_reused_usd']:.4f}", f"{r['wall_s']:.1f}"]
+            for r in rows]
+    widths = [max(len(x) for x in col) for col in zip(head, *body)]
+    fmt = lambda cells: "  ".join(x.ljust(w) for x, w in zip(cells, widths))
+    return "\n".join([fmt(head), fmt(["-" * w for w in widths]), *map(fmt, body)])
@@ -1,56 +1,334 @@
+"""
+Upload context documents to an OpenAI vector store, incrementally.
+
+    python src/ai_debate_p5/utils/setup_vector_store.py docs/ extra/report.pdf
+    python src/ai_debate_p5/utils/setup_vector_store.py --manifest corpus.json
+
+Inputs are files, directories (searched recursively for --pattern) and/or a
+--manifest listing paths (JSON list, {"files": [...]}, or one path per line).
+With no inputs the P5 report PDF is uploaded, as before.
+
+• Dedup: each file is hashed (SHA-256 of its bytes). The local state file
+  (--state, default vector_store_manifest.json) maps hash → file ID, so an
+  unchanged file is neither re-uploaded nor re-attached; a renamed copy
+  reuses the existing upload.
+• Store: --store-id, else the store recorded in the state file for the same
+  --base-url, else a new store named --store-name. Attaching is idempotent:
+  files already in the store (listed once per run) are skipped and "already
+  attached" answers count as success.
+• Transport: one httpx client (keep-alive pool sized to --workers) shared by
+  the upload workers; 429 / 5xx / connection errors are retried with
+  exponential backoff, honouring Retry-After.
+• Resumable: the state file is rewritten atomically after every file, so an
+  interrupted run picks up where it stopped.
+
+--base-url (default $OPENAI_BASE_URL or https://api.openai.com/v1) points the
+tool at any server speaking the files / vector_stores REST API, e.g. a local
+stub for testing.
+"""
+import argparse
+import hashlib
+import json
 import os
-import requests
-from dotenv import load_dotenv
-
-# Load API key from .env
-load_dotenv()
-
-api_key = os.getenv("OPENAI_API_KEY")
-file_path = "2023_P5_Report_Single_Pages.pdf"
-vector_store_name = "P5_Vector_Store"
-
-# === REST API headers ===
-headers = {
-    "Authorization": f"Bearer {api_key}",
-    "Content-Type": "application/json",
-    "OpenAI-Beta": "assistants=v2"
-}
-
-# === Upload file ===
-print("📤 Uploading file...")
-with open(file_path, "rb") as f:
-    response = requests.post(
-        "https://api.openai.com/v1/files",
-        headers={"Authorization": f"Bearer {api_key}"},
-        files={"file": f},
-        data={"purpose": "assistants"}
-    )
-response.raise_for_status()
-file_id = response.json()["id"]
-print(f"✅ File uploaded: {file_id}")
-
-# === Create vector store ===
-print("📦 Creating vector store...")
-response = requests.post(
-    "https://api.openai.com/v1/vector_stores",
-    headers=headers,
-    json={"name": vector_store_name}
-)
-response.raise_for_status()
-vector_store_id = response.json()["id"]
-print(f"✅ Vector store created: {vector_store_id}")
-
-# === Attach existing uploaded file by ID ===
-print("📎 Attaching file to vector store...")
-response = requests.post(
-    f"https://api.openai.com/v1/vector_stores/{vector_store_id}/files",
-    headers=headers,
-    json={"file_id": file_id}  # ✅ Correct: use JSON, not files parameter
-)
-response.raise_for_status()
-print(f"✅ File attached to vector store {vector_store_id}")
-
-# === Output .env variables ===
-print("\n🎉 Setup complete! Add the following to your .env file:\n")
-print(f"FILE_ID={file_id}")
-print(f"VECTOR_STORE_ID={vector_store_id}")
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_FILE = "2023_P5_Report_Single_Pages.pdf"
+DEFAULT_STORE_NAME = "P5_Vector_Store"
+DEFAULT_STATE = "vector_store_manifest.json"
+DEFAULT_PATTERNS = ("*.pdf", "*.txt", "*.md")
+_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class IngestError(RuntimeError):
+    pass
+
+
+# ---------- inputs ---------------------------------------------------------
+
+def _read_manifest(path) -> List[str]:
+    text = Path(path).read_text(encoding="utf-8")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [ln.strip() for ln in text.splitlines() if ln.strip() and not ln.startswith("#")]
+    if isinstance(data, dict):
+        data = data.get("files", [])
+    return [d["path"] if isinstance(d, dict) else d for d in data]
+
+
+def collect_files(inputs: List[str], patterns=DEFAULT_PATTERNS, manifest=None) -> List[Path]:
+    """Files named by *inputs* (files or directories) and *manifest*, deduplicated by path."""
+    names = [Path(n) for n in inputs]
+    if manifest:                            # manifest entries are relative to the manifest
+        names += [Path(manifest).parent / n for n in _read_manifest(manifest)]
+    out = {}
+    for p in names:
+        if p.is_dir():
+            found = sorted({f for pat in patterns for f in p.rglob(pat) if f.is_file()})
+        elif p.is_file():
+            found = [p]
+        else:
+            raise IngestError(f"no such file or directory: {p}")
+        for f in found:
+            out.setdefault(f.resolve(), f)
+    return list(out.values())
+
+
+def file_sha256(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------- local state ----------------------------------------------------
+
+class State:
+    """The local manifest: store ID plus content hash → uploaded file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data = {"base_url": None, "vector_store_id": None, "vector_store_name": None,
+                     "files": {}}
+        if self.path.exists():
+            self.data.update(json.loads(self.path.read_text(encoding="utf-8")))
+
+    def file(self, sha: str) -> Optional[dict]:
+        with self._lock:
+            return self.data["files"].get(sha)
+
+    def update(self, sha: Optional[str] = None, **fields) -> None:
+        """Merge *fields* into the entry for *sha* (or the top level) and save."""
+        with self._lock:
+            target = self.data["files"].setdefault(sha, {}) if sha else self.data
+            target.update(fields)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+# ---------- HTTP -----------------------------------------------------------
+
+class Api:
+    """Thin files / vector_stores client over one pooled httpx.Client."""
+
+    def __init__(self, base_url: str, api_key: Optional[str], workers: int = 4,
+                 retries: int = 4, backoff_s: float = 0.5, timeout: float = 120.0):
+        import httpx
+
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._transport_errors = (httpx.TransportError,)
+        self.http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers={"OpenAI-Beta": "assistants=v2",
+                     **({"Authorization": f"Bearer {api_key}"} if api_key else {})},
+            limits=httpx.Limits(max_connections=workers + 1, max_keepalive_connections=workers + 1),
+            timeout=timeout,
+        )
+
+    def close(self) -> None:
+        self.http.close()
+
+    def request(self, method: str, url: str, ok=(200,), **kw):
+        """One call with retries; returns the response when its status is in *ok*."""
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.http.request(method, url, **kw)
+            except self._transport_errors as exc:
+                if attempt == self.retries:
+                    raise IngestError(f"{method} {url}: {exc}") from exc
+                time.sleep(self.backoff_s * 2 ** attempt)
+                continue
+            if r.status_code in ok:
+                return r
+            if r.status_code in _RETRY_STATUS and attempt < self.retries:
+                delay = self.backoff_s * 2 ** attempt
+                try:
+                    delay = max(delay, float(r.headers.get("retry-after", 0)))
+                except ValueError:
+                    pass
+                time.sleep(min(delay, 60.0))
+                continue
+            raise IngestError(f"{method} {url}: HTTP {r.status_code} {r.text[:200]}")
+
+    # ---- endpoints ----------------------------------------------------
+    def store_exists(self, store_id: str) -> bool:
+        return self.request("GET", f"/vector_stores/{store_id}", ok=(200, 404)).status_code == 200
+
+    def create_store(self, name: str) -> str:
+        return self.request("POST", "/vector_stores", json={"name": name}).json()["id"]
+
+    def store_file_ids(self, store_id: str) -> set:
+        ids, after = set(), None
+        while True:
+            params = {"limit": 100, **({"after": after} if after else {})}
+            page = self.request("GET", f"/vector_stores/{store_id}/files", params=params).json()
+            ids.update(f["id"] for f in page.get("data", []))
+            if not page.get("has_more") or not page.get("data"):
+                return ids
+            after = page.get("last_id") or page["data"][-1]["id"]
+
+    def upload(self, path: Path) -> str:
+        data = path.read_bytes()            # bytes, so a retry can resend the body
+        r = self.request("POST", "/files", files={"file": (path.name, data)},
+                         data={"purpose": "assistants"})
+        return r.json()["id"]
+
+    def attach(self, store_id: str, file_id: str) -> Optional[bool]:
+        """True when attached, None when the file no longer exists on the server."""
+        r = self.request("POST", f"/vector_stores/{store_id}/files", json={"file_id": file_id},
+                         ok=(200, 201, 400, 404, 409))
+        if r.status_code in (200, 201):
+            return True
+        if r.status_code == 404 or "no such file" in r.text.lower():
+            return None
+        if r.status_code == 409 or "already" in r.text.lower():
+            return True
+        raise IngestError(f"attach {file_id}: HTTP {r.status_code} {r.text[:200]}")
+
+
+# ---------- ingestion ------------------------------------------------------
+
+def _ensure_store(api: Api, state: State, base_url: str, store_id: Optional[str],
+                  store_name: str) -> str:
+    if store_id:
+        if not api.store_exists(store_id):
+            raise IngestError(f"vector store {store_id} not found at {base_url}")
+    elif state.data.get("vector_store_id") and state.data.get("base_url") == base_url \
+            and api.store_exists(state.data["vector_store_id"]):
+        store_id = state.data["vector_store_id"]
+    else:
+        print(f"📦 Creating vector store {store_name!r}...")
+        store_id = api.create_store(store_name)
+        state.update(vector_store_name=store_name)
+    if store_id != state.data.get("vector_store_id"):
+        for entry in state.data["files"].values():
+            entry["attached"] = False       # attachments belong to the old store
+    state.update(base_url=base_url, vector_store_id=store_id)
+    return store_id
+
+
+def _ingest_one(api: Api, state: State, store_id: str, attached: set, sha: str, path: Path) -> str:
+    entry = state.file(sha) or {}
+    file_id = entry.get("file_id")
+    if file_id and file_id in attached:
+        if not entry.get("attached"):
+            state.update(sha, attached=True)
+        return "unchanged"
+    action = "attached"
+    if file_id:
+        ok = api.attach(store_id, file_id)
+    else:
+        ok = None
+    if ok is None:                          # never uploaded, or deleted server-side
+        file_id = api.upload(path)
+        state.update(sha, file_id=file_id, path=str(path), bytes=path.stat().st_size,
+                     uploaded_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), attached=False)
+        if not api.attach(store_id, file_id):
+            raise IngestError(f"attach {file_id}: file vanished right after upload")
+        action = "uploaded"
+    state.update(sha, file_id=file_id, path=str(path), attached=True)
+    attached.add(file_id)
+    return action
+
+
+def ingest(paths: List[Path], *, base_url: str, api_key: Optional[str], state_path=DEFAULT_STATE,
+           store_id: Optional[str] = None, store_name: str = DEFAULT_STORE_NAME,
+           workers: int = 4, retries: int = 4, backoff_s: float = 0.5) -> dict:
+    """
+    Upload and attach *paths*; returns {"vector_store_id", "results": {path: action},
+    "errors": {path: message}} with action "uploaded" | "attached" | "unchanged".
+    """
+    state = State(state_path)
+    api = Api(base_url, api_key, workers=workers, retries=retries, backoff_s=backoff_s)
+    results, errors = {}, {}
+    try:
+        store_id = _ensure_store(api, state, base_url, store_id, store_name)
+        attached = api.store_file_ids(store_id)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as ex:
+            # one upload per distinct content; identical copies share its file ID
+            by_sha = {}
+            for p, sha in zip(paths, ex.map(file_sha256, paths)):
+                by_sha.setdefault(sha, []).append(p)
+            futs = {ex.submit(_ingest_one, api, state, store_id, attached, sha, ps[0]): ps
+                    for sha, ps in by_sha.items()}
+            for fut in as_completed(futs):
+                try:
+                    action, err = fut.result(), None
+                except Exception as exc:
+                    action, err = None, str(exc)
+                for i, p in enumerate(map(str, futs[fut])):
+                    if err is not None:
+                        errors[p] = err
+                        print(f"  ❌ failed    {p}: {err}", file=sys.stderr)
+                        continue
+                    results[p] = action if i == 0 else "unchanged"
+                    print(f"  {'✅' if results[p] != 'unchanged' else '⏭️ '} {results[p]:9s} {p}")
+    finally:
+        api.close()
+    return {"vector_store_id": store_id, "results": results, "errors": errors}
+
+
+# ---------- CLI ------------------------------------------------------------
+
+def _load_env() -> None:
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Upload documents to an OpenAI vector store (incremental).")
+    ap.add_argument("inputs", nargs="*", help=f"Files or directories (default: {DEFAULT_FILE})")
+    ap.add_argument("--manifest", help="File listing documents (JSON list / {'files': [...]} / lines)")
+    ap.add_argument("--pattern", action="append",
+                    help=f"Glob for directory inputs (repeatable; default {' '.join(DEFAULT_PATTERNS)})")
+    ap.add_argument("--state", default=DEFAULT_STATE,
+                    help="Local manifest mapping content hash → file ID (read and rewritten)")
+    ap.add_argument("--store-id", help="Attach to this existing vector store")
+    ap.add_argument("--store-name", default=DEFAULT_STORE_NAME,
+                    help="Name for a newly created store")
+    ap.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent uploads")
+    ap.add_argument("--retries", type=int, default=4, help="Retries per request (429 / 5xx / network)")
+    ap.add_argument("--dry-run", action="store_true", help="Hash the inputs and report what would upload")
+    args = ap.parse_args(argv)
+
+    _load_env()
+    inputs = args.inputs or ([] if args.manifest else [DEFAULT_FILE])
+    paths = collect_files(inputs, tuple(args.pattern or DEFAULT_PATTERNS), args.manifest)
+    print(f"📄 {len(paths)} documents")
+    if args.dry_run:
+        state = State(args.state)
+        for p in paths:
+            sha = file_sha256(p)
+            known = state.file(sha)
+            print(f"  {'known' if known else 'new':5s} {sha[:12]} {p}"
+                  + (f" → {known['file_id']}" if known else ""))
+        return 0
+
+    out = ingest(paths, base_url=args.base_url, api_key=os.getenv("OPENAI_API_KEY"),
+                 state_path=args.state, store_id=args.store_id, store_name=args.store_name,
+                 workers=args.workers, retries=args.retries)
+    counts = {a: sum(1 for v in out["results"].values() if v == a)
+              for a in ("uploaded", "attached", "unchanged")}
+    print(f"\n🎉 {counts['uploaded']} uploaded, {counts['attached']} re-attached, "
+          f"{counts['unchanged']} unchanged, {len(out['errors'])} failed")
+    print(f"State → {args.state}")
+    print(f"VECTOR_STORE_ID={out['vector_store_id']}")
+    return 1 if out["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,52 @@
+from typing import Optional
+
 import config
 
+
+def client_for(endpoint_group: Optional[str] = None):
+    """
+    Client for one call: config.client, narrowed to *endpoint_group* when
+    the client is a ClientPool (plain clients ignore the group).
+    """
+    c = config.client
+    if endpoint_group and hasattr(c, "group"):
+        return c.group(endpoint_group)
+    return c
+
+
 def chat_extra_kwargs(model_name: str, temperature: float) -> dict:
     """
     Return the correct keyword dict for an OpenAI chat request:
     • o-series models:     max_completion_tokens, temperature=1
     • GPT-series models:   max_tokens,           temperature as given
+    (Backends apply this themselves; kept for scripts that call the SDK directly.)
     """
-    if model_name.startswith("o"):          # e.g. "o4-mini"
-        return {
-            "max_completion_tokens": config.MAX_TOKENS_PER_RESPONSE,
-            "temperature": 1,               # o-series ignores other values
-        }
-    else:
-        return {
-            "max_tokens": config.MAX_TOKENS_PER_RESPONSE,
-            "temperature": temperature,
-        }
-
-# def supports_logprobs(model_name: str) -> bool:
-#     """Return True iff the model family allows the `logprobs` option."""
-#     return not model_name.startswith("o")      # o-series models currently do not support logprobs  
+    from .backends.openai_backend import request_limits
+    return request_limits(model_name, temperature, config.MAX_TOKENS_PER_RESPONSE)
+
 
 def supports_logprobs(model_name: str) -> bool:
-    # Explicit map is safest
-    if model_name.startswith("gpt-4o-mini"):
-        return True
-    if model_name.startswith("gpt-5-mini"):
-        return False
-    # Default assumption for other models
-    return False
\ No newline at end of file
+    """Declared by the model's backend (backends.get_backend(...).capabilities)."""
+    from .backends import get_backend
+    return get_backend(model_name).capabilities(model_name).logprobs
+
+
+def supports_structured_output(model_name: str) -> bool:
+    """True iff the model can be held to a JSON schema (judge verdicts)."""
+    from .backends import get_backend
+    return get_backend(model_name).capabilities(model_name).structured_output
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Offline token count: tiktoken when installed, else the ~4 chars/token
+    rule of thumb. Used for estimates only (never for billing).
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return max(1, len(text) // 4) if text else 0
+    try:
+        enc = tiktoken.encoding_for_model(model_name or config.MODEL)
+    except KeyError:
+        enc = tiktoken.get_encoding("o200k_base")
+    return len(enc.encode(text))